@@ -1,14 +1,39 @@
 from flask import Flask
 from flask_cors import CORS
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
 
 
 def create_app() -> Flask:
+    """
+    Application factory.
+
+    Starts loading the RAG system (embedding model + FAISS index) in a
+    background thread, so the app serves requests immediately. With
+    RAG_BACKGROUND_INIT=false it is loaded eagerly instead; gunicorn.conf.py
+    makes that the default, so the preloading master loads it once and the
+    forked workers share it copy-on-write. With RAG_BACKGROUND_INIT=true set
+    explicitly under gunicorn, every worker starts the loader after the fork.
+    """
     app: Flask = Flask(__name__)
     CORS(app)
 
+    # Configure rate limiter WITHOUT default limits (only apply to specific routes)
+    Limiter(
+        app=app,
+        key_func=get_remote_address,
+        storage_uri="memory://",
+    )
+
+    # Request counters and latency histograms for /metrics
+    from app.metrics import init_metrics
+
+    init_metrics(app)
+
     # Registracija ruta
-    from app.routes import bp as routes_bp
+    from app.routes import init_rag_system, main_bp
 
-    app.register_blueprint(routes_bp)
+    init_rag_system()
+    app.register_blueprint(main_bp)
 
     return app
@@ -0,0 +1,170 @@
+"""
+Module-level registry of long-lived LLM provider clients.
+
+Each client is built once per process and reused, so its httpx connection pool
+keeps TLS connections to the provider alive between requests. Timeouts and
+retry budgets are configured here, and per-provider latency is recorded for
+/status.
+"""
+
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+import os
+import threading
+import time
+from typing import Any
+
+from dotenv import load_dotenv
+
+from app.metrics import LLM_IN_FLIGHT
+
+load_dotenv()
+
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+GITHUB_ENDPOINT = os.getenv("GITHUB_ENDPOINT", "https://models.github.ai/inference")
+
+# HTTP settings shared by all providers
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BUDGET_SECONDS = float(os.getenv("LLM_RETRY_BUDGET_SECONDS", "10"))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "10"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+
+PROVIDERS = ("openrouter", "github")
+
+
+class LatencyStats:
+    """Thread-safe latency recorder over a bounded window of recent calls."""
+
+    def __init__(self, window: int = 500) -> None:
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.calls: int = 0
+        self.errors: int = 0
+
+    def record(self, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self.calls += 1
+            if ok:
+                self._samples.append(seconds)
+            else:
+                self.errors += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            samples = sorted(self._samples)
+            calls, errors = self.calls, self.errors
+
+        def percentile(p: float) -> float | None:
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 1)
+
+        return {
+            "calls": calls,
+            "errors": errors,
+            "latency_ms_p50": percentile(0.50),
+            "latency_ms_p95": percentile(0.95),
+            "latency_ms_max": percentile(1.0),
+        }
+
+
+def _http_client(is_async: bool = False) -> Any:
+    import httpx
+
+    client_class = httpx.AsyncClient if is_async else httpx.Client
+    return client_class(
+        timeout=httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=LLM_POOL_SIZE,
+            max_keepalive_connections=LLM_POOL_SIZE,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+def _build_openrouter(is_async: bool = False) -> Any:
+    from openai import AsyncOpenAI, OpenAI
+
+    client_class = AsyncOpenAI if is_async else OpenAI
+    return client_class(
+        base_url=OPENROUTER_BASE_URL,
+        api_key=os.getenv("OPENROUTER_API_KEY"),
+        max_retries=LLM_MAX_RETRIES,
+        timeout=LLM_READ_TIMEOUT,
+        http_client=_http_client(is_async),
+    )
+
+
+def _build_github(is_async: bool = False) -> Any:
+    from mistralai import Mistral
+    from mistralai.utils import BackoffStrategy, RetryConfig
+
+    http_client = {"async_client" if is_async else "client": _http_client(is_async)}
+    return Mistral(
+        api_key=os.getenv("GITHUB_TOKEN"),
+        server_url=GITHUB_ENDPOINT,
+        timeout_ms=int(LLM_READ_TIMEOUT * 1000),
+        retry_config=RetryConfig(
+            "backoff",
+            BackoffStrategy(
+                initial_interval=500,
+                max_interval=4000,
+                exponent=2.0,
+                max_elapsed_time=int(LLM_RETRY_BUDGET_SECONDS * 1000),
+            ),
+            retry_connection_errors=True,
+        ),
+        **http_client,
+    )
+
+
+class ProviderRegistry:
+    """Builds each provider client once and tracks its latency."""
+
+    _builders = {"openrouter": _build_openrouter, "github": _build_github}
+
+    def __init__(self) -> None:
+        self._clients: dict[tuple[str, bool], Any] = {}
+        self._lock = threading.Lock()
+        self._stats: dict[str, LatencyStats] = {name: LatencyStats() for name in PROVIDERS}
+
+    def get(self, name: str, is_async: bool = False) -> Any:
+        """
+        Return the shared client for a provider, creating it on first use.
+
+        Async clients are only used from the ASGI event loop (asgi.py), so they are
+        built lazily inside the worker and never shared across forks.
+        """
+        key = (name, is_async)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._builders[name](is_async)
+                    self._clients[key] = client
+        return client
+
+    @contextmanager
+    def track(self, name: str) -> Iterator[None]:
+        """Record the duration and outcome of one provider call"""
+        in_flight = LLM_IN_FLIGHT.labels(name)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self._stats[name].record(time.perf_counter() - start, ok=False)
+            raise
+        finally:
+            in_flight.dec()
+        self._stats[name].record(time.perf_counter() - start, ok=True)
+
+    def stats(self) -> dict[str, Any]:
+        return {name: stats.snapshot() for name, stats in self._stats.items()}
+
+
+llm_registry = ProviderRegistry()
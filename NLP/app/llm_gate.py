@@ -0,0 +1,97 @@
+"""
+Backpressure for the async /search path.
+
+An asyncio semaphore bounds how many LLM calls are in flight per worker. A small
+number of requests may wait for a slot; once that queue is full, or a request
+waits longer than LLM_QUEUE_TIMEOUT, it is rejected immediately with 503 and a
+Retry-After hint instead of piling up behind the provider.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+import os
+from typing import Any
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "64"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "5"))
+LLM_RETRY_AFTER_SECONDS = int(os.getenv("LLM_RETRY_AFTER_SECONDS", "5"))
+
+
+class LLMOverloadedError(Exception):
+    """Raised when no LLM slot is available within the queue limits"""
+
+    def __init__(self, reason: str, retry_after: int = LLM_RETRY_AFTER_SECONDS) -> None:
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+class LLMGate:
+    """Bounds in-flight LLM calls within one event loop."""
+
+    def __init__(self, max_in_flight: int, max_waiting: int, wait_timeout: float) -> None:
+        self.max_in_flight = max_in_flight
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        # Created on first use so it belongs to the worker's event loop
+        self._semaphore: asyncio.Semaphore | None = None
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def is_full(self) -> bool:
+        """All slots busy and the waiting queue full - new LLM work would be rejected"""
+        return self.in_flight + self.waiting >= self.max_in_flight + self.max_waiting
+
+    def reject(self, reason: str) -> LLMOverloadedError:
+        self.rejected += 1
+        return LLMOverloadedError(reason)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one LLM slot for the duration of the block"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        # Counters change synchronously, unlike the semaphore whose value only
+        # drops once the acquiring task runs
+        if self.is_full():
+            raise self.reject("LLM queue is full")
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.wait_timeout)
+        except asyncio.TimeoutError:  # noqa: UP041 - Docker image runs Python 3.10
+            self.timed_out += 1
+            raise LLMOverloadedError("Timed out waiting for an LLM slot") from None
+        finally:
+            self.waiting -= 1
+
+        self.admitted += 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_waiting": self.max_waiting,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+llm_gate = LLMGate(LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE, LLM_QUEUE_TIMEOUT)
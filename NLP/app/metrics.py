@@ -0,0 +1,130 @@
+"""
+Prometheus metrics for the NLP service, exported on /metrics.
+
+- nlp_requests_total / nlp_request_duration_seconds: every route, by status
+- nlp_stage_duration_seconds: stages inside a route (parse, embed, search,
+  context, llm for /search; extract, vectorize, compare for /check_two_file
+  and /check_files; ...)
+- nlp_cache_lookups_total: query-embedding, answer and extracted-text cache hits
+  and misses
+- nlp_extract_cache_saved_bytes_total: document bytes served from the extraction
+  cache instead of being parsed again
+- nlp_llm_in_flight: provider calls currently waiting on the LLM
+
+Gunicorn workers are separate processes, so gunicorn.conf.py points
+PROMETHEUS_MULTIPROC_DIR at a shared directory; every worker writes its samples
+there and /metrics aggregates all of them.
+"""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+import os
+import time
+
+from flask import Flask, Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from document_service.extraction_cache import extraction_cache
+
+# Stage durations range from sub-millisecond cache hits to multi-second LLM calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+REQUESTS = Counter("nlp_requests_total", "HTTP requests by route and status", ["route", "status"])
+REQUEST_SECONDS = Histogram(
+    "nlp_request_duration_seconds", "HTTP request duration", ["route"], buckets=LATENCY_BUCKETS
+)
+STAGE_SECONDS = Histogram(
+    "nlp_stage_duration_seconds",
+    "Duration of one processing stage of a request",
+    ["route", "stage"],
+    buckets=LATENCY_BUCKETS,
+)
+CACHE_LOOKUPS = Counter("nlp_cache_lookups_total", "Cache lookups by result", ["cache", "result"])
+EXTRACT_BYTES_SAVED = Counter(
+    "nlp_extract_cache_saved_bytes_total",
+    "Document bytes served from the extraction cache instead of being parsed",
+    ["tier"],
+)
+LLM_IN_FLIGHT = Gauge(
+    "nlp_llm_in_flight", "LLM provider calls in flight", ["provider"], multiprocess_mode="livesum"
+)
+
+
+def observe_stage(route: str, stage: str, seconds: float) -> None:
+    STAGE_SECONDS.labels(route, stage).observe(seconds)
+
+
+@contextmanager
+def timed_stage(route: str, stage: str) -> Iterator[None]:
+    """Time the enclosed block as one stage of `route` (also when it raises)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(route, stage, time.perf_counter() - start)
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_extraction_lookup(tier: str, hit: bool, document_bytes: int) -> None:
+    """Observer of the extraction cache: tier is "memory" or "disk" """
+    record_cache_lookup(f"extract_{tier}", hit)
+    if hit:
+        EXTRACT_BYTES_SAVED.labels(tier).inc(document_bytes)
+
+
+def record_request(route: str, status: int, seconds: float) -> None:
+    REQUESTS.labels(route, str(status)).inc()
+    REQUEST_SECONDS.labels(route).observe(seconds)
+
+
+def render_metrics() -> bytes:
+    """Current metrics in the Prometheus text format, across workers when multiprocess"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def init_metrics(app: Flask) -> None:
+    """Count and time every Flask request by its route pattern"""
+    extraction_cache.observer = record_extraction_lookup
+
+    @app.before_request
+    def _start_timer() -> None:
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record(response: Response) -> Response:
+        start = g.pop("metrics_start", None)
+        if start is None:
+            return response
+        # Route pattern, not the raw path, keeps label cardinality bounded
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        status = response.status_code
+
+        def record() -> None:
+            record_request(route, status, time.perf_counter() - start)
+
+        if response.is_streamed:
+            # SSE routes are still generating: time them until the server closes the body
+            response.call_on_close(record)
+        else:
+            record()
+        return response
+
+
+def metrics_response() -> Response:
+    return Response(render_metrics(), content_type=CONTENT_TYPE_LATEST)
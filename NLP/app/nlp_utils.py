@@ -83,7 +83,10 @@ def search_in_text(text: str, query: str) -> list[str]:
     if any(word in query.lower() for word in ["smjer", "program", "studij"]):
         for line in lines:
             line_lower = line.lower()
-            if any(keyword in line_lower for keyword in study_keywords) and line.strip() not in results:
+            if (
+                any(keyword in line_lower for keyword in study_keywords)
+                and line.strip() not in results
+            ):
                 results.append(line.strip())
 
     return results[:7]
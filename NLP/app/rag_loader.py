@@ -0,0 +1,108 @@
+"""
+Background initialization of the RAG system.
+
+Loading the embedding model and building or loading the FAISS index takes tens
+of seconds on a cold start. Doing it in a background thread lets the server bind
+its port and answer health checks right away; until the RAG system is ready,
+/search falls back to keyword search. /status reports the loader state and how
+long every phase took.
+"""
+
+from collections.abc import Callable
+import os
+import sys
+import threading
+import time
+from typing import Any
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# false = load synchronously in create_app() (gunicorn preload shares the model copy-on-write);
+# gunicorn.conf.py makes false the default there, `python main.py` loads in the background
+RAG_BACKGROUND_INIT = os.getenv("RAG_BACKGROUND_INIT", "true").lower() == "true"
+# Set by gunicorn.conf.py: with background loading the preloading master only imports
+# the app, and every worker starts its loader in post_fork
+RAG_LOAD_AFTER_FORK = os.getenv("RAG_LOAD_AFTER_FORK", "false").lower() == "true"
+
+
+class RAGLoader:
+    """Loads RAGSystem once per process and reports loading / ready / failed."""
+
+    def __init__(self, on_ready: Callable[[Any], None]) -> None:
+        """
+        Args:
+            on_ready: Called with the loaded RAGSystem before the state becomes "ready"
+        """
+        self.on_ready = on_ready
+        self.state = "idle"
+        self.error: str | None = None
+        self.started_at: float | None = None
+        self.durations: dict[str, float] = {}
+        self._lock = threading.Lock()
+        # The loader thread does not survive fork(); see _restart_in_child
+        if sys.platform != "win32":
+            os.register_at_fork(after_in_child=self._restart_in_child)
+
+    def disable(self) -> None:
+        self.state = "disabled"
+
+    def start(self, background: bool = True) -> None:
+        """Start loading unless it is already loading or done (safe to call more than once)."""
+        with self._lock:
+            if self.state in ("loading", "ready", "disabled"):
+                return
+            self.state = "loading"
+            self.error = None
+            self.started_at = time.time()
+            self.durations = {}
+
+        if background:
+            threading.Thread(target=self._load, name="rag-loader", daemon=True).start()
+        else:
+            self._load()
+
+    def _load(self) -> None:
+        start = time.perf_counter()
+        try:
+            from rag_system import RAGSystem
+
+            system = RAGSystem(load_index=False)
+            self.durations["model"] = round(time.perf_counter() - start, 3)
+
+            phase = time.perf_counter()
+            system.load_or_build_index()
+            self.durations["index"] = round(time.perf_counter() - phase, 3)
+
+            phase = time.perf_counter()
+            system.warm_up()
+            self.durations["warm_up"] = round(time.perf_counter() - phase, 3)
+        except Exception as e:
+            self.durations["total"] = round(time.perf_counter() - start, 3)
+            self.error = str(e)
+            self.state = "failed"
+            print(f"⚠️  RAG system not available: {e}")
+            print("📝 Falling back to keyword-based search")
+            return
+
+        self.durations["total"] = round(time.perf_counter() - start, 3)
+        self.on_ready(system)
+        self.state = "ready"
+        print(f"✅ RAG system ready in {self.durations['total']}s")
+
+    def _restart_in_child(self) -> None:
+        # A fork during loading (e.g. gunicorn --preload with RAG_BACKGROUND_INIT)
+        # leaves the child without the loader thread: load again in the child
+        self._lock = threading.Lock()
+        if self.state == "loading":
+            self.state = "idle"
+            self.start(background=True)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "state": self.state,
+            "error": self.error,
+            "started_at": self.started_at,
+            "durations_seconds": dict(self.durations),
+        }
@@ -1,23 +1,48 @@
+import hmac
 import io
 import json
 import mimetypes
 import os
+from typing import Any
 
-from flask import Blueprint, Response, jsonify, request, send_file
+from flask import Blueprint, Response, jsonify, request, send_file, stream_with_context
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+import numpy as np
 
+from app.llm_clients import llm_registry
+from app.llm_gate import llm_gate
+from app.metrics import metrics_response, observe_stage, record_cache_lookup, timed_stage
 from app.nlp_utils import load_text_file, search_in_text
-from app.services import generate_response_with_rag
-from document_service.extract_file import extract_text
+from app.rag_loader import RAG_BACKGROUND_INIT, RAG_LOAD_AFTER_FORK, RAGLoader
+from app.services import generate_response_with_rag, stream_response_with_rag
+from app.single_flight import coalescing_stats, search_flight
+from document_service.extract_file import extract_pages, extract_text
+from document_service.extraction_cache import extraction_cache
+from document_service.fingerprint_index import (
+    INDEXED_EXTENSIONS,
+    index_submission,
+    remove_submission,
+)
 from document_service.main import generate_health_pdf
-from document_service.similarity_checker import compare_two_text
+from document_service.similarity_checker import (
+    iter_similar_pairs,
+    similarity_from_vectors,
+    top_similar_pairs,
+    vectorize_many,
+    vectorize_texts,
+)
+from document_service.winnowing import compare_passages
 from notification_service.main import function_send_notification
+from rag import normalize_query
 from s3_bucket.main import delete_file_from_s3, get_all_files_s3, get_file_stream, upload_file
 
 # Create Flask Blueprint for main routes
 main_bp: Blueprint = Blueprint("main", __name__)
 
+# Answer returned when keyword search finds nothing relevant
+NO_RESULTS_RESPONSE = "Izvinjavam se, ali ne mogu da pronađem relevantne informacije o vašem pitanju u mojoj bazi znanja o IPI Akademiji. 🤔\n\nMožete me pitati o:\n- Studijskim programima\n- Ceni studija\n- Lokaciji fakulteta\n- Profesorima i osoblju\n- Studentskim aktivnostima"
+
 # Initialize limiter (will be bound to app in main.py)
 limiter = Limiter(key_func=get_remote_address)
 
@@ -30,22 +55,113 @@ except Exception as e:
     print(f"❌ Error loading content: {e}")
     raw_text = ""
 
-# Initialize RAG (Retrieval-Augmented Generation) system
+# RAG (Retrieval-Augmented Generation) system, initialized by init_rag_system()
 rag_system = None
 use_rag = os.getenv("USE_RAG", "true").lower() == "true"
 
-if use_rag:
-    try:
-        from rag_system import RAGSystem
+# Shared secret for POST /admin/reload (endpoint disabled when empty)
+RAG_RELOAD_TOKEN = os.getenv("RAG_RELOAD_TOKEN", "")
 
-        rag_system = RAGSystem()
-        print("✅ RAG system successfully initialized!")
-    except Exception as e:
-        print(f"⚠️  RAG system not available: {e}")
-        print("📝 Falling back to keyword-based search")
-else:
-    print("⚠️  RAG system disabled via USE_RAG=false")
-    print("📝 Using keyword-based search")
+
+def _set_rag_system(system) -> None:
+    global rag_system
+    rag_system = system
+
+
+# Loads the RAG system in the background; rag_system stays None until it is ready
+rag_loader = RAGLoader(on_ready=_set_rag_system)
+
+
+def init_rag_system(background: bool = RAG_BACKGROUND_INIT) -> None:
+    """
+    Start loading the embedding model and FAISS index.
+
+    In the background by default, so the server starts answering at once and
+    /search uses keyword search until the RAG system is ready. With
+    background=False the call blocks; under gunicorn preload_app the master
+    then loads the model before forking and workers share it copy-on-write.
+    In the background under gunicorn (RAG_LOAD_AFTER_FORK), the master skips
+    loading and every worker starts rag_loader from post_fork instead.
+    Safe to call more than once.
+    """
+    if not use_rag:
+        rag_loader.disable()
+        print("⚠️  RAG system disabled via USE_RAG=false")
+        print("📝 Using keyword-based search")
+        return
+
+    if background and RAG_LOAD_AFTER_FORK:
+        print("⏳ RAG system loads in every worker after fork")
+        return
+
+    rag_loader.start(background)
+
+
+def retrieve_for_query(query: str) -> tuple[str, dict, str | None, np.ndarray | None]:
+    """
+    Retrieval step of /search, shared by the sync route and the async path in asgi.py.
+
+    Returns:
+        (LLM context, response fields, ready answer, query embedding) - the ready answer
+        is set when no LLM call is needed (semantic cache hit or no keyword results);
+        the query embedding (RAG mode only) is passed on to remember_answer
+    """
+    if rag_system:
+        # RAG approach - retrieve relevant context using vector search
+        assembled = rag_system.assemble_context(query, n_results=3)
+        context = assembled["context"]
+        for stage, seconds in assembled["timings"].items():
+            observe_stage("/search", stage, seconds)
+        record_cache_lookup("query_embedding", assembled["embedding_cached"])
+
+        # Serve a semantically similar answer with identical context from cache
+        query_embedding = assembled["query_embedding"]
+        ready_answer = rag_system.get_cached_answer(query_embedding, context)
+        if rag_system.answer_cache.max_size > 0:
+            record_cache_lookup("answer", ready_answer is not None)
+        fields = {
+            "method": "RAG (Vector Search)",
+            "query": query,
+            "context_length": len(context),
+            "context_tokens": assembled["tokens"],
+            "context_tokens_saved": assembled["tokens_saved"],
+            "cached": ready_answer is not None,
+        }
+        return context, fields, ready_answer, query_embedding
+
+    # Fallback to keyword-based search
+    with timed_stage("/search", "keyword_search"):
+        relevant_parts = search_in_text(raw_text, query)
+    if not relevant_parts:
+        fields = {"method": "No results", "context_used": [], "query": query}
+        return "", fields, NO_RESULTS_RESPONSE, None
+
+    fields = {
+        "method": "Keyword Search (Fallback)",
+        "context_used": relevant_parts[:3],
+        "query": query,
+    }
+    # Combine most relevant parts as context
+    return "\n\n".join(relevant_parts[:3]), fields, None, None
+
+
+def remember_answer(query_embedding: np.ndarray | None, context: str, answer: str) -> None:
+    """Store a generated answer in the semantic answer cache (RAG mode only)"""
+    if rag_system:
+        rag_system.cache_answer(query_embedding, context, answer)
+
+
+def answer_query(query: str) -> dict:
+    """Retrieval and generation for one question; returns the /search response body"""
+    context, fields, ai_response, query_embedding = retrieve_for_query(query)
+
+    if ai_response is None:
+        # Generate AI response with the retrieved context
+        with timed_stage("/search", "llm"):
+            ai_response = generate_response_with_rag(query, context)
+        remember_answer(query_embedding, context, ai_response)
+
+    return {"response": ai_response, **fields}
 
 
 @main_bp.route("/search", methods=["POST"])
@@ -54,65 +170,142 @@ def search() -> tuple[Response, int]:
     """
     Search endpoint for generating AI responses to user queries.
     Uses RAG system with vector search if available, otherwise falls back to keyword search.
+    Identical questions already in flight share one retrieval and LLM call.
     Rate limited to 10 requests per 2 minutes per IP address.
     """
-    data = request.get_json()
-    query = data.get("word", "").strip()
+    with timed_stage("/search", "parse"):
+        data = request.get_json()
+        query = data.get("word", "").strip()
 
     if not query:
         return jsonify({"error": "Pitanje je obavezno!"}), 400
 
     try:
-        # Try using RAG system if available
-        if rag_system:
-            # RAG approach - retrieve relevant context using vector search
-            context = rag_system.get_context_for_llm(query, n_results=3)
+        payload, coalesced = search_flight.do(normalize_query(query), lambda: answer_query(query))
+        return jsonify({**payload, "query": query, "coalesced": coalesced})
 
-            # Generate AI response with RAG context
-            ai_response = generate_response_with_rag(query, context)
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return jsonify({"error": f"Greška pri obradi zahteva: {str(e)}"}), 500
 
-            return jsonify(
-                {
-                    "response": ai_response,
-                    "method": "RAG (Vector Search)",
-                    "query": query,
-                    "context_length": len(context),
-                }
-            )
-        else:
-            # Fallback to keyword-based search
-            relevant_parts = search_in_text(raw_text, query)
 
-            if relevant_parts:
-                # Combine most relevant parts as context
-                context = "\n\n".join(relevant_parts[:3])
-
-                # Generate AI response with keyword search context
-                ai_response = generate_response_with_rag(query, context)
-
-                return jsonify(
-                    {
-                        "response": ai_response,
-                        "method": "Keyword Search (Fallback)",
-                        "context_used": relevant_parts[:3],
-                        "query": query,
-                    }
-                )
-            else:
-                # No relevant results found
-                return jsonify(
-                    {
-                        "response": "Izvinjavam se, ali ne mogu da pronađem relevantne informacije o vašem pitanju u mojoj bazi znanja o IPI Akademiji. 🤔\n\nMožete me pitati o:\n- Studijskim programima\n- Ceni studija\n- Lokaciji fakulteta\n- Profesorima i osoblju\n- Studentskim aktivnostima",
-                        "method": "No results",
-                        "context_used": [],
-                        "query": query,
-                    }
-                )
+def _sse(event: str, data: dict) -> str:
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
+
+@main_bp.route("/search/stream", methods=["POST"])
+@limiter.limit("10 per 2 minutes")
+def search_stream() -> Response | tuple[Response, int]:
+    """
+    Streaming variant of /search using Server-Sent Events.
+    Emits a `metadata` event with retrieval info first, then `token` events as the
+    LLM generates them, and finally `done` with the full answer (or `error`).
+    """
+    data = request.get_json(silent=True) or {}
+    query = data.get("word", "").strip()
+
+    if not query:
+        return jsonify({"error": "Pitanje je obavezno!"}), 400
+
+    # Answer that needs no LLM call (semantic cache hit or no keyword results)
+    ready_answer: str | None = None
+    query_embedding = None
+    try:
+        if rag_system:
+            assembled = rag_system.assemble_context(query, n_results=3)
+            context = assembled["context"]
+            query_embedding = assembled["query_embedding"]
+            ready_answer = rag_system.get_cached_answer(query_embedding, context)
+            method = "RAG (Vector Search)"
+        else:
+            relevant_parts = search_in_text(raw_text, query)
+            context = "\n\n".join(relevant_parts[:3])
+            method = "Keyword Search (Fallback)" if relevant_parts else "No results"
+            if not relevant_parts:
+                ready_answer = NO_RESULTS_RESPONSE
     except Exception as e:
         print(f"❌ Error: {e}")
         return jsonify({"error": f"Greška pri obradi zahteva: {str(e)}"}), 500
 
+    def generate():
+        yield _sse(
+            "metadata",
+            {
+                "method": method,
+                "query": query,
+                "context_length": len(context),
+                "cached": bool(rag_system) and ready_answer is not None,
+            },
+        )
+
+        if ready_answer is not None:
+            yield _sse("token", {"token": ready_answer})
+            yield _sse("done", {"response": ready_answer})
+            return
+
+        parts: list[str] = []
+        try:
+            for token in stream_response_with_rag(query, context):
+                parts.append(token)
+                yield _sse("token", {"token": token})
+        except Exception as e:
+            print(f"❌ Error while streaming: {e}")
+            yield _sse("error", {"error": f"Greška pri obradi zahteva: {str(e)}"})
+            return
+
+        answer = "".join(parts)
+        if rag_system:
+            rag_system.cache_answer(query_embedding, context, answer)
+        yield _sse("done", {"response": answer})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Upper bound on questions per /search/batch request
+MAX_BATCH_QUERIES = int(os.getenv("MAX_BATCH_QUERIES", "64"))
+
+
+@main_bp.route("/search/batch", methods=["POST"])
+@limiter.limit("10 per 2 minutes")
+def search_batch() -> tuple[Response, int]:
+    """
+    Batched retrieval endpoint for backend and evaluation jobs.
+    Expects JSON {"words": [...], "n_results": 3} and returns the knowledge-base
+    chunks for every question, computed with one batched encode and one FAISS search.
+    """
+    data = request.get_json(silent=True) or {}
+    words = data.get("words")
+
+    if not isinstance(words, list) or not words:
+        return jsonify({"error": "Polje 'words' mora biti neprazna lista pitanja!"}), 400
+
+    if len(words) > MAX_BATCH_QUERIES:
+        return (
+            jsonify({"error": f"Maksimalno {MAX_BATCH_QUERIES} pitanja po zahtjevu"}),
+            400,
+        )
+
+    queries = [str(word).strip() for word in words]
+    if not all(queries):
+        return jsonify({"error": "Pitanje je obavezno!"}), 400
+
+    try:
+        n_results = int(data.get("n_results", 3))
+    except (TypeError, ValueError):
+        return jsonify({"error": "n_results must be an integer"}), 400
+
+    if not rag_system:
+        return jsonify({"error": "RAG system is not available"}), 503
+
+    results = rag_system.search_many(queries, n_results=max(1, min(n_results, 10)))
+
+    return jsonify({"results": results, "method": "RAG (Vector Search)"}), 200
+
 
 @main_bp.route("/status", methods=["GET"])
 def status() -> Response:
@@ -122,16 +315,50 @@ def status() -> Response:
             "status": True,
             "message": "IPI Akademija NLP servis je aktivan!",
             "rag_enabled": rag_system is not None,
+            "rag_loader": rag_loader.stats(),
             "knowledge_base_loaded": len(raw_text) > 0,
             "features": {
                 "vector_search": rag_system is not None,
                 "mistral_ai": True,
                 "multilingual_support": True,
             },
+            "query_embedding_cache": rag_system.query_cache.stats() if rag_system else None,
+            "answer_cache": rag_system.answer_cache.stats() if rag_system else None,
+            "context_assembly": rag_system.context_assembler.stats() if rag_system else None,
+            "llm_providers": llm_registry.stats(),
+            "llm_gate": llm_gate.stats(),
+            "search_coalescing": coalescing_stats(),
+            "index_reload": rag_system.reload_stats() if rag_system else None,
+            "extraction_cache": extraction_cache.stats(),
         }
     )
 
 
+@main_bp.route("/admin/reload", methods=["POST"])
+def reload_knowledge_base() -> tuple[Response, int]:
+    """
+    Rebuild the index from the current knowledge base and ingest corpus in the
+    background and swap it in without dropping in-flight searches.
+    Requires the X-Reload-Token header to match RAG_RELOAD_TOKEN. Other
+    gunicorn workers pick up the new index within RAG_RELOAD_CHECK_SECONDS.
+    """
+    token = request.headers.get("X-Reload-Token", "")
+    if not RAG_RELOAD_TOKEN or not hmac.compare_digest(token, RAG_RELOAD_TOKEN):
+        return jsonify({"error": "Forbidden"}), 403
+
+    if not rag_system:
+        return jsonify({"error": "RAG system is not available"}), 503
+
+    started = rag_system.reload_in_background()
+    return jsonify({"started": started, **rag_system.reload_stats()}), 202
+
+
+@main_bp.route("/metrics", methods=["GET"])
+def metrics() -> Response:
+    """Prometheus metrics: per-stage latency histograms, cache hit counters, in-flight LLM calls"""
+    return metrics_response()
+
+
 @main_bp.route("/", methods=["GET"])
 def home() -> Response:
     """Basic API information and usage guide"""
@@ -141,7 +368,10 @@ def home() -> Response:
             "version": "2.0 - RAG Edition",
             "endpoints": {
                 "/search": "POST - Pošaljite pitanje i dobijte odgovor",
+                "/search/stream": "POST - Odgovor token po token (Server-Sent Events)",
+                "/search/batch": "POST - Pretraga baze znanja za više pitanja odjednom",
                 "/status": "GET - Proverite status servisa",
+                "/metrics": "GET - Prometheus metrike",
                 "/health-certificate": "POST - Generiši potvrdu o zdravstvenom osiguranju",
                 "/notification-services": "POST - Pretplatite se na obaveštenja",
             },
@@ -183,15 +413,16 @@ def healthCertificate() -> tuple[Response, int]:
 
     try:
         # Generate PDF with student information
-        pdf_buf = generate_health_pdf(
-            full_name=data["fullName"],
-            jmbg=data["jmbg"],
-            city=data["city"],
-            date_of_birth=data["dateOfBirth"],
-            years_of_study=data["yearsOfStudy"],
-            academic_year=data["academicYear"],
-            search_text="Potvrđuje se da je ",
-        )
+        with timed_stage("/health-certificate", "render_pdf"):
+            pdf_buf = generate_health_pdf(
+                full_name=data["fullName"],
+                jmbg=data["jmbg"],
+                city=data["city"],
+                date_of_birth=data["dateOfBirth"],
+                years_of_study=data["yearsOfStudy"],
+                academic_year=data["academicYear"],
+                search_text="Potvrđuje se da je ",
+            )
 
         # Return PDF as downloadable file
         return send_file(
@@ -261,9 +492,23 @@ def save_s3() -> tuple[Response, int]:
         return jsonify({"error": "Missing metadata"}), 400
 
     # Upload file to S3 bucket
-    upload_file(professor_subject, assignment, file_to_save=file)
+    with timed_stage("/save_s3", "s3"):
+        key = upload_file(professor_subject, assignment, file_to_save=file)
 
-    return jsonify({"message": "Success send file to s3"}), 200
+    # Fingerprint the submission and report earlier near duplicates of the same
+    # professor_subject; a failure here must not fail the upload itself
+    similar = None
+    if key.lower().endswith(INDEXED_EXTENSIONS):
+        try:
+            file.stream.seek(0)
+            with timed_stage("/save_s3", "extract"):
+                text = extract_text(file)[0]
+            with timed_stage("/save_s3", "fingerprint"):
+                similar = index_submission(key, text)
+        except Exception as e:
+            print(f"⚠️  Submission {key} not fingerprinted: {e}")
+
+    return jsonify({"message": "Success send file to s3", "similar_submissions": similar}), 200
 
 
 @main_bp.route("/get_all_file_s3", methods=["POST"])
@@ -274,7 +519,8 @@ def get_file_s3() -> tuple[Response, int]:
         return jsonify({"error": "problem with payload need professor subject"}), 400
 
     professor_subject = data["subject"]
-    subject = get_all_files_s3(professor_subject)
+    with timed_stage("/get_all_file_s3", "s3"):
+        subject = get_all_files_s3(professor_subject)
 
     return (
         jsonify({"message": "Success get file from s3", "professor_subject": subject}),
@@ -293,7 +539,8 @@ def get_file() -> tuple[Response, int]:
 
     try:
         # Get file data from S3
-        file_data = get_file_stream(folder_name, file_name)
+        with timed_stage("/get_file_from_s3", "s3"):
+            file_data = get_file_stream(folder_name, file_name)
 
         # Create BytesIO object for send_file
         file_buffer = io.BytesIO(file_data)
@@ -323,7 +570,12 @@ def remove_file_s3():
     if not file_name or not folder_name:
         return jsonify({"error": "Problem with payload for delete file!"}), 400
     try:
-        delete_file_from_s3(folder_name, file_name)
+        with timed_stage("/delete_file_s3", "s3"):
+            delete_file_from_s3(folder_name, file_name)
+        try:
+            remove_submission(f"{folder_name}/{file_name}")
+        except Exception as e:
+            print(f"⚠️  Fingerprint of {folder_name}/{file_name} not removed: {e}")
         return (
             jsonify({"ok": True, "message": f"Deleted {file_name} from {folder_name}"}),
             200,
@@ -345,11 +597,20 @@ def find_similarity():
         file_1 = request.files["file_1"]
         file_2 = request.files["file_2"]
 
-        # Extract text from pdf or docs so we can compare
-        extracted_text_1 = extract_text(file_1)
-        extracted_text_2 = extract_text(file_2)
+        # Extract text from pdf or docs so we can compare (pages kept for passage offsets)
+        with timed_stage("/check_two_file", "extract"):
+            pages_1 = extract_pages(file_1.filename, file_1.stream)
+            pages_2 = extract_pages(file_2.filename, file_2.stream)
+
+        with timed_stage("/check_two_file", "vectorize"):
+            vectors = vectorize_texts(pages_1, pages_2)
+        with timed_stage("/check_two_file", "compare"):
+            result = similarity_from_vectors(vectors)
 
-        result = compare_two_text(extracted_text_1, extracted_text_2)
+        # Optional: the passages both files share, with offsets and pages in each file
+        if request.form.get("passages", "false").lower() == "true":
+            with timed_stage("/check_two_file", "passages"):
+                result.update(compare_passages(pages_1, pages_2))
 
     except Exception as e:
         return jsonify({"message": "Problem with NLP service", "error": str(e)}), 500
@@ -362,3 +623,123 @@ def find_similarity():
         ),
         200,
     )
+
+
+# Upper bound on submissions per /check_files request
+MAX_COMPARE_FILES = int(os.getenv("MAX_COMPARE_FILES", "200"))
+
+
+def _read_comparison_request(
+    route: str,
+) -> tuple[tuple[list[str], Any, float, int], None] | tuple[None, tuple[Response, int]]:
+    """
+    Parse a /check_files request: files under `files`, optional `threshold` and `top_k`.
+
+    Every file is extracted once and all of them are vectorized with one TF-IDF fit.
+    Returns ((names, vectors, threshold, top_k), None), or (None, error response).
+    """
+    files = request.files.getlist("files")
+    if len(files) < 2:
+        return None, (jsonify({"error": "At least two files are required under 'files'"}), 400)
+    if len(files) > MAX_COMPARE_FILES:
+        return None, (jsonify({"error": f"At most {MAX_COMPARE_FILES} files per request"}), 400)
+
+    try:
+        threshold = float(request.form.get("threshold", 0.5))
+        top_k = int(request.form.get("top_k", 20))
+    except (TypeError, ValueError):
+        error = {"error": "threshold must be a number and top_k an integer"}
+        return None, (jsonify(error), 400)
+
+    with timed_stage(route, "extract"):
+        texts = extract_text(files)
+    with timed_stage(route, "vectorize"):
+        vectors = vectorize_many(texts)
+
+    names = [file.filename or "" for file in files]
+    return (names, vectors, threshold, max(1, top_k)), None
+
+
+def _pair_json(names: list[str], pair: tuple[int, int, float]) -> dict:
+    i, j, score = pair
+    return {"file_1": names[i], "file_2": names[j], "index_1": i, "index_2": j, "score": score}
+
+
+@main_bp.route("/check_files", methods=["POST"])
+def find_similarity_many():
+    """
+    Plagiarism check for a whole assignment: compares every pair of the uploaded
+    files and returns the `top_k` most similar pairs with a score of at least
+    `threshold`.
+    """
+    try:
+        parsed = _read_comparison_request("/check_files")
+        if parsed[0] is None:
+            return parsed[1]
+        names, vectors, threshold, top_k = parsed[0]
+
+        with timed_stage("/check_files", "compare"):
+            pairs = top_similar_pairs(vectors, threshold, top_k)
+
+    except Exception as e:
+        return jsonify({"message": "Problem with NLP service", "error": str(e)}), 500
+
+    return (
+        jsonify(
+            {
+                "documents": names,
+                "compared_pairs": len(names) * (len(names) - 1) // 2,
+                "pairs": [_pair_json(names, pair) for pair in pairs],
+            }
+        ),
+        200,
+    )
+
+
+@main_bp.route("/check_files/stream", methods=["POST"])
+def find_similarity_many_stream():
+    """
+    Streaming variant of /check_files using Server-Sent Events.
+    Emits `documents` once the files are extracted and vectorized, then `pairs` with
+    the suspicious pairs of every compared block of documents as soon as it is
+    computed, and finally `done` with the overall `top_k` ranking (or `error`).
+    """
+    try:
+        parsed = _read_comparison_request("/check_files/stream")
+        if parsed[0] is None:
+            return parsed[1]
+        names, vectors, threshold, top_k = parsed[0]
+    except Exception as e:
+        return jsonify({"message": "Problem with NLP service", "error": str(e)}), 500
+
+    def generate():
+        yield _sse("documents", {"documents": names, "threshold": threshold, "top_k": top_k})
+
+        found: list[tuple[int, int, float]] = []
+        try:
+            with timed_stage("/check_files/stream", "compare"):
+                for block in iter_similar_pairs(vectors, threshold):
+                    if not block:
+                        continue
+                    block.sort(key=lambda pair: pair[2], reverse=True)
+                    yield _sse("pairs", {"pairs": [_pair_json(names, p) for p in block[:top_k]]})
+                    found.extend(block[:top_k])
+        except Exception as e:
+            print(f"❌ Error while comparing files: {e}")
+            yield _sse("error", {"error": str(e)})
+            return
+
+        found.sort(key=lambda pair: pair[2], reverse=True)
+        yield _sse(
+            "done",
+            {
+                "compared_pairs": len(names) * (len(names) - 1) // 2,
+                "pairs": [_pair_json(names, pair) for pair in found[:top_k]],
+            },
+        )
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,160 @@
+"""
+Single-flight coalescing of identical in-flight /search questions.
+
+When many students ask the same question within seconds, the first request
+(the leader) runs retrieval and the LLM call; requests with the same normalized
+question that arrive while it is still running (followers) wait for the
+leader's result instead of repeating the work. A follower waits at most
+SEARCH_COALESCE_TIMEOUT seconds and then does the work itself, so one hung
+call cannot stall every copy of a question.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+import os
+import threading
+from typing import Any, TypeVar
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SEARCH_COALESCING = os.getenv("SEARCH_COALESCING", "true").lower() == "true"
+SEARCH_COALESCE_TIMEOUT = float(os.getenv("SEARCH_COALESCE_TIMEOUT", "30"))
+
+T = TypeVar("T")
+
+
+class _FlightStats:
+    def __init__(self, timeout: float, enabled: bool = True) -> None:
+        self.timeout = timeout
+        self.enabled = enabled
+        self.leaders = 0
+        self.followers = 0
+        self.timeouts = 0
+
+    def stats(self) -> dict[str, Any]:
+        coalesced = self.followers - self.timeouts
+        total = self.leaders + self.followers
+        return {
+            "leaders": self.leaders,
+            "followers": self.followers,
+            "follower_timeouts": self.timeouts,
+            "coalescing_ratio": round(coalesced / total, 4) if total else 0.0,
+        }
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight(_FlightStats):
+    """Coalesces identical calls across threads (WSGI workers)."""
+
+    def __init__(self, timeout: float, enabled: bool = True) -> None:
+        super().__init__(timeout, enabled)
+        self._calls: dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], T]) -> tuple[T, bool]:
+        """
+        Run fn once per key among concurrent callers.
+
+        Returns:
+            (result, coalesced) - coalesced is True when the result came from
+            another caller's in-flight call
+        """
+        if not self.enabled:
+            return fn(), False
+
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.followers += 1
+
+        if not is_leader:
+            if call.done.wait(self.timeout):
+                if call.error is not None:
+                    raise call.error
+                return call.result, True
+            with self._lock:
+                self.timeouts += 1
+            return fn(), False
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight(_FlightStats):
+    """Coalesces identical calls within one event loop (ASGI path)."""
+
+    def __init__(self, timeout: float, enabled: bool = True) -> None:
+        super().__init__(timeout, enabled)
+        self._calls: dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        """Async counterpart of SingleFlight.do"""
+        if not self.enabled:
+            return await fn(), False
+
+        future = self._calls.get(key)
+        if future is not None:
+            self.followers += 1
+            try:
+                # shield: a follower giving up must not cancel the leader's call
+                return await asyncio.wait_for(asyncio.shield(future), self.timeout), True
+            except asyncio.TimeoutError:  # noqa: UP041 - Docker image runs Python 3.10
+                self.timeouts += 1
+                return await fn(), False
+            except asyncio.CancelledError:
+                # Leader's client went away; only propagate our own cancellation
+                if not future.cancelled():
+                    raise
+                return await fn(), False
+
+        future = asyncio.get_running_loop().create_future()
+        # Mark the outcome as retrieved even when nobody joined
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._calls[key] = future
+        self.leaders += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            del self._calls[key]
+        future.set_result(result)
+        return result, False
+
+
+search_flight = SingleFlight(SEARCH_COALESCE_TIMEOUT, SEARCH_COALESCING)
+search_flight_async = AsyncSingleFlight(SEARCH_COALESCE_TIMEOUT, SEARCH_COALESCING)
+
+
+def coalescing_stats() -> dict[str, Any]:
+    return {
+        "enabled": SEARCH_COALESCING,
+        "sync": search_flight.stats(),
+        "async": search_flight_async.stats(),
+    }
@@ -0,0 +1,169 @@
+"""
+ASGI ulazna tačka NLP servisa.
+
+POST /search se obrađuje asinhrono: retrieval (encode + FAISS) ide u thread pool,
+a čekanje na LLM ne blokira nit, pa jedan worker drži mnogo istovremenih pitanja.
+Broj LLM poziva u toku ograničava app.llm_gate; višak dobija brz 503 sa
+Retry-After umjesto da se gomila. Sve ostale rute služi postojeća Flask aplikacija.
+
+Pokretanje (preload-and-fork kao i WSGI varijanta):
+    gunicorn -c gunicorn.conf.py -k uvicorn_worker.UvicornWorker asgi:app
+"""
+
+import asyncio
+import json
+import time
+from typing import Any
+
+from asgiref.wsgi import WsgiToAsgi
+from limits import parse
+from limits.storage import MemoryStorage
+from limits.strategies import MovingWindowRateLimiter
+
+from app import create_app, routes
+from app.llm_gate import LLMOverloadedError, llm_gate
+from app.metrics import record_request, timed_stage
+from app.services import generate_response_with_rag_async
+from app.single_flight import search_flight_async
+from rag import normalize_query
+
+flask_app = create_app()
+wsgi_app = WsgiToAsgi(flask_app)
+
+# Isti limit kao Flask /search ruta, po IP adresi klijenta
+SEARCH_RATE_LIMIT = parse("10 per 2 minutes")
+SEARCH_RETRY_AFTER_SECONDS = 120
+rate_limiter = MovingWindowRateLimiter(MemoryStorage())
+
+MAX_BODY_BYTES = 64 * 1024
+
+
+async def _send_json(
+    send: Any, status: int, payload: dict, headers: dict[str, str] | None = None
+) -> None:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    raw_headers = [
+        (b"content-type", b"application/json; charset=utf-8"),
+        (b"content-length", str(len(body)).encode()),
+    ]
+    raw_headers += [(k.encode(), v.encode()) for k, v in (headers or {}).items()]
+    await send({"type": "http.response.start", "status": status, "headers": raw_headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _read_body(receive: Any) -> bytes | None:
+    """Čita tijelo zahtjeva; None ako je veće od MAX_BODY_BYTES"""
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if len(body) > MAX_BODY_BYTES:
+            return None
+        if not message.get("more_body"):
+            return body
+
+
+async def search(scope: dict, receive: Any, send: Any) -> None:
+    """Async varijanta Flask /search rute (isti request i response format)"""
+    client_ip = (scope.get("client") or ("127.0.0.1", 0))[0]
+    if not rate_limiter.hit(SEARCH_RATE_LIMIT, "search", client_ip):
+        await _send_json(
+            send,
+            429,
+            {"error": "Previše zahtjeva, pokušajte ponovo kasnije."},
+            {"retry-after": str(SEARCH_RETRY_AFTER_SECONDS)},
+        )
+        return
+
+    with timed_stage("/search", "parse"):
+        body = await _read_body(receive)
+        if body is None:
+            await _send_json(send, 413, {"error": "Zahtjev je prevelik"})
+            return
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            data = None
+    if not isinstance(data, dict):
+        await _send_json(send, 400, {"error": "Neispravan JSON"})
+        return
+
+    query = str(data.get("word", "")).strip()
+    if not query:
+        await _send_json(send, 400, {"error": "Pitanje je obavezno!"})
+        return
+
+    async def answer() -> dict:
+        # Pod punim opterećenjem odbij odmah, prije skupog retrievala
+        if llm_gate.is_full():
+            raise llm_gate.reject("LLM queue is full")
+
+        # Encode pitanja i FAISS pretraga troše CPU - izvan event loop-a
+        context, fields, ai_response, query_embedding = await asyncio.to_thread(
+            routes.retrieve_for_query, query
+        )
+
+        if ai_response is None:
+            async with llm_gate.slot():
+                with timed_stage("/search", "llm"):
+                    ai_response = await generate_response_with_rag_async(query, context)
+            await asyncio.to_thread(routes.remember_answer, query_embedding, context, ai_response)
+
+        return {"response": ai_response, **fields}
+
+    try:
+        # Ista pitanja koja su već u obradi čekaju rezultat prvog (ne zauzimaju LLM slot)
+        payload, coalesced = await search_flight_async.do(normalize_query(query), answer)
+        await _send_json(send, 200, {**payload, "query": query, "coalesced": coalesced})
+
+    except LLMOverloadedError as e:
+        print(f"⏳ LLM preopterećen: {e}")
+        await _send_json(
+            send,
+            503,
+            {"error": "Servis je trenutno preopterećen, pokušajte ponovo za nekoliko sekundi."},
+            {"retry-after": str(e.retry_after)},
+        )
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        await _send_json(send, 500, {"error": f"Greška pri obradi zahteva: {str(e)}"})
+
+
+async def _lifespan(receive: Any, send: Any) -> None:
+    # Model i index su učitani u create_app() samo uz RAG_BACKGROUND_INIT=false; inače
+    # ih rag_loader još učitava (u masteru ili nakon fork-a u workeru). Startup se ne
+    # odgađa: /search do tada koristi keyword pretragu, stanje je u /status → rag_loader
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            state = routes.rag_loader.state
+            if state == "loading":
+                print("⏳ RAG system se još učitava, /search do tada koristi keyword pretragu")
+            elif state == "failed":
+                print(f"⚠️  RAG system nije dostupan: {routes.rag_loader.error}")
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope: dict, receive: Any, send: Any) -> None:
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+    elif scope["type"] == "http" and scope["path"] == "/search" and scope["method"] == "POST":
+        # Flask rute se mjere u app.metrics.init_metrics, ova zaobilazi Flask
+        start = time.perf_counter()
+        status = 500
+
+        async def send_and_record_status(message: dict) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await search(scope, receive, send_and_record_status)
+        finally:
+            record_request("/search", status, time.perf_counter() - start)
+    else:
+        await wsgi_app(scope, receive, send)
@@ -0,0 +1,127 @@
+"""
+Benchmark of PDF text extraction backends over a corpus of sample PDFs.
+
+    python -m document_service.extract_benchmark samples/                 # existing PDFs
+    python -m document_service.extract_benchmark samples/ --generate 8    # create a sample corpus first
+    python -m document_service.extract_benchmark samples/ --output extract.json
+
+Every PDF in the directory is extracted (without the extraction cache) with:
+- pdfplumber: layout analysis on every page (the old extractor)
+- pypdf2: PyPDF2 text layer on every page
+- auto: PyPDF2, pdfplumber only for pages without text
+- auto_parallel: auto, page ranges spread over PDF_EXTRACT_WORKERS processes
+
+and the pages/second, the total time and the pages left without text are
+reported per backend.
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from typing import Any
+
+from .extract_file import PDF_EXTRACT_WORKERS, extract_pdf_pages
+
+BACKENDS = ("pdfplumber", "pypdf2", "auto", "auto_parallel")
+
+# Standard PDF fonts have no glyphs for č, ć, š, ž, đ: sample words avoid them
+_WORDS = (
+    "studij", "fakultet", "ispit", "predmet", "profesor", "student", "semestar", "ocjena",
+    "rad", "seminarski", "programiranje", "sistem", "podaci", "mreza", "analiza", "projekat",
+    "zadatak", "rezultat", "metoda", "model", "uvod", "literatura", "poglavlje", "primjer",
+    "tabela", "grafikon",
+)  # fmt: skip
+
+
+def generate_samples(directory: str, count: int, seed: int = 0) -> list[str]:
+    """Write `count` text PDFs of 5 to 120 pages (reportlab) and return their paths."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for number in range(count):
+        path = os.path.join(directory, f"sample_{number:02d}.pdf")
+        pdf = canvas.Canvas(path, pagesize=A4)
+        for _ in range(rng.randint(5, 120)):
+            pdf.setFont("Times-Roman", 11)
+            for line in range(48):
+                pdf.drawString(56, 790 - line * 15, " ".join(rng.choices(_WORDS, k=12)))
+            pdf.showPage()
+        pdf.save()
+        paths.append(path)
+    print(f"📄 Generated {count} sample PDFs in {directory}")
+    return paths
+
+
+def run_benchmark(paths: list[str], repeat: int = 1) -> dict[str, Any]:
+    """Extract every PDF with every backend; the best of `repeat` runs is reported."""
+    documents = []
+    for path in paths:
+        with open(path, "rb") as f:
+            documents.append(f.read())
+
+    # Start the pool outside the measurement
+    extract_pdf_pages(documents[0], parallel=True)
+
+    results: dict[str, Any] = {}
+    for backend in BACKENDS:
+        parallel = backend == "auto_parallel"
+        name = "auto" if parallel else backend
+        best = float("inf")
+        pages: list[str] = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            pages = [
+                page
+                for data in documents
+                for page in extract_pdf_pages(data, parallel=parallel, backend=name)
+            ]
+            best = min(best, time.perf_counter() - start)
+        results[backend] = {
+            "pages": len(pages),
+            "seconds": round(best, 3),
+            "pages_per_second": round(len(pages) / best, 1) if best else None,
+            "empty_pages": sum(1 for page in pages if not page.strip()),
+        }
+    return {
+        "documents": len(documents),
+        "megabytes": round(sum(len(data) for data in documents) / 1024 / 1024, 2),
+        "workers": PDF_EXTRACT_WORKERS,
+        "cpus": os.cpu_count(),
+        "backends": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark PDF extraction backends")
+    parser.add_argument("directory", help="Directory with sample PDFs")
+    parser.add_argument("--generate", type=int, default=0, help="Generate N sample PDFs first")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", help="Path of a JSON file with the results")
+    args = parser.parse_args()
+
+    if args.generate:
+        generate_samples(args.directory, args.generate)
+    paths = sorted(
+        os.path.join(args.directory, name)
+        for name in os.listdir(args.directory)
+        if name.lower().endswith(".pdf")
+    )
+    if not paths:
+        parser.error(f"No PDFs in {args.directory} (use --generate N)")
+
+    result = run_benchmark(paths, args.repeat)
+    print(f"\n{'backend':<15}{'pages':>8}{'seconds':>10}{'pages/s':>10}{'empty':>8}")
+    for backend, stats in result["backends"].items():
+        print(
+            f"{backend:<15}{stats['pages']:>8}{stats['seconds']:>10}"
+            f"{stats['pages_per_second']:>10}{stats['empty_pages']:>8}"
+        )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"💾 Results saved to {args.output}")
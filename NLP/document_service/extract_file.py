@@ -1,6 +1,201 @@
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
 from docx import Document
 import pdfplumber
 
+from .extraction_cache import content_key, extraction_cache
+
+# auto = PyPDF2 first, pdfplumber only for pages where PyPDF2 finds no text;
+# pypdf2 / pdfplumber use one backend for every page
+PDF_EXTRACT_BACKEND = os.getenv("PDF_EXTRACT_BACKEND", "auto")
+# Processes per service worker that extract page ranges of one PDF in parallel
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "2"))
+# Pages per task; documents with a single range are extracted in the calling thread
+PDF_SHARD_PAGES = int(os.getenv("PDF_SHARD_PAGES", "16"))
+# Budget per document: pages after PDF_MAX_PAGES are skipped, and extraction
+# running longer than PDF_TIME_BUDGET_SECONDS fails with TimeoutError
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "1000"))
+PDF_TIME_BUDGET_SECONDS = float(os.getenv("PDF_TIME_BUDGET_SECONDS", "60"))
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _reset_pool_in_child() -> None:
+    # A pool inherited through fork() (gunicorn workers) belongs to the parent
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+if sys.platform != "win32":
+    os.register_at_fork(after_in_child=_reset_pool_in_child)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: pool processes do not inherit the service's threads and model
+            context = multiprocessing.get_context("spawn")
+            _pool = ProcessPoolExecutor(max_workers=PDF_EXTRACT_WORKERS, mp_context=context)
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken or stuck pool; the next _get_pool() starts a new one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    # Workers still running past the deadline would keep their CPU and memory
+    processes = list((pool._processes or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+
+def _check_deadline(deadline: float | None) -> None:
+    if deadline is not None and time.time() > deadline:
+        raise TimeoutError(f"PDF extraction exceeded {PDF_TIME_BUDGET_SECONDS:g}s budget")
+
+
+def _open_source(source):
+    """Path of a PDF file (pool processes), or the PDF bytes (calling thread)."""
+    return source if isinstance(source, str) else io.BytesIO(source)
+
+
+def extract_pdf_range(source, start, stop, backend=PDF_EXTRACT_BACKEND, deadline=None):
+    """
+    Text of pages [start, stop) of a PDF given by path or as bytes.
+
+    PyPDF2 reads the text layer directly and is several times faster than
+    pdfplumber's layout analysis; pdfplumber handles the pages PyPDF2 cannot.
+    """
+    pages = [""] * (stop - start)
+    if backend != "pdfplumber":
+        from PyPDF2 import PdfReader
+
+        try:
+            reader = PdfReader(_open_source(source))
+        except Exception as e:
+            print(f"⚠️  PyPDF2 cannot read PDF, using pdfplumber: {e}")
+        else:
+            for i in range(start, stop):
+                try:
+                    pages[i - start] = reader.pages[i].extract_text() or ""
+                except Exception:
+                    # Malformed content stream: left empty for pdfplumber
+                    pages[i - start] = ""
+                _check_deadline(deadline)
+
+    if backend != "pypdf2":
+        missing = [i for i, text in enumerate(pages) if not text.strip()]
+        if missing:
+            with pdfplumber.open(_open_source(source)) as pdf:
+                for i in missing:
+                    pages[i] = pdf.pages[start + i].extract_text() or ""
+                    _check_deadline(deadline)
+    return pages
+
+
+def _page_count(data):
+    try:
+        from PyPDF2 import PdfReader
+
+        return len(PdfReader(io.BytesIO(data)).pages)
+    except Exception:
+        with pdfplumber.open(io.BytesIO(data)) as pdf:
+            return len(pdf.pages)
+
+
+def extract_pdf_pages(data, parallel=True, backend=PDF_EXTRACT_BACKEND):
+    """
+    Text of every page of a PDF, within the page and time budget.
+
+    Page ranges of PDF_SHARD_PAGES are extracted in the process pool when
+    `parallel` is set and the document has more than one range.
+    """
+    deadline = time.time() + PDF_TIME_BUDGET_SECONDS
+    count = _page_count(data)
+    if count > PDF_MAX_PAGES:
+        print(f"⚠️  PDF has {count} pages, extracting the first {PDF_MAX_PAGES}")
+        count = PDF_MAX_PAGES
+    ranges = [
+        (start, min(start + PDF_SHARD_PAGES, count)) for start in range(0, count, PDF_SHARD_PAGES)
+    ]
+
+    if not parallel or PDF_EXTRACT_WORKERS <= 1 or len(ranges) <= 1:
+        # In the calling thread the PDF is read from memory, without a temporary file
+        return extract_pdf_range(data, 0, count, backend, deadline)
+
+    # Pool processes open the PDF by path instead of receiving its bytes per task.
+    # The file is closed before they open it: Windows cannot reopen an open temporary file
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(data)
+    try:
+        pool = _get_pool()
+        try:
+            futures = [
+                pool.submit(extract_pdf_range, f.name, start, stop, backend, deadline)
+                for start, stop in ranges
+            ]
+            # Workers check the deadline between pages; the extra second covers the last page
+            _, pending = wait(futures, timeout=max(deadline - time.time(), 0) + 1)
+            if pending:
+                # A page that never reaches a deadline check would hold its worker forever
+                _discard_pool(pool)
+                raise TimeoutError(f"PDF extraction exceeded {PDF_TIME_BUDGET_SECONDS:g}s budget")
+            return [page for future in futures for page in future.result()]
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory on a pathological PDF)
+            _discard_pool(pool)
+            raise
+    finally:
+        # On Windows a worker still past its deadline may hold the file open
+        with contextlib.suppress(OSError):
+            os.unlink(f.name)
+
+
+def _parse_pages(filename, data, parallel):
+    if filename.lower().endswith(".pdf"):
+        return extract_pdf_pages(data, parallel)
+    doc = Document(io.BytesIO(data))
+    return ["\n".join(para.text for para in doc.paragraphs)]
+
+
+def extract_pages(filename, stream, parallel=True):
+    """
+    Return the text of every PDF page, or the whole DOCX document as a single page.
+
+    Results are cached by the SHA-256 of the file bytes (see extraction_cache), so
+    a document that was already seen is not parsed again.
+
+    :param parallel: Extract long PDFs in the process pool (off inside other pools).
+    """
+    if not filename.lower().endswith((".pdf", ".docx")):
+        raise ValueError(
+            f"Unsupported file type for '{filename}'. Only PDF and DOCX files are allowed."
+        )
+
+    data = stream.read()
+    key = content_key(data, filename)
+    pages = extraction_cache.get(key, len(data))
+    if pages is None:
+        pages = _parse_pages(filename, data, parallel)
+        extraction_cache.put(key, pages)
+    return list(pages)
+
 
 def extract_text(file_from_user):
     if not isinstance(file_from_user, (list, tuple)):
@@ -8,16 +203,5 @@ def extract_text(file_from_user):
 
     texts = []
     for file in file_from_user:
-        if file.filename.endswith(".pdf"):
-            with pdfplumber.open(file.stream) as pdf:
-                text = "\n".join(page.extract_text() or "" for page in pdf.pages)
-            texts.append(text)
-        elif file.filename.endswith(".docx"):
-            doc = Document(file.stream)
-            text = "\n".join(para.text for para in doc.paragraphs)
-            texts.append(text)
-        else:
-            raise ValueError(
-                f"Unsupported file type for '{file.filename}'. Only PDF and DOCX files are allowed."
-            )
+        texts.append("\n".join(extract_pages(file.filename, file.stream)))
     return texts
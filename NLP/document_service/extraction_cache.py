@@ -0,0 +1,222 @@
+"""
+Content-hash cache of extracted document text.
+
+Parsing a PDF with pdfplumber (layout analysis) is the slowest step of the
+comparison endpoints, and the same submission is uploaded again for every
+comparison it takes part in. Extracted pages are cached under the SHA-256 of the
+file bytes (plus the file type and EXTRACTOR_VERSION), so a document is parsed
+once however it reaches the service.
+
+Two tiers:
+- in-process LRU of the most recent documents (EXTRACT_CACHE_MEMORY_ENTRIES)
+- on-disk store shared by all workers (EXTRACT_CACHE_DIR), bounded to
+  EXTRACT_CACHE_MAX_MB; a hit refreshes the file's mtime and eviction removes
+  the least recently used files first
+
+Hits, misses and the document bytes that were not parsed again are counted in
+stats() (/status) and reported to an optional observer (app.metrics).
+"""
+
+from collections import OrderedDict
+from collections.abc import Callable
+import contextlib
+import hashlib
+import json
+import os
+import threading
+from typing import Any
+
+# Bump when extraction output changes, so cached pages of the old extractor are not reused
+EXTRACTOR_VERSION = "2"
+
+EXTRACT_CACHE_DIR = os.getenv("EXTRACT_CACHE_DIR", "extract_cache")
+EXTRACT_CACHE_MAX_MB = float(os.getenv("EXTRACT_CACHE_MAX_MB", "512"))
+EXTRACT_CACHE_MEMORY_ENTRIES = int(os.getenv("EXTRACT_CACHE_MEMORY_ENTRIES", "64"))
+
+# observer(tier, hit, document_bytes): tier is "memory" or "disk"
+CacheObserver = Callable[[str, bool, int], None]
+
+
+def content_key(data: bytes, filename: str) -> str:
+    """SHA-256 of the file bytes, file type and extractor version."""
+    digest = hashlib.sha256(data)
+    digest.update(f"|{os.path.splitext(filename)[1].lower()}|{EXTRACTOR_VERSION}".encode())
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """Two-tier (memory + disk) LRU cache of extracted pages keyed by content hash."""
+
+    def __init__(
+        self,
+        directory: str = EXTRACT_CACHE_DIR,
+        max_bytes: int = int(EXTRACT_CACHE_MAX_MB * 1024 * 1024),
+        memory_entries: int = EXTRACT_CACHE_MEMORY_ENTRIES,
+    ) -> None:
+        """
+        :param directory: Directory of the disk tier.
+        :param max_bytes: Size bound of the disk tier (0 disables it).
+        :param memory_entries: Documents kept in process memory (0 disables the tier).
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.observer: CacheObserver | None = None
+        self._memory: OrderedDict[str, list[str]] = OrderedDict()
+        self._lock = threading.Lock()
+        # Disk usage as seen by this process; rescanned before evicting, since
+        # other workers write to the same directory
+        self._disk_bytes: int | None = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _observe(self, tier: str, hit: bool, size: int) -> None:
+        if self.observer is not None:
+            self.observer(tier, hit, size)
+
+    def get(self, key: str, size: int) -> list[str] | None:
+        """
+        Cached pages of a document, or None.
+
+        :param size: Byte size of the document, counted as saved on a hit.
+        """
+        if self.memory_entries > 0:
+            with self._lock:
+                pages = self._memory.get(key)
+                if pages is not None:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    self.bytes_saved += size
+            self._observe("memory", pages is not None, size)
+            if pages is not None:
+                return pages
+
+        pages = self._read_disk(key)
+        with self._lock:
+            if pages is None:
+                self.misses += 1
+            else:
+                self.disk_hits += 1
+                self.bytes_saved += size
+        if self.max_bytes > 0:
+            self._observe("disk", pages is not None, size)
+        if pages is not None:
+            self._remember(key, pages)
+        return pages
+
+    def put(self, key: str, pages: list[str]) -> None:
+        self._remember(key, pages)
+        if self.max_bytes > 0:
+            self._write_disk(key, pages)
+
+    def _remember(self, key: str, pages: list[str]) -> None:
+        if self.memory_entries <= 0:
+            return
+        with self._lock:
+            self._memory[key] = pages
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _read_disk(self, key: str) -> list[str] | None:
+        if self.max_bytes <= 0:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                pages = json.load(f)
+            # mtime is the LRU clock of the disk tier
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Extraction cache entry {key[:12]} unreadable: {e}")
+            return None
+        return pages
+
+    def _write_disk(self, key: str, pages: list[str]) -> None:
+        path = self._path(key)
+        data = json.dumps(pages, ensure_ascii=False).encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️  Extraction cache entry {key[:12]} not written: {e}")
+            return
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan()[1]
+            else:
+                self._disk_bytes += len(data)
+            over_limit = self._disk_bytes > self.max_bytes
+        if over_limit:
+            self._evict()
+
+    def _scan(self) -> tuple[list[tuple[float, int, str]], int]:
+        """(mtime, size, path) of every disk entry and their total size."""
+        entries = []
+        for dirpath, _, filenames in os.walk(self.directory):
+            for name in filenames:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries, sum(size for _, size, _ in entries)
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the disk tier is at 90% of its bound."""
+        entries, total = self._scan()
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            # Another worker may have evicted it already
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            total -= size
+            removed += 1
+        with self._lock:
+            self._disk_bytes = total
+            self.evictions += removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Counters for /status."""
+        with self._lock:
+            total = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_size": len(self._memory),
+                "memory_entries": self.memory_entries,
+                "disk_bytes": self._disk_bytes,
+                "max_disk_bytes": self.max_bytes,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / total if total else 0.0,
+                "bytes_saved": self.bytes_saved,
+                "evictions": self.evictions,
+            }
+
+
+# Shared by every extraction in this process
+extraction_cache = ExtractionCache()
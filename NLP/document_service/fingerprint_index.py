@@ -0,0 +1,493 @@
+"""
+Persistent MinHash / LSH index of submitted assignments, for near-duplicate search.
+
+Every submission stored under `professor_subject/` in S3 (see
+s3_bucket.main.upload_file) gets a MinHash signature of its word shingles. The
+signatures are split into LSH bands; two documents sharing any band become
+candidates, so looking up a new upload touches only the buckets of its own bands
+instead of every earlier submission. Exact TF-IDF cosine scoring
+(similarity_checker.vectorize_many) then runs on the candidates only.
+
+Each professor_subject has a directory in FINGERPRINT_INDEX_DIR with:
+- signatures.log: append-only log of add/remove records (S3 key + signature);
+  an upload appends one record, and workers read only the records appended since
+  their last refresh. The log is compacted when removed and replaced records
+  outnumber the live ones, or when the MinHash settings change.
+- texts/: the preprocessed text of every submission in its own file, read only
+  for LSH candidates (exact scoring) and for re-signing after a settings change.
+
+Gunicorn workers share the directory; updates run under a file lock.
+
+    python -m document_service.fingerprint_index                  # rebuild every prefix
+    python -m document_service.fingerprint_index "Matematika 1"   # rebuild one prefix
+
+The rebuild lists and downloads the submissions from the bucket; set
+S3_ENDPOINT_URL to run it against a local S3 stand-in (MinIO, moto server).
+"""
+
+from collections.abc import Iterator
+import contextlib
+from contextlib import contextmanager
+import hashlib
+import io
+import os
+import struct
+import threading
+import zlib
+
+import numpy as np
+
+from rag import atomic_write, file_lock
+
+from .similarity_checker import preprocess_text_for_comparison, vectorize_many
+
+FINGERPRINT_INDEX_DIR = os.getenv("FINGERPRINT_INDEX_DIR", "fingerprint_index")
+# Words per shingle; 3 keeps reworded-but-copied passages overlapping
+SHINGLE_SIZE = int(os.getenv("MINHASH_SHINGLE_SIZE", "3"))
+MINHASH_PERMUTATIONS = int(os.getenv("MINHASH_PERMUTATIONS", "128"))
+# 64 bands x 2 rows: pairs with Jaccard similarity >= 0.3 become candidates with
+# probability > 99%; exact scoring removes the extra candidates
+LSH_BANDS = int(os.getenv("LSH_BANDS", "64"))
+# Minimum TF-IDF cosine similarity reported as a near duplicate (a submission
+# copying 60% of another verbatim scores about 0.45)
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.4"))
+
+INDEXED_EXTENSIONS = (".pdf", ".docx")
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+# Shingles hashed per step, bounds the permutations x shingles matrix of long theses
+_HASH_BLOCK = 4096
+
+
+def _permutations(count: int) -> tuple[np.ndarray, np.ndarray]:
+    # Fixed seed: signatures must stay comparable across processes and restarts.
+    # a < 2^31 and shingle hashes < 2^32 keep a * x + b below 2^64
+    rng = np.random.RandomState(20240601)
+    a = rng.randint(1, 1 << 31, size=count, dtype=np.int64).astype(np.uint64)
+    b = rng.randint(0, 1 << 31, size=count, dtype=np.int64).astype(np.uint64)
+    return a, b
+
+
+_PERM_A, _PERM_B = _permutations(MINHASH_PERMUTATIONS)
+
+
+def shingle_hashes(words: list[str], size: int = SHINGLE_SIZE) -> np.ndarray:
+    """32-bit hashes of the distinct word `size`-grams (crc32 is stable across processes)."""
+    if len(words) < size:
+        shingles = {" ".join(words)} if words else set()
+    else:
+        shingles = {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+    return np.fromiter(
+        (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+
+def minhash_signature(preprocessed: str) -> np.ndarray | None:
+    """
+    MinHash signature of a text already passed through preprocess_text_for_comparison.
+
+    :return: uint32 array of MINHASH_PERMUTATIONS values, or None for a text without words.
+    """
+    hashes = shingle_hashes(preprocessed.split())
+    if not len(hashes):
+        return None
+
+    signature = np.full(len(_PERM_A), _MAX_HASH, dtype=np.uint64)
+    for start in range(0, len(hashes), _HASH_BLOCK):
+        block = hashes[start : start + _HASH_BLOCK]
+        permuted = (_PERM_A[:, None] * block[None, :] + _PERM_B[:, None]) % _MERSENNE_PRIME
+        np.minimum(signature, (permuted & _MAX_HASH).min(axis=1), out=signature)
+    return signature.astype(np.uint32)
+
+
+def _band_keys(signature: np.ndarray) -> list[bytes]:
+    return [band.tobytes() for band in np.array_split(signature, LSH_BANDS)]
+
+
+def subject_of(key: str) -> str:
+    """professor_subject part of an S3 key created by upload_file."""
+    return key.rsplit("/", 1)[0] if "/" in key else ""
+
+
+# signatures.log: header (magic, shingle size, permutations), then records of
+# (operation, key length, key, signature for _ADD)
+_LOG_HEADER = struct.Struct("<4sHH")
+_LOG_MAGIC = b"MHLX"
+_LOG_RECORD = struct.Struct("<BH")
+_ADD, _REMOVE = 1, 0
+# Live records below which the log is never compacted
+_MIN_COMPACT_RECORDS = 64
+
+
+def _text_name(key: str) -> str:
+    return hashlib.sha1(key.encode("utf-8")).hexdigest() + ".txt"
+
+
+class FingerprintIndex:
+    """MinHash signatures and LSH buckets of the submissions of one professor_subject."""
+
+    def __init__(self, subject: str, directory: str = FINGERPRINT_INDEX_DIR) -> None:
+        self.subject = subject
+        name = hashlib.sha1(subject.encode("utf-8")).hexdigest()[:16]
+        self.directory = os.path.join(directory, name)
+        self.log_path = os.path.join(self.directory, "signatures.log")
+        self.texts_dir = os.path.join(self.directory, "texts")
+        self.lock_path = os.path.join(directory, f"{name}.lock")
+        self.signatures: dict[str, np.ndarray] = {}
+        self._buckets: list[dict[bytes, set[str]]] = [{} for _ in range(LSH_BANDS)]
+        # Position in the log read so far, and the (device, inode) of that log file;
+        # compaction replaces the file, which forces a full reload
+        self._log_identity: tuple[int, int] | None = None
+        self._log_offset = 0
+        self._log_settings = (SHINGLE_SIZE, MINHASH_PERMUTATIONS)
+        self._log_records = 0
+        # Records of the running update, appended to the log when it ends
+        self._pending: list[bytes] = []
+        self._needs_compaction = False
+        # Threads of one worker; other workers are excluded by the file lock
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.signatures
+
+    def add(self, key: str, signature: np.ndarray, text: str) -> None:
+        """Add or replace a submission; call inside updating()."""
+        os.makedirs(self.texts_dir, exist_ok=True)
+        path = os.path.join(self.texts_dir, _text_name(key))
+        with atomic_write(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+        signature = np.asarray(signature, dtype=np.uint32)
+        self._apply_add(key, signature)
+        self._pending.append(self._record(_ADD, key, signature))
+
+    def remove(self, key: str) -> None:
+        """Drop a submission; call inside updating()."""
+        if key not in self.signatures:
+            return
+        self._apply_remove(key)
+        self._pending.append(self._record(_REMOVE, key))
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(self.texts_dir, _text_name(key)))
+
+    def clear(self) -> None:
+        """Drop every submission; the log is rewritten when the update ends."""
+        self._reset()
+        self._needs_compaction = True
+
+    def _reset(self) -> None:
+        self.signatures.clear()
+        self._buckets = [{} for _ in range(LSH_BANDS)]
+        self._log_identity = None
+        self._log_offset = 0
+        self._log_records = 0
+        self._pending.clear()
+
+    def _apply_add(self, key: str, signature: np.ndarray) -> None:
+        self._apply_remove(key)
+        self.signatures[key] = signature
+        for band, bucket_key in enumerate(_band_keys(signature)):
+            self._buckets[band].setdefault(bucket_key, set()).add(key)
+
+    def _apply_remove(self, key: str) -> None:
+        signature = self.signatures.pop(key, None)
+        if signature is None:
+            return
+        for band, bucket_key in enumerate(_band_keys(signature)):
+            bucket = self._buckets[band].get(bucket_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band][bucket_key]
+
+    @staticmethod
+    def _record(operation: int, key: str, signature: np.ndarray | None = None) -> bytes:
+        encoded = key.encode("utf-8")
+        record = _LOG_RECORD.pack(operation, len(encoded)) + encoded
+        if signature is not None:
+            record += signature.tobytes()
+        return record
+
+    def read_text(self, key: str) -> str | None:
+        """Preprocessed text of an indexed submission (None if it was removed meanwhile)."""
+        try:
+            with open(os.path.join(self.texts_dir, _text_name(key)), encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def refresh(self) -> None:
+        """Apply the log records other processes appended since the last refresh."""
+        try:
+            stat = os.stat(self.log_path)
+        except FileNotFoundError:
+            if self._log_identity is not None:
+                self._reset()
+            return
+        identity = (stat.st_dev, stat.st_ino)
+        if identity != self._log_identity or stat.st_size < self._log_offset:
+            # New or compacted log: read it from the start
+            self._reset()
+            self._log_identity = identity
+        if stat.st_size > self._log_offset:
+            self._read_log()
+
+    def _read_log(self) -> None:
+        with open(self.log_path, "rb") as f:
+            f.seek(self._log_offset)
+            data = f.read()
+
+        position = 0
+        if self._log_offset == 0:
+            if len(data) < _LOG_HEADER.size:
+                return
+            magic, shingle_size, permutations = _LOG_HEADER.unpack_from(data)
+            if magic != _LOG_MAGIC:
+                raise ValueError(f"{self.log_path} is not a fingerprint log")
+            self._log_settings = (shingle_size, permutations)
+            position = _LOG_HEADER.size
+
+        signature_bytes = self._log_settings[1] * 4
+        # A record another process is still writing is read on the next refresh
+        while position + _LOG_RECORD.size <= len(data):
+            operation, key_length = _LOG_RECORD.unpack_from(data, position)
+            key_end = position + _LOG_RECORD.size + key_length
+            end = key_end + (signature_bytes if operation == _ADD else 0)
+            if end > len(data):
+                break
+            key = data[position + _LOG_RECORD.size : key_end].decode("utf-8")
+            if operation == _ADD:
+                signature = np.frombuffer(data[key_end:end], dtype=np.uint32)
+                self._apply_add(key, signature)
+            else:
+                self._apply_remove(key)
+            self._log_records += 1
+            position = end
+        self._log_offset += position
+
+        if self._log_settings != (SHINGLE_SIZE, MINHASH_PERMUTATIONS):
+            self._resign()
+            # The next update rewrites the log with the new signatures
+            self._needs_compaction = True
+
+    def _resign(self) -> None:
+        """Recompute every signature from the stored texts after a settings change."""
+        print(f"🔄 MinHash settings changed, re-signing {len(self)} submissions")
+        for key in list(self.signatures):
+            text = self.read_text(key)
+            signature = minhash_signature(text) if text else None
+            if signature is None:
+                self._apply_remove(key)
+            else:
+                self._apply_add(key, signature)
+
+    def _append(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.log_path, "ab") as f:
+            if f.tell() == 0:
+                f.write(_LOG_HEADER.pack(_LOG_MAGIC, SHINGLE_SIZE, MINHASH_PERMUTATIONS))
+            f.write(b"".join(self._pending))
+            self._log_offset = f.tell()
+        stat = os.stat(self.log_path)
+        self._log_identity = (stat.st_dev, stat.st_ino)
+        self._log_records += len(self._pending)
+
+    def _compact(self) -> None:
+        """Rewrite the log with one record per live submission (tmp + os.replace)."""
+        os.makedirs(self.directory, exist_ok=True)
+        with atomic_write(self.log_path) as f:
+            f.write(_LOG_HEADER.pack(_LOG_MAGIC, SHINGLE_SIZE, MINHASH_PERMUTATIONS))
+            for key, signature in self.signatures.items():
+                f.write(self._record(_ADD, key, signature))
+            offset = f.tell()
+        stat = os.stat(self.log_path)
+        self._log_identity = (stat.st_dev, stat.st_ino)
+        self._log_offset = offset
+        self._log_records = len(self.signatures)
+        self._log_settings = (SHINGLE_SIZE, MINHASH_PERMUTATIONS)
+        self._needs_compaction = False
+
+        # Texts of submissions dropped by clear() (rebuild)
+        live = {_text_name(key) for key in self.signatures}
+        if os.path.isdir(self.texts_dir):
+            for name in os.listdir(self.texts_dir):
+                if name.endswith(".txt") and name not in live:
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(os.path.join(self.texts_dir, name))
+
+    @contextmanager
+    def updating(self) -> Iterator[None]:
+        """Lock, pick up changes of other workers, apply the update and persist it."""
+        os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+        with self._lock, file_lock(self.lock_path):
+            self.refresh()
+            try:
+                yield
+            except BaseException:
+                # Memory may be ahead of the log: rebuild it from the log next time
+                self._reset()
+                raise
+            dead = self._log_records + len(self._pending) - len(self)
+            if self._needs_compaction or dead > max(len(self), _MIN_COMPACT_RECORDS):
+                self._compact()
+            elif self._pending:
+                self._append()
+            self._pending.clear()
+
+    def candidates(self, signature: np.ndarray, exclude: str | None = None) -> set[str]:
+        """Keys sharing at least one LSH band with `signature`."""
+        found: set[str] = set()
+        for band, bucket_key in enumerate(_band_keys(signature)):
+            found.update(self._buckets[band].get(bucket_key, ()))
+        found.discard(exclude)
+        return found
+
+    def find_similar(
+        self,
+        preprocessed: str,
+        signature: np.ndarray,
+        threshold: float = NEAR_DUPLICATE_THRESHOLD,
+        exclude: str | None = None,
+    ) -> list[dict]:
+        """
+        Score the LSH candidates of a document with exact TF-IDF cosine similarity.
+
+        :return: Candidates with a score of at least `threshold`, most similar first.
+        """
+        keys: list[str] = []
+        texts: list[str] = []
+        for key in sorted(self.candidates(signature, exclude)):
+            text = self.read_text(key)
+            if text is not None:
+                keys.append(key)
+                texts.append(text)
+        if not keys:
+            return []
+
+        vectors = vectorize_many([preprocessed] + texts)
+        scores = (vectors[0] @ vectors[1:].T).toarray()[0]
+        matches = [
+            {
+                "key": key,
+                "score": float(score),
+                "jaccard_estimate": float(np.mean(self.signatures[key] == signature)),
+            }
+            for key, score in zip(keys, scores, strict=True)
+            if score >= threshold
+        ]
+        return sorted(matches, key=lambda match: match["score"], reverse=True)
+
+
+# One FingerprintIndex per professor_subject and process, refreshed from disk on use
+_indexes: dict[str, FingerprintIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(subject: str) -> FingerprintIndex:
+    with _indexes_lock:
+        index = _indexes.get(subject)
+        if index is None:
+            index = _indexes[subject] = FingerprintIndex(subject)
+        return index
+
+
+def index_submission(
+    key: str, text: str, threshold: float = NEAR_DUPLICATE_THRESHOLD
+) -> list[dict]:
+    """
+    Add an uploaded submission to the index of its professor_subject.
+
+    :param key: S3 key of the submission (professor_subject/assignment.ext).
+    :param text: Extracted text of the submission.
+    :return: Earlier submissions of the same professor_subject that are near duplicates.
+    """
+    preprocessed = preprocess_text_for_comparison(text)
+    signature = minhash_signature(preprocessed)
+    index = get_index(subject_of(key))
+    with index.updating():
+        if signature is None:
+            # Nothing to compare; drop an older version stored under the same key
+            index.remove(key)
+            return []
+        matches = index.find_similar(preprocessed, signature, threshold, exclude=key)
+        index.add(key, signature, preprocessed)
+    return matches
+
+
+def remove_submission(key: str) -> None:
+    """Drop a deleted submission from its index."""
+    index = get_index(subject_of(key))
+    with index.updating():
+        index.remove(key)
+
+
+def _list_submissions(client, bucket: str, prefix: str) -> dict[str, list[str]]:
+    """Indexable S3 keys grouped by professor_subject."""
+    subjects: dict[str, list[str]] = {}
+    paginator = client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for item in page.get("Contents", []):
+            key = item["Key"]
+            if "/" in key and key.lower().endswith(INDEXED_EXTENSIONS):
+                subjects.setdefault(subject_of(key), []).append(key)
+    return subjects
+
+
+def rebuild_from_bucket(
+    subject: str | None = None, client=None, bucket: str | None = None
+) -> dict[str, int]:
+    """
+    Rebuild the indexes from the submissions stored in the bucket.
+
+    :param subject: Only this professor_subject (all of them when None).
+    :param client: boto3 S3 client (s3_bucket.client by default; any S3 stand-in works).
+    :param bucket: Bucket name (BUCKET_NAME by default).
+    :return: Number of indexed submissions per professor_subject.
+    """
+    from .extract_file import extract_pages
+
+    if client is None or bucket is None:
+        from s3_bucket.client import endpoint_url, s3_client
+
+        client = client or s3_client
+        bucket = bucket or endpoint_url
+    if not bucket:
+        raise ValueError("Bucket name is not configured")
+
+    prefix = f"{subject.rstrip('/')}/" if subject else ""
+    counts: dict[str, int] = {}
+    for name, keys in _list_submissions(client, bucket, prefix).items():
+        if subject is not None and name != subject.rstrip("/"):
+            continue
+        index = get_index(name)
+        with index.updating():
+            index.clear()
+            for key in keys:
+                try:
+                    data = client.get_object(Bucket=bucket, Key=key)["Body"].read()
+                    pages = extract_pages(key, io.BytesIO(data))
+                except Exception as e:
+                    print(f"⚠️  Skipping {key}: {e}")
+                    continue
+                preprocessed = preprocess_text_for_comparison("\n".join(pages))
+                signature = minhash_signature(preprocessed)
+                if signature is not None:
+                    index.add(key, signature, preprocessed)
+        counts[name] = len(index)
+        print(f"✅ {name}: {len(index)} submissions indexed")
+    return counts
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rebuild the submission fingerprint index")
+    parser.add_argument("subject", nargs="?", help="professor_subject (default: all)")
+    args = parser.parse_args()
+    rebuild_from_bucket(args.subject)
@@ -1,3 +1,5 @@
+import heapq
+
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 
@@ -19,32 +21,83 @@ def preprocess_text_for_comparison(text: str) -> str:
     return " ".join([t for t in toks if t not in STOP_WORDS])
 
 
-def compare_two_text(file_a, file_b):
-    def ensure_str(x):
-        """
-        Normalize input to a single string.
-
-        Accepts either a string or a sequence (list or tuple) of elements such as
-        text fragments returned by extract_text. If a list or tuple is provided,
-        all elements are converted to strings and joined with newline characters.
-
-        :param x: A string, or a list/tuple of items that can be converted to strings.
-        :return: A single string representation of the input.
-        """
-        if isinstance(x, (list, tuple)):
-            # join elements (make sure elements are strings)
-            return "\n".join(str(e) for e in x)
-        return x
-
-    file_a = ensure_str(file_a)
-    file_b = ensure_str(file_b)
-
-    docs = [
-        preprocess_text_for_comparison(file_a),
-        preprocess_text_for_comparison(file_b),
-    ]
-    vec = TfidfVectorizer(ngram_range=(1, 3), stop_words=STOP_WORDS).fit_transform(docs)
+def _ensure_str(x):
+    """
+    Normalize input to a single string.
+
+    Accepts either a string or a sequence (list or tuple) of elements such as
+    text fragments returned by extract_text. If a list or tuple is provided,
+    all elements are converted to strings and joined with newline characters.
+
+    :param x: A string, or a list/tuple of items that can be converted to strings.
+    :return: A single string representation of the input.
+    """
+    if isinstance(x, (list, tuple)):
+        # join elements (make sure elements are strings)
+        return "\n".join(str(e) for e in x)
+    return x
+
+
+def vectorize_many(texts):
+    """
+    Preprocess any number of texts and fit one TF-IDF model (word 1-3 grams) over all of them.
+
+    Rows are L2-normalized, so the dot product of two rows is their cosine similarity.
+
+    :param texts: Texts (or extract_text fragment lists), one per document.
+    :return: Sparse TF-IDF matrix with one row per text.
+    """
+    docs = [preprocess_text_for_comparison(_ensure_str(text)) for text in texts]
+    return TfidfVectorizer(ngram_range=(1, 3), stop_words=STOP_WORDS).fit_transform(docs)
+
+
+def vectorize_texts(file_a, file_b):
+    """
+    Preprocess two texts and fit one TF-IDF model (word 1-3 grams) over both.
+
+    :return: Sparse TF-IDF matrix with one row per text.
+    """
+    return vectorize_many([file_a, file_b])
+
+
+def similarity_from_vectors(vec):
+    """Cosine similarity of the two TF-IDF rows as the /check_two_file result."""
     sim_matrix = cosine_similarity(vec)
     overall = float(sim_matrix[0, 1])
 
     return {"score": overall, "matrix": sim_matrix.tolist()}
+
+
+def compare_two_text(file_a, file_b):
+    return similarity_from_vectors(vectorize_texts(file_a, file_b))
+
+
+def iter_similar_pairs(vec, threshold=0.5, block_size=64):
+    """
+    Yield the document pairs of a TF-IDF matrix whose cosine similarity reaches `threshold`.
+
+    Similarities are computed as a sparse product of `block_size` rows against the
+    whole matrix, so memory stays bounded by one block even for large classes and
+    the dense N x N matrix is never built. Every unordered pair is reported once.
+
+    :param vec: Sparse, row-normalized TF-IDF matrix (see vectorize_many).
+    :param threshold: Minimum cosine similarity of a reported pair.
+    :param block_size: Rows multiplied at once.
+    :return: Iterator over lists of (i, j, score) with i < j, one list per block.
+    """
+    transposed = vec.T.tocsc()
+    for start in range(0, vec.shape[0], block_size):
+        block = (vec[start : start + block_size] @ transposed).tocoo()
+        rows = block.row + start
+        # Upper triangle only: skips self-similarity and the mirrored (j, i) pair
+        mask = (block.col > rows) & (block.data >= threshold)
+        yield [
+            (int(i), int(j), float(score))
+            for i, j, score in zip(rows[mask], block.col[mask], block.data[mask], strict=True)
+        ]
+
+
+def top_similar_pairs(vec, threshold=0.5, top_k=20):
+    """Return the `top_k` most similar document pairs above `threshold`, highest first."""
+    pairs = (pair for block in iter_similar_pairs(vec, threshold) for pair in block)
+    return heapq.nlargest(top_k, pairs, key=lambda pair: pair[2])
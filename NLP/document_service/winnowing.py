@@ -0,0 +1,289 @@
+"""
+Passage-level match localization with winnowing fingerprints.
+
+Both documents are tokenized the way normalize_text sees them (lowercase, Bosnian
+diacritics folded, runs of a-z letters as words), but every word keeps its
+character offsets in the original text. Word k-grams are hashed with a rolling
+polynomial hash, and winnowing keeps the rightmost minimum hash of every window
+of `window` consecutive k-grams. Any passage shared by both documents that is at
+least `window + k - 1` words long is guaranteed to share a fingerprint.
+
+Shared fingerprints are joined through a sorted hash array and chained along
+diagonals (same offset between the positions in the two documents) into
+passages, reported with character offsets and page numbers in both documents.
+Every step is a numpy pass over the document (linear in its length for fixed
+k and window); fingerprints are flat numpy arrays of hashes and word positions.
+"""
+
+import re
+import zlib
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Words per k-gram and k-grams per winnowing window: shared passages of at least
+# KGRAM_SIZE + WINDOW_SIZE - 1 = 8 words are always found
+KGRAM_SIZE = 5
+WINDOW_SIZE = 4
+# Fingerprints occurring more often than this in a document are boilerplate
+# (headers, citation formulas) and would only produce noise pairs
+MAX_HASH_OCCURRENCES = 8
+# Matches on the same diagonal this many words apart still form one passage
+MAX_GAP_WORDS = KGRAM_SIZE + WINDOW_SIZE
+
+_WORD = re.compile(r"[a-z]+")
+_HASH_BASE = np.uint64(1_000_003)
+# Same folding as normalize_text, which cannot be used directly as it drops offsets
+_FOLD = str.maketrans({"ć": "c", "č": "c", "đ": "d", "š": "s", "ž": "z"})
+
+
+class Fingerprints:
+    """Winnowed k-gram hashes of one document, with word and page offsets."""
+
+    __slots__ = (
+        "hashes",
+        "positions",
+        "word_hashes",
+        "word_starts",
+        "word_ends",
+        "page_starts",
+        "text",
+    )
+
+    def __init__(
+        self,
+        hashes: np.ndarray,
+        positions: np.ndarray,
+        word_hashes: np.ndarray,
+        word_starts: np.ndarray,
+        word_ends: np.ndarray,
+        page_starts: np.ndarray,
+        text: str,
+    ) -> None:
+        self.hashes = hashes  # uint64, one per selected k-gram
+        self.positions = positions  # int32 index of the k-gram's first word
+        self.word_hashes = word_hashes  # uint32 crc32 of every word, to extend matches
+        self.word_starts = word_starts  # int64 character offset of every word
+        self.word_ends = word_ends
+        self.page_starts = page_starts  # int64 character offset of every page
+        self.text = text
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    @property
+    def word_count(self) -> int:
+        return len(self.word_starts)
+
+    def page_of(self, offset: int) -> int:
+        """1-based page number of a character offset."""
+        return int(np.searchsorted(self.page_starts, offset, side="right"))
+
+
+def tokenize(text: str) -> tuple[list[str], np.ndarray, np.ndarray]:
+    """
+    Words of `text` as normalize_text produces them, with their character offsets.
+
+    :return: (words, start offsets, end offsets) into the original text.
+    """
+    folded = text.lower().translate(_FOLD)
+    if len(folded) != len(text):
+        # lower() changed the length (e.g. "İ"): fold character by character instead
+        folded = "".join(ch.lower().translate(_FOLD)[0] for ch in text)
+    words: list[str] = []
+    starts: list[int] = []
+    ends: list[int] = []
+    for match in _WORD.finditer(folded):
+        words.append(match.group())
+        starts.append(match.start())
+        ends.append(match.end())
+    return words, np.asarray(starts, dtype=np.int64), np.asarray(ends, dtype=np.int64)
+
+
+def hash_words(words: list[str]) -> np.ndarray:
+    return np.fromiter(
+        (zlib.crc32(word.encode("ascii")) for word in words), dtype=np.uint32, count=len(words)
+    )
+
+
+def kgram_hashes(word_hashes: np.ndarray, k: int = KGRAM_SIZE) -> np.ndarray:
+    """Polynomial hash of every run of k consecutive words (uint64, wraps on overflow)."""
+    if len(word_hashes) < k:
+        return np.zeros(0, dtype=np.uint64)
+    values = word_hashes.astype(np.uint64)
+    count = len(values) - k + 1
+    hashes = np.zeros(count, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for j in range(k):
+            hashes = hashes * _HASH_BASE + values[j : j + count]
+    return hashes
+
+
+def winnow(hashes: np.ndarray, window: int = WINDOW_SIZE) -> np.ndarray:
+    """
+    Positions selected by winnowing: the rightmost minimum of every window.
+
+    :return: Sorted, distinct k-gram positions (int32).
+    """
+    if len(hashes) == 0:
+        return np.zeros(0, dtype=np.int32)
+    if len(hashes) <= window:
+        reversed_argmin = int(np.argmin(hashes[::-1]))
+        return np.array([len(hashes) - 1 - reversed_argmin], dtype=np.int32)
+
+    windows = sliding_window_view(hashes, window)
+    # argmin returns the first minimum; on reversed windows that is the rightmost one
+    rightmost = window - 1 - np.argmin(windows[:, ::-1], axis=1)
+    selected = np.arange(len(windows)) + rightmost
+    # Consecutive windows usually select the same k-gram: keep each position once
+    keep = np.empty(len(selected), dtype=bool)
+    keep[0] = True
+    keep[1:] = selected[1:] != selected[:-1]
+    return selected[keep].astype(np.int32)
+
+
+def fingerprint(
+    document: str | list[str], k: int = KGRAM_SIZE, window: int = WINDOW_SIZE
+) -> Fingerprints:
+    """
+    Winnowing fingerprints of a document.
+
+    :param document: Text, or the pages returned by extract_pages.
+    """
+    pages = [document] if isinstance(document, str) else list(document)
+    text = "\n".join(pages)
+    page_starts = np.zeros(len(pages), dtype=np.int64)
+    if len(pages) > 1:
+        np.cumsum([len(page) + 1 for page in pages[:-1]], out=page_starts[1:])
+
+    words, word_starts, word_ends = tokenize(text)
+    word_hashes = hash_words(words)
+    hashes = kgram_hashes(word_hashes, k)
+    positions = winnow(hashes, window)
+    return Fingerprints(
+        hashes[positions], positions, word_hashes, word_starts, word_ends, page_starts, text
+    )
+
+
+def _shared_positions(a: Fingerprints, b: Fingerprints) -> tuple[np.ndarray, np.ndarray]:
+    """All (position in a, position in b) pairs with the same fingerprint hash."""
+    order = np.argsort(b.hashes, kind="stable")
+    sorted_hashes = b.hashes[order]
+    left = np.searchsorted(sorted_hashes, a.hashes, side="left")
+    right = np.searchsorted(sorted_hashes, a.hashes, side="right")
+    counts = right - left
+
+    _, inverse, a_counts = np.unique(a.hashes, return_inverse=True, return_counts=True)
+    useful = (counts > 0) & (counts <= MAX_HASH_OCCURRENCES)
+    useful &= a_counts[inverse] <= MAX_HASH_OCCURRENCES
+    if not useful.any():
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    a_index = np.repeat(np.flatnonzero(useful), counts[useful])
+    # Offsets 0..count-1 inside every run of equal hashes in b
+    starts = np.repeat(left[useful], counts[useful])
+    run_offsets = np.arange(len(a_index)) - np.repeat(
+        np.cumsum(counts[useful]) - counts[useful], counts[useful]
+    )
+    b_index = order[starts + run_offsets]
+    return a.positions[a_index].astype(np.int64), b.positions[b_index].astype(np.int64)
+
+
+def _extend(
+    a: Fingerprints, b: Fingerprints, start_a: int, end_a: int, start_b: int, end_b: int
+) -> tuple[int, int, int, int]:
+    """Grow a matched word span in both directions while the words stay equal."""
+    while start_a > 0 and start_b > 0 and a.word_hashes[start_a - 1] == b.word_hashes[start_b - 1]:
+        start_a -= 1
+        start_b -= 1
+    while (
+        end_a + 1 < a.word_count
+        and end_b + 1 < b.word_count
+        and a.word_hashes[end_a + 1] == b.word_hashes[end_b + 1]
+    ):
+        end_a += 1
+        end_b += 1
+    return start_a, end_a, start_b, end_b
+
+
+def _span(fp: Fingerprints, first_word: int, last_word: int, excerpt: int) -> dict:
+    start = int(fp.word_starts[first_word])
+    end = int(fp.word_ends[last_word])
+    return {
+        "start": start,
+        "end": end,
+        "page_start": fp.page_of(start),
+        "page_end": fp.page_of(end - 1),
+        "text": fp.text[start:end][:excerpt],
+    }
+
+
+def match_passages(
+    a: Fingerprints,
+    b: Fingerprints,
+    k: int = KGRAM_SIZE,
+    min_words: int | None = None,
+    excerpt: int = 300,
+) -> dict:
+    """
+    Passages of document a that also appear in document b.
+
+    :param min_words: Shortest reported passage (default k + WINDOW_SIZE - 1 words).
+    :param excerpt: Characters of each passage's text included in the result.
+    :return: {"passages": [{"words", "a", "b"}], "coverage_a", "coverage_b"}; every side of a
+        passage has character offsets (end exclusive), pages and an excerpt.
+    """
+    min_words = min_words or k + WINDOW_SIZE - 1
+    pos_a, pos_b = _shared_positions(a, b)
+
+    passages = []
+    covered_a = np.zeros(a.word_count, dtype=bool)
+    covered_b = np.zeros(b.word_count, dtype=bool)
+    if len(pos_a):
+        # Chain matches along diagonals: a copied passage keeps pos_a - pos_b constant
+        diagonal = pos_a - pos_b
+        order = np.lexsort((pos_a, diagonal))
+        diagonal, pos_a, pos_b = diagonal[order], pos_a[order], pos_b[order]
+        breaks = np.flatnonzero(
+            (diagonal[1:] != diagonal[:-1]) | (pos_a[1:] - pos_a[:-1] > MAX_GAP_WORDS)
+        )
+        run_starts = np.concatenate(([0], breaks + 1))
+        run_ends = np.concatenate((breaks, [len(pos_a) - 1]))
+        # Longest runs first, so repeated text cannot claim a copied passage
+        longest = np.argsort(pos_a[run_starts] - pos_a[run_ends], kind="stable")
+
+        for first, last in zip(run_starts[longest], run_ends[longest], strict=True):
+            # Fingerprints are sparse: the shared text can reach up to a window further
+            start_a, end_a, start_b, end_b = _extend(
+                a,
+                b,
+                int(pos_a[first]),
+                int(pos_a[last]) + k - 1,
+                int(pos_b[first]),
+                int(pos_b[last]) + k - 1,
+            )
+            words = end_a - start_a + 1
+            # Runs inside an already reported passage come from repeated text
+            if words < min_words or covered_a[start_a : end_a + 1].all():
+                continue
+            covered_a[start_a : end_a + 1] = True
+            covered_b[start_b : end_b + 1] = True
+            passages.append(
+                {
+                    "words": words,
+                    "a": _span(a, start_a, end_a, excerpt),
+                    "b": _span(b, start_b, end_b, excerpt),
+                }
+            )
+
+    passages.sort(key=lambda passage: passage["a"]["start"])
+    return {
+        "passages": passages,
+        "coverage_a": round(float(covered_a.mean()), 4) if a.word_count else 0.0,
+        "coverage_b": round(float(covered_b.mean()), 4) if b.word_count else 0.0,
+    }
+
+
+def compare_passages(document_a: str | list[str], document_b: str | list[str]) -> dict:
+    """Fingerprint two documents (texts or page lists) and return their shared passages."""
+    return match_passages(fingerprint(document_a), fingerprint(document_b))
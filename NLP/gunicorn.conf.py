@@ -0,0 +1,99 @@
+"""
+Gunicorn konfiguracija za NLP servis.
+
+Aplikacija se uvijek učitava u masteru (preload_app) i workeri je nasljeđuju
+copy-on-write nakon fork-a. Embedding model i FAISS index:
+- RAG_BACKGROUND_INIT=false (podrazumijevano pod gunicornom): master ih jednom
+  učitava prije otvaranja porta, a workeri ih dijele copy-on-write. Port se
+  otvara tek kada je model učitan (desetine sekundi na hladnom startu).
+- RAG_BACKGROUND_INIT=true (izričit izbor): master ih ne učitava; svaki worker
+  ih učitava u pozadinskoj niti nakon fork-a (post_fork) i odmah prima zahtjeve
+  (/search do tada koristi keyword pretragu), pa je port otvoren za par sekundi.
+
+Kompromis: pozadinski režim brže otvara port, ali svaki worker ima svoju kopiju
+težina modela (~470 MB torch, ~120 MB ONNX int8) i BM25 indexa, pa memorija raste
+sa WEB_CONCURRENCY. Chunks i vektori flat indexa su memory-mapped i dijele se
+kroz page cache u oba režima. RAG_BACKGROUND_INIT=true ima smisla samo kada health
+check ne može čekati učitavanje modela, a memorije ima za sve workere.
+
+Dimenzionisanje (na N fizičkih jezgri):
+- WEB_CONCURRENCY (workeri) x TORCH_NUM_THREADS <= N, jer encode pitanja troši
+  CPU, a torch (ili ONNX Runtime) intra-op niti svakog workera se inače
+  takmiče za iste jezgre.
+- GUNICORN_THREADS pokriva I/O čekanje na LLM; te niti ne troše CPU.
+- Primjer za 4 jezgre: 2 workera x 2 torch niti, 4 gunicorn niti po workeru.
+
+Async /search (asgi.py) koristi isti config sa `-k uvicorn_worker.UvicornWorker`;
+tada GUNICORN_THREADS nema efekta, a LLM konkurentnost ograničava LLM_MAX_CONCURRENCY.
+"""
+
+import gc
+import multiprocessing
+import os
+import shutil
+
+# HF tokenizers pool nije fork-safe; isključi ga prije nego što se model učita
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+# Prometheus metrike (/metrics) se agregiraju preko svih workera kroz zajednički
+# direktorij; mora biti postavljeno prije nego što se aplikacija importuje
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/nlp-prometheus")
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+# Kod aplikacije, biblioteke i (uz sinhrono učitavanje) model dijele se copy-on-write
+preload_app = True
+
+# Jedna kopija modela za sve workere, osim ako nije izričito traženo učitavanje po
+# workeru; postavlja se prije importa aplikacije (app.rag_loader ga čita)
+os.environ.setdefault("RAG_BACKGROUND_INIT", "false")
+RAG_BACKGROUND_INIT = os.environ["RAG_BACKGROUND_INIT"].lower() == "true"
+if RAG_BACKGROUND_INIT:
+    # Master ne pokreće loader (nit ne preživljava fork); pokreće ga post_fork u workeru
+    os.environ["RAG_LOAD_AFTER_FORK"] = "true"
+
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+worker_class = "gthread"
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+
+torch_threads = int(
+    os.environ.get("TORCH_NUM_THREADS", max(1, multiprocessing.cpu_count() // workers))
+)
+# ONNX backend (rag.embedding_backend) čita isti broj intra-op niti iz okruženja;
+# bez ovoga bi ONNX Runtime u svakom workeru koristio sve jezgre
+os.environ["TORCH_NUM_THREADS"] = str(torch_threads)
+
+
+def on_starting(server):
+    # Uzorci prethodnog pokretanja bi se sabrali sa novim
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+
+
+def when_ready(server):
+    # Zamrzni objekte učitane u masteru da ih GC u workerima ne dira
+    # (inače brojanje referenci/GC prolazi kopiraju dijeljene stranice)
+    gc.freeze()
+    server.log.info("Server spreman, torch niti po workeru: %s", torch_threads)
+
+
+def post_fork(server, worker):
+    try:
+        import torch
+
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+
+    if RAG_BACKGROUND_INIT:
+        from app.routes import rag_loader
+
+        rag_loader.start(background=True)
+
+
+def child_exit(server, worker):
+    # Gauge-ovi (LLM pozivi u toku) ugaslog workera se više ne računaju
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
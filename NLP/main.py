@@ -1,25 +1,12 @@
 import os
 
-from flask import Flask
-from flask_cors import CORS
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
+from app import create_app
 
-from app.routes import main_bp
+# Procesi poola za ekstrakciju PDF-a (spawn) uz `python main.py` ponovo izvršavaju
+# ovaj fajl kao __mp_main__; njima treba samo ekstrakcija, ne još jedna aplikacija
+app = create_app() if __name__ != "__mp_main__" else None
 
-app = Flask(__name__)
-CORS(app)
-
-# Configure rate limiter WITHOUT default limits (only apply to specific routes)
-limiter = Limiter(
-    app=app,
-    key_func=get_remote_address,
-    storage_uri="memory://",
-)
-
-app.register_blueprint(main_bp)
-
-if __name__ == "__main__":
+if __name__ == "__main__" and app is not None:
     port = int(os.environ.get("PORT", 5000))
     debug = os.environ.get("FLASK_ENV", "development") == "development"
     # use_reloader=False sprječava Werkzeug child-process restart koji crashuje
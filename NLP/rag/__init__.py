@@ -0,0 +1,50 @@
+"""
+Pomoćne komponente RAG sistema (embedding store, keširanje, indeksi)
+"""
+
+from .answer_cache import SemanticAnswerCache, context_fingerprint
+from .atomic_file import atomic_path, atomic_write
+from .bm25 import BM25Index, reciprocal_rank_fusion
+from .chunk_store import ChunkStore, chunk_store_exists, write_chunk_store
+from .chunker import batched, iter_chunks, split_sentences
+from .context_builder import ContextAssembler, TokenCounter, format_context
+from .corpus import NO_PAGE, ChunkMetadata, DocumentCorpus, write_chunk_metadata
+from .embedding_backend import OnnxEmbeddingModel, embedding_model_id, load_embedding_model
+from .embedding_cache import QueryEmbeddingCache, normalize_query
+from .embedding_store import EmbeddingStore, chunk_hash
+from .file_lock import file_lock
+from .index_factory import build_index, choose_index_type, configure_search, resolve_index_type
+
+__all__ = [
+    "NO_PAGE",
+    "BM25Index",
+    "ChunkMetadata",
+    "ChunkStore",
+    "ContextAssembler",
+    "DocumentCorpus",
+    "EmbeddingStore",
+    "OnnxEmbeddingModel",
+    "QueryEmbeddingCache",
+    "SemanticAnswerCache",
+    "TokenCounter",
+    "atomic_path",
+    "atomic_write",
+    "batched",
+    "build_index",
+    "choose_index_type",
+    "chunk_hash",
+    "chunk_store_exists",
+    "configure_search",
+    "context_fingerprint",
+    "embedding_model_id",
+    "file_lock",
+    "format_context",
+    "iter_chunks",
+    "load_embedding_model",
+    "normalize_query",
+    "reciprocal_rank_fusion",
+    "resolve_index_type",
+    "split_sentences",
+    "write_chunk_metadata",
+    "write_chunk_store",
+]
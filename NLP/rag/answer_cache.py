@@ -0,0 +1,122 @@
+"""
+Semantički cache odgovora LLM-a.
+Odgovor se vraća iz cachea ako je novo pitanje dovoljno slično (cosine similarity)
+već odgovorenom pitanju i ako je pronađeni kontekst identičan.
+"""
+
+from collections import OrderedDict
+import hashlib
+import itertools
+import threading
+import time
+from typing import Any
+
+import numpy as np
+
+
+def context_fingerprint(context: str) -> str:
+    """SHA-256 fingerprint konteksta poslanog LLM-u"""
+    return hashlib.sha256(context.encode("utf-8")).hexdigest()
+
+
+class SemanticAnswerCache:
+    def __init__(
+        self, max_size: int = 512, ttl_seconds: float = 3600.0, threshold: float = 0.95
+    ) -> None:
+        """
+        Args:
+            max_size: Maksimalan broj keširanih odgovora (0 isključuje cache)
+            ttl_seconds: Vrijeme važenja odgovora u sekundama (0 = bez isteka)
+            threshold: Minimalna cosine sličnost pitanja za pogodak
+        """
+        self.max_size: int = max_size
+        self.ttl_seconds: float = ttl_seconds
+        self.threshold: float = threshold
+        # id -> (vrijeme spremanja, fingerprint konteksta, embedding pitanja, odgovor)
+        self._entries: OrderedDict[int, tuple[float, str, np.ndarray, str]] = OrderedDict()
+        # fingerprint konteksta -> id-jevi unosa sa tim kontekstom
+        self._by_context: dict[str, set[int]] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.invalidations: int = 0
+
+    def _remove(self, entry_id: int) -> None:
+        _, fingerprint, _, _ = self._entries.pop(entry_id)
+        bucket = self._by_context[fingerprint]
+        bucket.discard(entry_id)
+        if not bucket:
+            del self._by_context[fingerprint]
+
+    def get(self, query_embedding: np.ndarray, context: str) -> str | None:
+        """
+        Traži odgovor za slično pitanje sa istim kontekstom
+
+        Args:
+            query_embedding: Normalizovan embedding pitanja
+            context: Kontekst koji bi bio poslan LLM-u
+
+        Returns:
+            Keširani odgovor ili None
+        """
+        fingerprint = context_fingerprint(context)
+        vector = np.asarray(query_embedding, dtype="float32").reshape(-1)
+
+        with self._lock:
+            now = time.monotonic()
+            candidates = list(self._by_context.get(fingerprint, ()))
+            if self.ttl_seconds:
+                for entry_id in candidates:
+                    if now - self._entries[entry_id][0] > self.ttl_seconds:
+                        self._remove(entry_id)
+                candidates = [i for i in candidates if i in self._entries]
+
+            if candidates:
+                matrix = np.vstack([self._entries[i][2] for i in candidates])
+                similarities = matrix @ vector
+                best = int(np.argmax(similarities))
+                if float(similarities[best]) >= self.threshold:
+                    entry_id = candidates[best]
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return self._entries[entry_id][3]
+
+            self.misses += 1
+            return None
+
+    def put(self, query_embedding: np.ndarray, context: str, answer: str) -> None:
+        """Sprema odgovor i izbacuje najstarije korištene unose preko limita"""
+        if self.max_size <= 0:
+            return
+        fingerprint = context_fingerprint(context)
+        vector = np.asarray(query_embedding, dtype="float32").reshape(-1)
+
+        with self._lock:
+            entry_id = next(self._ids)
+            self._entries[entry_id] = (time.monotonic(), fingerprint, vector, answer)
+            self._by_context.setdefault(fingerprint, set()).add(entry_id)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        """Poništava sve odgovore (npr. nakon rebuilda knowledge base-a)"""
+        with self._lock:
+            self._entries.clear()
+            self._by_context.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict[str, Any]:
+        """Brojači za /status"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,37 @@
+"""
+Atomsko upisivanje artefakata: sadržaj ide u privremeni fajl koji os.replace
+zamjenjuje tek kada je potpuno upisan, pa prekid upisa (pad procesa, greška)
+nikad ne ostavlja polovičan fajl koji bi kasnije učitavanje prihvatilo.
+"""
+
+from collections.abc import Iterator
+import contextlib
+from contextlib import contextmanager
+import os
+from typing import IO, Any
+
+
+@contextmanager
+def atomic_path(path: str) -> Iterator[str]:
+    """
+    Privremena putanja za upis fajla `path` (npr. za faiss.write_index)
+
+    Po izlasku iz bloka privremeni fajl zamjenjuje `path`; ako blok baci
+    grešku, privremeni fajl se briše, a postojeći `path` ostaje netaknut.
+    """
+    # PID u imenu: dva procesa nikad ne pišu u isti privremeni fajl
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = "wb", encoding: str | None = None) -> Iterator[IO[Any]]:
+    """Otvoren privremeni fajl koji po izlasku iz bloka atomski zamjenjuje `path`"""
+    with atomic_path(path) as tmp_path, open(tmp_path, mode, encoding=encoding) as f:
+        yield f
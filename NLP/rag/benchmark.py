@@ -0,0 +1,241 @@
+"""
+Benchmark kvaliteta i brzine pretrage RAG sistema.
+
+    python -m rag.benchmark                                  # ispis rezultata
+    python -m rag.benchmark --output bench.json              # JSON za poređenje
+    python -m rag.benchmark --compare bench.json             # razlike u odnosu na raniji run
+    RAG_INDEX_TYPE=hnsw RAG_CHUNK_MAX_TOKENS=96 python -m rag.benchmark --output hnsw.json
+
+Dataset (rag/benchmark_dataset.json, verzionisan) sadrži pitanja i odlomke
+knowledge base-a; pronađeni chunk je tačan ako sadrži neki od odlomaka, pa
+dataset ostaje važeći i kada se promijeni chunkovanje. Mjeri se recall@k, MRR,
+udio odbijenih pitanja van knowledge base-a (off_topic, ne smiju vratiti
+nijedan rezultat) te p50/p95/p99 trajanja faza: encode pitanja, pretraga (FAISS + BM25 + RRF),
+sklapanje konteksta i LLM (zamijenjen stubom, bez mrežnih poziva).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any
+
+import faiss
+import numpy as np
+
+DATASET_PATH = os.path.join(os.path.dirname(__file__), "benchmark_dataset.json")
+DEFAULT_K = (1, 3, 5)
+STAGES = ("encode", "search", "context", "llm", "total")
+
+
+def load_dataset(path: str) -> dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        dataset = json.load(f)
+    if not dataset.get("questions"):
+        raise ValueError(f"Dataset {path} nema pitanja")
+    return dataset
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+def first_relevant_rank(results: list[str], expected: list[str]) -> int | None:
+    """Rang (od 1) prvog chunka koji sadrži neki od očekivanih odlomaka"""
+    snippets = [_normalize(snippet) for snippet in expected]
+    for rank, chunk in enumerate(results, 1):
+        text = _normalize(chunk)
+        if any(snippet in text for snippet in snippets):
+            return rank
+    return None
+
+
+def stub_llm(query: str, context: str) -> str:
+    """Zamjena za LLM: benchmark mjeri samo pipeline prije generisanja odgovora"""
+    return context[:200]
+
+
+def _percentiles(samples: list[float]) -> dict[str, float]:
+    values = np.asarray(samples) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "p50": round(float(p50), 3),
+        "p95": round(float(p95), 3),
+        "p99": round(float(p99), 3),
+        "mean": round(float(values.mean()), 3),
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def run_benchmark(
+    rag: Any, dataset: dict[str, Any], ks: tuple[int, ...] = DEFAULT_K, repeat: int = 3
+) -> dict[str, Any]:
+    """
+    Pokreće sva pitanja dataseta kroz pipeline pretrage
+
+    Args:
+        rag: Inicijalizovan RAGSystem
+        dataset: Učitan dataset (load_dataset)
+        ks: Vrijednosti k za recall@k
+        repeat: Broj mjerenja po pitanju (prvi prolaz je zagrijavanje i ne mjeri se)
+
+    Returns:
+        Rezultati spremni za JSON
+    """
+    import rag_system
+
+    n_results = max(ks)
+    faiss_k = (
+        max(n_results, rag_system.HYBRID_CANDIDATES) if rag_system.HYBRID_SEARCH else n_results
+    )
+    timings: dict[str, list[float]] = {stage: [] for stage in STAGES}
+    ranks: dict[str, int | None] = {}
+
+    for item in dataset["questions"]:
+        query = item["question"]
+        for attempt in range(repeat + 1):
+            # Encode direktno kroz model: cache pitanja bi sakrio trošak modela
+            start = time.perf_counter()
+            embedding = np.asarray(rag.model.encode([query]), dtype="float32")
+            faiss.normalize_L2(embedding)
+            encoded = time.perf_counter()
+
+            scores, indices = rag.index.search(embedding, faiss_k)
+            results = rag._format_results(query, scores[0], indices[0], n_results)
+            searched = time.perf_counter()
+
+            if results["ids"]:
+                context = rag.context_assembler.assemble(rag.chunks, results["ids"])["context"]
+            else:
+                context = ""
+            assembled = time.perf_counter()
+
+            stub_llm(query, context)
+            done = time.perf_counter()
+
+            if attempt == 0:
+                ranks[item["id"]] = first_relevant_rank(results["results"], item["expected"])
+                continue
+            timings["encode"].append(encoded - start)
+            timings["search"].append(searched - encoded)
+            timings["context"].append(assembled - searched)
+            timings["llm"].append(done - assembled)
+            timings["total"].append(done - start)
+
+    total = len(ranks)
+    quality: dict[str, float] = {}
+    for k in ks:
+        hits = sum(1 for rank in ranks.values() if rank is not None and rank <= k)
+        quality[f"recall@{k}"] = round(hits / total, 4)
+    quality["mrr"] = round(sum(1 / rank for rank in ranks.values() if rank) / total, 4)
+
+    # Pitanja bez odgovora u knowledge base-u: svaki rezultat je lažan kontekst za LLM
+    off_topic = dataset.get("off_topic", [])
+    answered = [item["id"] for item in off_topic if rag.search(item["question"], n_results)["ids"]]
+    if off_topic:
+        quality["off_topic_rejected"] = round(1 - len(answered) / len(off_topic), 4)
+
+    with open(rag.knowledge_base_path, "rb") as f:
+        kb_sha256 = hashlib.sha256(f.read()).hexdigest()
+
+    return {
+        "commit": _git_commit(),
+        "dataset": {
+            "version": dataset["version"],
+            "questions": total,
+            "knowledge_base_changed": kb_sha256 != dataset.get("knowledge_base_sha256"),
+        },
+        "config": {
+            "embedding_model": rag.model_id,
+            "index_type": type(rag.index).__name__,
+            "chunks": len(rag.chunks),
+            "chunk_max_tokens": rag_system.CHUNK_MAX_TOKENS,
+            "chunk_overlap_tokens": rag_system.CHUNK_OVERLAP_TOKENS,
+            "similarity_threshold": rag_system.SIMILARITY_THRESHOLD,
+            "hybrid_search": rag_system.HYBRID_SEARCH,
+            "hybrid_bm25_min_coverage": rag_system.HYBRID_BM25_MIN_COVERAGE,
+            "context_token_budget": rag_system.CONTEXT_TOKEN_BUDGET,
+            "repeat": repeat,
+        },
+        "quality": quality,
+        "latency_ms": {stage: _percentiles(samples) for stage, samples in timings.items()},
+        "misses": sorted(qid for qid, rank in ranks.items() if rank is None),
+        "off_topic_answered": sorted(answered),
+    }
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any]) -> list[str]:
+    """
+    Ispisuje razlike u odnosu na raniji run
+
+    Returns:
+        Metrike kvaliteta koje su se pogoršale
+    """
+    print(f"\n📊 Poređenje sa {baseline.get('commit') or 'baseline'}:")
+    regressions = []
+    for name, value in current["quality"].items():
+        before = baseline["quality"].get(name)
+        if before is None:
+            continue
+        print(f"   {name}: {before} -> {value} ({value - before:+.4f})")
+        if value < before:
+            regressions.append(name)
+    for stage, stats in current["latency_ms"].items():
+        before = baseline["latency_ms"].get(stage)
+        if before:
+            print(f"   {stage} p95: {before['p95']} -> {stats['p95']} ms")
+    new_misses = sorted(set(current["misses"]) - set(baseline.get("misses", [])))
+    if new_misses:
+        print(f"   ❌ Nova promašena pitanja: {', '.join(new_misses)}")
+    new_answered = sorted(
+        set(current["off_topic_answered"]) - set(baseline.get("off_topic_answered", []))
+    )
+    if new_answered:
+        print(f"   ❌ Nova off-topic pitanja sa rezultatima: {', '.join(new_answered)}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark RAG pretrage")
+    parser.add_argument("--dataset", default=DATASET_PATH)
+    parser.add_argument("--k", type=int, nargs="+", default=list(DEFAULT_K))
+    parser.add_argument("--repeat", type=int, default=3, help="Mjerenja po pitanju")
+    parser.add_argument("--output", help="Putanja JSON fajla sa rezultatima")
+    parser.add_argument("--compare", help="JSON ranijeg runa; izlazni kod 1 ako kvalitet padne")
+    args = parser.parse_args()
+
+    from rag_system import RAGSystem
+
+    dataset = load_dataset(args.dataset)
+    result = run_benchmark(RAGSystem(), dataset, tuple(sorted(args.k)), args.repeat)
+    if result["dataset"]["knowledge_base_changed"]:
+        print("⚠️  Knowledge base se promijenio od kreiranja dataseta, provjerite odlomke")
+
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"💾 Rezultati sačuvani u {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f))
+        if regressions:
+            print(f"❌ Pogoršanje: {', '.join(regressions)}")
+            sys.exit(1)
@@ -0,0 +1,179 @@
+"""
+BM25 inverted index nad istim chunks kao FAISS index, za hibridnu pretragu.
+Tačni tokeni (brojevi telefona, adrese, cijene, imena) često imaju nisku cosine
+sličnost, ali ih BM25 pouzdano pronalazi.
+
+BM25 težine se računaju unaprijed pri buildu, pa je pretraga samo sabiranje
+težina iz posting lista tokena pitanja.
+"""
+
+from collections import Counter
+import re
+
+import numpy as np
+
+from .atomic_file import atomic_write
+
+_DIACRITICS = str.maketrans({"č": "c", "ć": "c", "ž": "z", "š": "s", "đ": "d"})
+_TOKEN_RE = re.compile(r"\w+")
+
+# Funkcijske riječi pitanja (već bez dijakritika, kao iz tokenize): ima ih
+# gotovo svaki chunk, pa bi same po sebi vraćale kontekst za bilo koje pitanje
+_STOPWORDS_TEXT = """
+a ako ali bi bih bio bila bilo biti da do gdje i ih ili ima imam imate iz ja je
+jer jesu jeste joj ju ka kad kada kako ko koja koje koji kojoj kojom koju kod
+koliko li me mi mogu moze na nam nas ne nego neki nema ni nije o od on ona oni
+ono ova ovaj ove ovi ovo po pa pri s sa sam se si smo ste su sta sto ta taj te
+ti to tu u uz vam vas vi za zasto zbog
+an and are can does for how in is of or the what when where which who
+"""
+STOPWORDS = frozenset(_STOPWORDS_TEXT.split())
+
+
+def tokenize(text: str) -> list[str]:
+    """Mala slova, bez dijakritika ("košta" == "kosta"), alfanumerički tokeni"""
+    return _TOKEN_RE.findall(text.casefold().translate(_DIACRITICS))
+
+
+def reciprocal_rank_fusion(rankings: list[list[int]], k: int = 60) -> list[tuple[int, float]]:
+    """
+    Spaja više rangiranih lista id-jeva (Reciprocal Rank Fusion)
+
+    Args:
+        rankings: Liste id-jeva, svaka sortirana od najboljeg
+        k: RRF konstanta (veći k = manji uticaj vrha liste)
+
+    Returns:
+        Lista (id, rrf_score) sortirana od najboljeg
+    """
+    scores: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    def __init__(
+        self,
+        vocabulary: dict[str, int],
+        offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        weights: np.ndarray,
+        n_docs: int,
+    ) -> None:
+        """
+        Args:
+            vocabulary: token -> id tokena
+            offsets: Početak posting liste svakog tokena u doc_ids/weights (n_terms + 1)
+            doc_ids: Id-jevi chunks, posting liste tokena jedna za drugom
+            weights: Unaprijed izračunate BM25 težine za (token, chunk) parove
+            n_docs: Broj chunks
+        """
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.n_docs = n_docs
+
+    @classmethod
+    def build(cls, chunks: list[str], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        """Gradi index iz liste chunks"""
+        term_counts = [Counter(tokenize(chunk)) for chunk in chunks]
+        doc_lengths = np.array([sum(counts.values()) for counts in term_counts], dtype="float32")
+        avg_length = float(doc_lengths.mean()) if len(chunks) else 0.0
+
+        postings: dict[str, list[tuple[int, int]]] = {}
+        for doc_id, counts in enumerate(term_counts):
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((doc_id, tf))
+
+        vocabulary: dict[str, int] = {}
+        offsets = [0]
+        doc_ids: list[int] = []
+        weights: list[float] = []
+        n_docs = len(chunks)
+        for term_id, (term, plist) in enumerate(sorted(postings.items())):
+            vocabulary[term] = term_id
+            idf = np.log(1.0 + (n_docs - len(plist) + 0.5) / (len(plist) + 0.5))
+            for doc_id, tf in plist:
+                norm = k1 * (1.0 - b + b * doc_lengths[doc_id] / avg_length)
+                doc_ids.append(doc_id)
+                weights.append(float(idf * tf * (k1 + 1.0) / (tf + norm)))
+            offsets.append(len(doc_ids))
+
+        return cls(
+            vocabulary,
+            np.array(offsets, dtype=np.int64),
+            np.array(doc_ids, dtype=np.int32),
+            np.array(weights, dtype=np.float32),
+            n_docs,
+        )
+
+    def _idf(self, doc_freq: int) -> float:
+        return float(np.log(1.0 + (self.n_docs - doc_freq + 0.5) / (doc_freq + 0.5)))
+
+    def search(
+        self, query: str, n_results: int, min_coverage: float = 0.0
+    ) -> list[tuple[int, float]]:
+        """
+        Vraća najbolje chunks za pitanje
+
+        Args:
+            query: Pitanje (funkcijske riječi iz STOPWORDS se ignorišu)
+            n_results: Maksimalan broj rezultata
+            min_coverage: Minimalan udio IDF težine pitanja koji chunk mora
+                pokriti (0-1); riječi kojih nema u indexu računaju se kao najrjeđe
+
+        Returns:
+            Lista (id chunka, BM25 score) sortirana od najboljeg, samo score > 0
+        """
+        terms = {t for t in tokenize(query) if t not in STOPWORDS}
+        term_ids = [self.vocabulary[t] for t in terms if t in self.vocabulary]
+        if not term_ids or n_results <= 0:
+            return []
+
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        coverage = np.zeros(self.n_docs, dtype=np.float32)
+        # Nepoznata riječ je rjeđa od svake poznate: IDF kao da je u jednom chunku
+        query_idf = self._idf(1) * (len(terms) - len(term_ids))
+        for term_id in term_ids:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            idf = self._idf(int(end - start))
+            query_idf += idf
+            np.add.at(scores, self.doc_ids[start:end], self.weights[start:end])
+            coverage[self.doc_ids[start:end]] += idf
+
+        n_results = min(n_results, self.n_docs)
+        top = np.argpartition(-scores, n_results - 1)[:n_results]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (int(i), float(scores[i]))
+            for i in top
+            if scores[i] > 0 and coverage[i] >= min_coverage * query_idf
+        ]
+
+    def save(self, path: str) -> None:
+        """Atomski upisuje index (npz, bez pickle-a)"""
+        terms = sorted(self.vocabulary, key=self.vocabulary.__getitem__)
+        with atomic_write(path) as f:
+            np.savez(
+                f,
+                terms=np.array(terms, dtype=str),
+                offsets=self.offsets,
+                doc_ids=self.doc_ids,
+                weights=self.weights,
+                n_docs=np.array(self.n_docs),
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with np.load(path, allow_pickle=False) as data:
+            vocabulary = {str(term): i for i, term in enumerate(data["terms"])}
+            return cls(
+                vocabulary,
+                data["offsets"],
+                data["doc_ids"],
+                data["weights"],
+                int(data["n_docs"]),
+            )
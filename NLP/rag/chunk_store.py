@@ -0,0 +1,94 @@
+"""
+Memory-mapped store text chunks bez pickle-a.
+Na disku: niz offseta (.offsets.npy, int64, n + 1 elemenata) i UTF-8 blob (.bin).
+Više procesa (gunicorn workera) dijeli iste stranice kroz OS page cache.
+"""
+
+from collections.abc import Iterator, Sequence
+import mmap
+import os
+
+import numpy as np
+
+from .atomic_file import atomic_write
+
+
+def _paths(prefix: str) -> tuple[str, str]:
+    return prefix + ".offsets.npy", prefix + ".bin"
+
+
+def chunk_store_exists(prefix: str) -> bool:
+    return all(os.path.exists(path) for path in _paths(prefix))
+
+
+def write_chunk_store(prefix: str, chunks: Sequence[str]) -> None:
+    """
+    Atomski upisuje chunks u offsets + blob format
+
+    Args:
+        prefix: Putanja bez ekstenzije (npr. "text_chunks")
+        chunks: Lista tekstova
+    """
+    offsets_path, blob_path = _paths(prefix)
+    encoded = [chunk.encode("utf-8") for chunk in chunks]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if encoded:
+        offsets[1:] = np.cumsum([len(data) for data in encoded])
+
+    # Blob prvo, offseti na kraju - offseti nikad ne pokazuju na nepostojeći blob
+    with atomic_write(blob_path) as f:
+        for data in encoded:
+            f.write(data)
+    with atomic_write(offsets_path) as f:
+        np.save(f, offsets)
+
+
+class ChunkStore(Sequence[str]):
+    def __init__(self, prefix: str) -> None:
+        """
+        Otvara store u read-only memory-mapped režimu
+
+        Args:
+            prefix: Putanja bez ekstenzije (npr. "text_chunks")
+        """
+        offsets_path, blob_path = _paths(prefix)
+        self._offsets: np.ndarray = np.load(offsets_path, mmap_mode="r", allow_pickle=False)
+
+        self._blob: mmap.mmap | bytes
+        if os.path.getsize(blob_path) == 0:
+            # Prazan fajl nije moguće mapirati
+            self._blob = b""
+        else:
+            with open(blob_path, "rb") as f:
+                self._blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, idx):  # type: ignore[override]
+        if isinstance(idx, slice):
+            return [self._chunk(i) for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("chunk index out of range")
+        return self._chunk(idx)
+
+    def _chunk(self, idx: int) -> str:
+        start, end = int(self._offsets[idx]), int(self._offsets[idx + 1])
+        return self._blob[start:end].decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for idx in range(len(self)):
+            yield self._chunk(idx)
+
+    def close(self) -> None:
+        """
+        Oslobađa mapirane fajlove (na Windowsu se mapiran fajl ne može obrisati);
+        store je nakon toga prazan
+        """
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+        self._blob = b""
+        # np.memmap zatvara mapu kada se otpusti posljednja referenca
+        self._offsets = np.zeros(1, dtype=np.int64)
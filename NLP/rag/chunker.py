@@ -0,0 +1,160 @@
+"""
+Streaming chunkovanje teksta po rečenicama.
+
+Tekst se čita red po red (otvoren fajl, stranice dokumenta, bilo koji iterator),
+rečenice se skupljaju u listu dok ne dostignu limit tokena, a chunk se emituje
+čim je pun, tako da je u memoriji samo trenutni chunk. Chunk se ne prekida
+usred rečenice (osim kada je sama rečenica duža od limita) i ne prelazi granicu
+sekcije (red koji počinje sa #). Svaki chunk počinje headerom svoje sekcije, a
+susjedni chunks iste sekcije dijele posljednje rečenice (overlap).
+"""
+
+from collections.abc import Callable, Iterable, Iterator
+import itertools
+import re
+from typing import TypeVar
+
+from .context_builder import TokenCounter
+
+T = TypeVar("T")
+
+# Kandidat za kraj rečenice: interpunkcija (uz zatvorene navodnike/zagrade) i razmak
+_SENTENCE_END = re.compile(r"[.!?…]+[\"'”»)]*\s+")
+_OPENING = "\"'“„«("
+
+# Skraćenice iza kojih tačka ne završava rečenicu ("dr. sc. Ime", "br. 2")
+ABBREVIATIONS = frozenset(
+    {
+        "br", "dipl", "doc", "dr", "gdin", "gđa", "god", "itd", "mr", "npr", "odn",
+        "prof", "sc", "str", "sv", "tel", "tj", "ul", "vs",
+    }
+)  # fmt: skip
+
+
+def split_sentences(line: str) -> list[str]:
+    """Dijeli red na rečenice (nova rečenica počinje velikim slovom ili cifrom)"""
+    sentences: list[str] = []
+    start = 0
+    for match in _SENTENCE_END.finditer(line):
+        following = line[match.end() :].lstrip(_OPENING)[:1]
+        if not (following.isupper() or following.isdigit()):
+            continue
+        if line[match.start()] == ".":
+            words = line[start : match.start()].split()
+            word = words[-1].lstrip(_OPENING).lower() if words else ""
+            # Skraćenica ili inicijal ("A. Hodžić")
+            if word in ABBREVIATIONS or (len(word) == 1 and word.isalpha()):
+                continue
+        sentences.append(line[start : match.end()].rstrip())
+        start = match.end()
+    if start < len(line):
+        sentences.append(line[start:])
+    return sentences
+
+
+def _split_long(sentence: str, limit: int, count: Callable[[str], int]) -> Iterator[str]:
+    """Dijeli rečenicu dužu od limita na dijelove po riječima"""
+    words: list[str] = []
+    tokens = 0
+    for word in sentence.split():
+        size = count(word) + 1
+        if words and tokens + size > limit:
+            yield " ".join(words)
+            words, tokens = [], 0
+        words.append(word)
+        tokens += size
+    if words:
+        yield " ".join(words)
+
+
+def iter_chunks(
+    lines: Iterable[str],
+    max_tokens: int = 128,
+    overlap_tokens: int = 32,
+    count_tokens: Callable[[str], int] | None = None,
+) -> Iterator[str]:
+    """
+    Dijeli tekst na chunks, red po red, u linearnom vremenu
+
+    Args:
+        lines: Redovi teksta (npr. otvoren fajl ili text.splitlines())
+        max_tokens: Maksimalan broj tokena chunka, uključujući header
+        overlap_tokens: Najviše tokena posljednjih rečenica koje prelaze u sljedeći chunk
+        count_tokens: Brojač tokena (podrazumijevano procjena po znakovima)
+
+    Yields:
+        Chunks teksta, redoslijedom u dokumentu
+    """
+    count = count_tokens or TokenCounter().count
+    header = ""
+    limit = max_tokens
+    # Rečenice trenutnog chunka sa separatorom (" " unutar reda, "\n" na kraju reda)
+    units: list[str] = []
+    sizes: list[int] = []
+    total = 0
+    # Broj rečenica koje nisu već poslane u prethodnom chunku (overlap)
+    fresh = 0
+
+    def build() -> str:
+        body = "".join(units).rstrip()
+        return f"{header}\n{body}" if header else body
+
+    for raw in lines:
+        line = raw.strip()
+        if not line:
+            continue
+
+        if line.startswith("#"):
+            # Nova sekcija: završi trenutni chunk, overlap se ne prenosi preko sekcija
+            if fresh:
+                yield build()
+            units, sizes, total, fresh = [], [], 0, 0
+            header = line
+            limit = max(max_tokens - count(header) - 1, 1)
+            continue
+
+        sentences = split_sentences(line)
+        for i, sentence in enumerate(sentences):
+            separator = "\n" if i == len(sentences) - 1 else " "
+            size = count(sentence) + 1
+            pieces = [sentence] if size <= limit else list(_split_long(sentence, limit, count))
+
+            for j, piece in enumerate(pieces):
+                unit = piece + (separator if j == len(pieces) - 1 else " ")
+                if len(pieces) > 1:
+                    size = count(piece) + 1
+
+                if fresh and total + size > limit:
+                    yield build()
+                    # Zadrži posljednje rečenice do overlap_tokens (nikad cijeli chunk)
+                    keep = 0
+                    kept_tokens = 0
+                    while (
+                        keep < len(units) - 1 and kept_tokens + sizes[-1 - keep] <= overlap_tokens
+                    ):
+                        kept_tokens += sizes[-1 - keep]
+                        keep += 1
+                    units = units[len(units) - keep :]
+                    sizes = sizes[len(sizes) - keep :]
+                    total = kept_tokens
+                    fresh = 0
+
+                # Overlap ustupa mjesto novoj rečenici ako obje ne stanu
+                while units and total + size > limit:
+                    total -= sizes.pop(0)
+                    units.pop(0)
+
+                units.append(unit)
+                sizes.append(size)
+                total += size
+                fresh += 1
+
+    if fresh:
+        yield build()
+
+
+def batched(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    """Grupiše stream (npr. chunks) u liste od najviše size elemenata za batch encode"""
+    iterator = iter(items)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
@@ -0,0 +1,191 @@
+"""
+Sklapanje konteksta za LLM prompt iz pronađenih chunks.
+
+Susjedni chunks iste sekcije dijele header i posljednje rečenice (overlap), pa bi ih
+doslovno spajanje slalo modelu isti tekst više puta. Ovdje se chunks grupišu po
+sekciji (header samo jednom), susjedni se spajaju bez ponovljenog overlapa, a
+rezultat se skraćuje na budžet tokena.
+
+Tokeni se broje tokenizerom providera ako je zadan (CONTEXT_TOKENIZER, HF ime
+tokenizera, npr. "mistralai/Ministral-8B-Instruct-2410"), inače procjenom po
+broju znakova.
+"""
+
+from collections.abc import Sequence
+import threading
+from typing import Any
+
+# Minimalno preklapanje (znakova) da se dva susjedna chunka spoje bez ponavljanja
+MIN_OVERLAP = 20
+# Overlap je ograničen na nekoliko rečenica (RAG_CHUNK_OVERLAP_TOKENS)
+MAX_OVERLAP = 400
+
+
+class TokenCounter:
+    def __init__(self, tokenizer_name: str = "", chars_per_token: float = 3.5) -> None:
+        """
+        Args:
+            tokenizer_name: HF ime tokenizera providera ("" = procjena po znakovima)
+            chars_per_token: Prosječan broj znakova po tokenu za procjenu
+        """
+        self.tokenizer_name = tokenizer_name
+        self.chars_per_token = chars_per_token
+        self._tokenizer: Any = None
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _load(self) -> Any:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded and self.tokenizer_name:
+                    try:
+                        from tokenizers import Tokenizer
+
+                        self._tokenizer = Tokenizer.from_pretrained(self.tokenizer_name)
+                        print(f"🔤 Tokenizer učitan: {self.tokenizer_name}")
+                    except Exception as e:
+                        print(f"⚠️  Tokenizer {self.tokenizer_name} nije dostupan ({e}), procjena")
+                self._loaded = True
+        return self._tokenizer
+
+    @property
+    def source(self) -> str:
+        return self.tokenizer_name if self._load() is not None else "estimate"
+
+    def count(self, text: str) -> int:
+        """Broj tokena u tekstu"""
+        tokenizer = self._load()
+        if tokenizer is not None:
+            return len(tokenizer.encode(text, add_special_tokens=False).ids)
+        return int(len(text) / self.chars_per_token + 0.5)
+
+
+def _split_header(chunk: str) -> tuple[str, str]:
+    """Vraća (header sekcije ili "", tijelo chunka)"""
+    first, _, rest = chunk.partition("\n")
+    if first.startswith("#"):
+        return first, rest
+    return "", chunk
+
+
+def _overlap_length(previous: str, following: str) -> int:
+    """Dužina najdužeg kraja `previous` kojim počinje `following`"""
+    for k in range(min(len(previous), len(following), MAX_OVERLAP), MIN_OVERLAP - 1, -1):
+        if previous.endswith(following[:k]):
+            return k
+    return 0
+
+
+def _merge_section(chunks: Sequence[str], ids: list[int]) -> str:
+    """Spaja chunks jedne sekcije redoslijedom u dokumentu, header samo jednom"""
+    header = _split_header(chunks[ids[0]])[0]
+    bodies: list[str] = []
+    previous_id = None
+    for idx in sorted(ids):
+        body = _split_header(chunks[idx])[1].strip("\n")
+        if bodies and previous_id == idx - 1:
+            overlap = _overlap_length(bodies[-1], body)
+            bodies[-1] += body[overlap:] if overlap else "\n" + body
+        else:
+            bodies.append(body)
+        previous_id = idx
+
+    text = "\n...\n".join(bodies)
+    return f"{header}\n{text}" if header else text
+
+
+def _trim_to_budget(text: str, budget: int, counter: TokenCounter) -> str:
+    """Skraća tekst po linijama (od kraja) dok ne stane u budžet; "" ako ne stane ni header + red"""
+    lines = text.split("\n")
+    min_lines = 2 if lines[0].startswith("#") else 1
+    while len(lines) > min_lines and counter.count("\n".join(lines)) > budget:
+        lines.pop()
+    trimmed = "\n".join(lines)
+    return trimmed if counter.count(trimmed) <= budget else ""
+
+
+def format_context(parts: Sequence[str]) -> str:
+    """Numeriše dijelove konteksta za prompt"""
+    return "\n".join(f"[Informacija {i}]\n{part}\n" for i, part in enumerate(parts, 1))
+
+
+class ContextAssembler:
+    def __init__(self, token_budget: int, counter: TokenCounter) -> None:
+        """
+        Args:
+            token_budget: Maksimalan broj tokena konteksta (0 = bez ograničenja)
+            counter: Brojač tokena
+        """
+        self.token_budget = token_budget
+        self.counter = counter
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.tokens_sent = 0
+        self.tokens_saved = 0
+
+    def assemble(self, chunks: Sequence[str], ids: list[int]) -> dict[str, Any]:
+        """
+        Sklapa kontekst iz chunks rangiranih od najboljeg
+
+        Args:
+            chunks: Svi chunks knowledge base-a
+            ids: Id-jevi pronađenih chunks, od najrelevantnijeg
+
+        Returns:
+            {"context", "tokens", "naive_tokens", "tokens_saved"}
+        """
+        # Isti tekst može biti pod više id-jeva
+        unique_ids: list[int] = []
+        seen: set[str] = set()
+        for idx in ids:
+            if chunks[idx] not in seen:
+                seen.add(chunks[idx])
+                unique_ids.append(idx)
+
+        # Grupe po sekciji, poredane po najboljem rangu chunka iz sekcije
+        sections: dict[str, list[int]] = {}
+        for idx in unique_ids:
+            header = _split_header(chunks[idx])[0]
+            # Chunks bez headera se ne spajaju međusobno
+            sections.setdefault(header or f"#{idx}", []).append(idx)
+
+        parts: list[str] = []
+        remaining = self.token_budget
+        for section_ids in sections.values():
+            part = _merge_section(chunks, section_ids)
+            if self.token_budget:
+                # Numeracija i razmaci između dijelova troše nekoliko tokena
+                overhead = self.counter.count(format_context([""]))
+                part = _trim_to_budget(part, remaining - overhead, self.counter)
+                if not part:
+                    break
+                remaining -= self.counter.count(part) + overhead
+            parts.append(part)
+
+        context = format_context(parts)
+        tokens = self.counter.count(context)
+        naive_tokens = self.counter.count(format_context([chunks[idx] for idx in ids]))
+        saved = max(0, naive_tokens - tokens)
+
+        with self._lock:
+            self.requests += 1
+            self.tokens_sent += tokens
+            self.tokens_saved += saved
+
+        return {
+            "context": context,
+            "tokens": tokens,
+            "naive_tokens": naive_tokens,
+            "tokens_saved": saved,
+        }
+
+    def stats(self) -> dict[str, Any]:
+        tokenizer = self.counter.source
+        with self._lock:
+            return {
+                "token_budget": self.token_budget,
+                "tokenizer": tokenizer,
+                "requests": self.requests,
+                "tokens_sent": self.tokens_sent,
+                "tokens_saved": self.tokens_saved,
+            }
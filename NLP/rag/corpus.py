@@ -0,0 +1,132 @@
+"""
+Korpus dokumenata dodatih kroz ingest (python -m rag.ingest) i metapodaci chunks.
+
+Na disku (RAG_INGEST_DIR, podrazumijevano "ingested/"):
+- docs/<hash ključa>.json: chunks jednog dokumenta sa brojem stranice
+- documents.json: ključ dokumenta -> fingerprint (za nastavak prekinutog ingesta)
+- corpus.json: digest cijelog korpusa, ulazi u fingerprint FAISS indexa
+
+Metapodaci chunks (izvor i stranica) čuvaju se uz index u chunk_metadata.npz.
+"""
+
+from collections.abc import Iterator
+import hashlib
+import json
+import os
+from typing import Any
+
+import numpy as np
+
+from .atomic_file import atomic_write
+
+# Stranica nije poznata (DOCX, TXT, glavni knowledge base)
+NO_PAGE = -1
+
+
+def _write_json(path: str, data: Any) -> None:
+    with atomic_write(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+class DocumentCorpus:
+    def __init__(self, root: str) -> None:
+        """
+        Args:
+            root: Direktorij korpusa (kreira se pri prvom upisu)
+        """
+        self.root = root
+        self.docs_dir = os.path.join(root, "docs")
+        self.state_path = os.path.join(root, "documents.json")
+        self.manifest_path = os.path.join(root, "corpus.json")
+
+    def _doc_path(self, key: str) -> str:
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.docs_dir, f"{name}.json")
+
+    def load_state(self) -> dict[str, str]:
+        """Ključ dokumenta -> fingerprint za već obrađene dokumente"""
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, encoding="utf-8") as f:
+            state = json.load(f)
+        # Stanje može biti novije od fajla dokumenta samo ako je fajl obrisan ručno
+        return {key: fp for key, fp in state.items() if os.path.exists(self._doc_path(key))}
+
+    def save_state(self, state: dict[str, str]) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        _write_json(self.state_path, state)
+
+    def write_document(self, key: str, fingerprint: str, chunks: list[tuple[int, str]]) -> None:
+        """Atomski upisuje chunks jednog dokumenta (lista (stranica, tekst))"""
+        os.makedirs(self.docs_dir, exist_ok=True)
+        _write_json(
+            self._doc_path(key),
+            {"source": key, "fingerprint": fingerprint, "chunks": chunks},
+        )
+
+    def remove_document(self, key: str) -> None:
+        path = self._doc_path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def iter_chunks(self) -> Iterator[tuple[str, int, str]]:
+        """(izvor, stranica, tekst) za sve chunks korpusa, stabilnim redoslijedom"""
+        if not os.path.isdir(self.docs_dir):
+            return
+        for name in sorted(os.listdir(self.docs_dir)):
+            if not name.endswith(".json"):
+                continue
+            with open(os.path.join(self.docs_dir, name), encoding="utf-8") as f:
+                doc = json.load(f)
+            for page, text in doc["chunks"]:
+                yield doc["source"], page, text
+
+    def write_manifest(self, state: dict[str, str], chunks: int) -> None:
+        """Upisuje digest korpusa (mijenja fingerprint indexa -> rebuild)"""
+        digest = hashlib.sha256()
+        for key in sorted(state):
+            digest.update(f"{key}\0{state[key]}\n".encode())
+        os.makedirs(self.root, exist_ok=True)
+        _write_json(
+            self.manifest_path,
+            {"documents": len(state), "chunks": chunks, "digest": digest.hexdigest()},
+        )
+
+    def digest(self) -> str:
+        """Digest korpusa iz corpus.json ("" ako ingest nije pokretan)"""
+        if not os.path.exists(self.manifest_path):
+            return ""
+        with open(self.manifest_path, encoding="utf-8") as f:
+            return json.load(f)["digest"]
+
+
+def write_chunk_metadata(path: str, sources: list[str], pages: list[int]) -> None:
+    """Atomski upisuje izvor i stranicu za svaki chunk (npz, bez pickle-a)"""
+    unique: dict[str, int] = {}
+    source_ids = [unique.setdefault(source, len(unique)) for source in sources]
+    with atomic_write(path) as f:
+        np.savez(
+            f,
+            sources=np.array(list(unique), dtype=str),
+            source_ids=np.array(source_ids, dtype=np.int32),
+            pages=np.array(pages, dtype=np.int32),
+        )
+
+
+class ChunkMetadata:
+    def __init__(self, path: str) -> None:
+        with np.load(path, allow_pickle=False) as data:
+            self.sources: list[str] = [str(source) for source in data["sources"]]
+            self.source_ids: np.ndarray = data["source_ids"]
+            self.pages: np.ndarray = data["pages"]
+
+    def __len__(self) -> int:
+        return len(self.source_ids)
+
+    def get(self, idx: int) -> dict[str, Any]:
+        """{"source", "page"} za chunk (page je None kada nije poznata)"""
+        page = int(self.pages[idx])
+        return {
+            "source": self.sources[self.source_ids[idx]],
+            "page": None if page == NO_PAGE else page,
+        }
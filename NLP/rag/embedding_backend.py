@@ -0,0 +1,275 @@
+"""
+Embedding backendi za RAG sistem.
+
+- "torch": SentenceTransformer (PyTorch), podrazumijevani backend
+- "onnx": ONNX Runtime export istog modela, opcionalno int8 dinamički kvantizovan
+
+Oba backenda imaju isti `encode(texts, ...) -> np.ndarray` interfejs.
+
+Export i provjera podudarnosti sa torch modelom:
+    python -m rag.embedding_backend export
+    python -m rag.embedding_backend parity
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+from typing import Any
+
+import numpy as np
+
+from .file_lock import file_lock
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_MODEL_FILE = "model.int8.onnx"
+ONNX_CONFIG_FILE = "embedding_config.json"
+
+
+def embedding_model_id(model_name: str, backend: str, quantize: bool = True) -> str:
+    """
+    Identifikator modela za cache vektora i fingerprint indexa.
+    Različiti backendi daju (neznatno) različite vektore pa se ne miješaju.
+    """
+    if backend == "onnx":
+        return f"{model_name}:onnx-int8" if quantize else f"{model_name}:onnx"
+    return model_name
+
+
+def export_onnx(model_name: str, output_dir: str, quantize: bool = True) -> None:
+    """
+    Eksportuje transformer SentenceTransformer modela u ONNX (+ tokenizer)
+
+    Export ide u privremeni direktorij pored `output_dir`, a fajlovi se zatim
+    premještaju sa os.replace, modeli posljednji: postojanje modela u
+    `output_dir` znači da su i tokenizer i konfiguracija potpuni.
+
+    Args:
+        model_name: Ime SentenceTransformer modela
+        output_dir: Direktorij za model.onnx, tokenizer.json i konfiguraciju
+        quantize: Dodatno snimi int8 dinamički kvantizovanu verziju
+    """
+    print(f"📦 Eksportujem {model_name} u ONNX ({output_dir})...")
+    os.makedirs(output_dir, exist_ok=True)
+    # Isti fajl sistem kao output_dir, da os.replace bude atomski
+    tmp_dir = tempfile.mkdtemp(
+        prefix=f".{os.path.basename(os.path.abspath(output_dir))}-",
+        dir=os.path.dirname(os.path.abspath(output_dir)),
+    )
+    try:
+        _export_onnx_files(model_name, tmp_dir, quantize)
+        models = (ONNX_MODEL_FILE, ONNX_QUANTIZED_MODEL_FILE)
+        names = sorted(
+            os.listdir(tmp_dir), key=lambda name: models.index(name) if name in models else -1
+        )
+        for name in names:
+            os.replace(os.path.join(tmp_dir, name), os.path.join(output_dir, name))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print("✅ ONNX export gotov!")
+
+
+def _export_onnx_files(model_name: str, output_dir: str, quantize: bool) -> None:
+    """Upisuje ONNX model, tokenizer i konfiguraciju u (privremeni) `output_dir`"""
+    from sentence_transformers import SentenceTransformer
+    import torch
+
+    st_model = SentenceTransformer(model_name, device="cpu")
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+    pooling_mode = st_model[1].get_pooling_mode_str()
+    if pooling_mode != "mean":
+        raise ValueError(f"ONNX backend podržava samo mean pooling, model koristi '{pooling_mode}'")
+
+    dummy = tokenizer(["Gdje se nalazi IPI Akademija?"], return_tensors="pt")
+    model_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            (dummy["input_ids"], dummy["attention_mask"]),
+            model_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            opset_version=14,
+        )
+
+    tokenizer.save_pretrained(output_dir)
+    with open(os.path.join(output_dir, ONNX_CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "model_name": model_name,
+                "max_seq_length": st_model.max_seq_length,
+                "pad_token": tokenizer.pad_token,
+                "pad_token_id": tokenizer.pad_token_id,
+            },
+            f,
+        )
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        print("🗜️  Int8 dinamička kvantizacija...")
+        quantize_dynamic(
+            model_path,
+            os.path.join(output_dir, ONNX_QUANTIZED_MODEL_FILE),
+            weight_type=QuantType.QInt8,
+        )
+
+
+class OnnxEmbeddingModel:
+    def __init__(self, model_dir: str, quantize: bool = True, num_threads: int = 0) -> None:
+        """
+        Učitava eksportovani model u ONNX Runtime
+
+        Args:
+            model_dir: Direktorij koji je napravio export_onnx
+            quantize: Koristi int8 kvantizovani model
+            num_threads: Broj intra-op niti (0 = ONNX Runtime odlučuje)
+        """
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, ONNX_CONFIG_FILE), encoding="utf-8") as f:
+            config = json.load(f)
+        self.max_seq_length: int = config["max_seq_length"]
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self.tokenizer.enable_padding(pad_id=config["pad_token_id"], pad_token=config["pad_token"])
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = num_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        model_file = ONNX_QUANTIZED_MODEL_FILE if quantize else ONNX_MODEL_FILE
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, model_file),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+
+    def encode(
+        self, sentences: str | list[str], batch_size: int = 32, **_kwargs: Any
+    ) -> np.ndarray:
+        """Isti interfejs kao SentenceTransformer.encode (mean pooling, bez normalizacije)"""
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        if not sentences:
+            return np.zeros((0, 0), dtype="float32")
+
+        batches = []
+        for start in range(0, len(sentences), batch_size):
+            encodings = self.tokenizer.encode_batch(sentences[start : start + batch_size])
+            input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+            (hidden,) = self.session.run(
+                ["last_hidden_state"],
+                {"input_ids": input_ids, "attention_mask": attention_mask},
+            )
+
+            # Mean pooling preko stvarnih (ne-padding) tokena
+            mask = attention_mask[..., None].astype("float32")
+            summed = (hidden * mask).sum(axis=1)
+            batches.append(summed / np.clip(mask.sum(axis=1), 1e-9, None))
+
+        return np.vstack(batches).astype("float32")
+
+
+def load_embedding_model(
+    model_name: str, backend: str = "torch", onnx_dir: str = "onnx_model", quantize: bool = True
+) -> Any:
+    """
+    Učitava embedding model za zadani backend
+
+    Args:
+        model_name: Ime SentenceTransformer modela
+        backend: "torch" ili "onnx"
+        onnx_dir: Direktorij ONNX modela (eksportuje se ako ne postoji)
+        quantize: Koristi int8 kvantizovani ONNX model
+
+    Returns:
+        Objekat sa SentenceTransformer-kompatibilnom `encode` metodom
+    """
+    if backend == "onnx":
+        wanted = os.path.join(onnx_dir, ONNX_QUANTIZED_MODEL_FILE if quantize else ONNX_MODEL_FILE)
+        if not os.path.exists(wanted):
+            # Gunicorn workeri učitavaju model istovremeno: samo jedan eksportuje
+            with file_lock(f"{os.path.abspath(onnx_dir)}.lock"):
+                # Drugi worker je možda završio export dok se čekalo na lock
+                if not os.path.exists(wanted):
+                    export_onnx(model_name, onnx_dir, quantize=quantize)
+        num_threads = int(os.getenv("TORCH_NUM_THREADS", "0"))
+        return OnnxEmbeddingModel(onnx_dir, quantize=quantize, num_threads=num_threads)
+
+    if backend != "torch":
+        raise ValueError(f"Nepoznat embedding backend: {backend}")
+
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name)
+
+
+def parity_check(
+    model_name: str, onnx_dir: str, knowledge_base_path: str, quantize: bool = True
+) -> dict[str, Any]:
+    """
+    Poredi ONNX i torch embeddinge na chunks knowledge base-a
+
+    Returns:
+        Statistika cosine sličnosti između parova vektora istog chunka
+    """
+    from rag_system import RAGSystem
+
+    with open(knowledge_base_path, encoding="utf-8") as f:
+        chunks = RAGSystem._split_text_into_chunks(f.read())
+
+    torch_vectors = np.asarray(
+        load_embedding_model(model_name, "torch").encode(chunks), dtype="float32"
+    )
+    onnx_vectors = load_embedding_model(model_name, "onnx", onnx_dir, quantize).encode(chunks)
+
+    torch_vectors /= np.linalg.norm(torch_vectors, axis=1, keepdims=True)
+    onnx_vectors /= np.linalg.norm(onnx_vectors, axis=1, keepdims=True)
+    cosines = (torch_vectors * onnx_vectors).sum(axis=1)
+
+    # Podudarnost top-1 pretrage: isti najbliži susjed chunka u oba prostora
+    torch_top = np.argsort(-(torch_vectors @ torch_vectors.T), axis=1)[:, 1]
+    onnx_top = np.argsort(-(onnx_vectors @ onnx_vectors.T), axis=1)[:, 1]
+
+    return {
+        "model": embedding_model_id(model_name, "onnx", quantize),
+        "chunks": len(chunks),
+        "cosine_min": float(cosines.min()),
+        "cosine_mean": float(cosines.mean()),
+        "nearest_neighbour_agreement": float((torch_top == onnx_top).mean()),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ONNX embedding backend")
+    parser.add_argument("command", choices=["export", "parity"])
+    parser.add_argument("--model", default="paraphrase-multilingual-MiniLM-L12-v2")
+    parser.add_argument("--onnx-dir", default="onnx_model")
+    parser.add_argument("--knowledge-base", default="fakultetski_sadržaj.txt")
+    parser.add_argument("--no-quantize", action="store_true")
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    args = parser.parse_args()
+    quantize = not args.no_quantize
+
+    if args.command == "export":
+        export_onnx(args.model, args.onnx_dir, quantize=quantize)
+    else:
+        report = parity_check(args.model, args.onnx_dir, args.knowledge_base, quantize)
+        print(json.dumps(report, indent=2))
+        if report["cosine_min"] < args.min_cosine:
+            print(f"❌ Minimalna cosine sličnost ispod {args.min_cosine}")
+            sys.exit(1)
+        print("✅ ONNX backend je u skladu sa torch modelom")
@@ -0,0 +1,77 @@
+"""
+LRU cache embeddinga korisničkih pitanja, sa TTL-om i brojačima pogodaka.
+Ponovljena pitanja ("Koliko košta studij?") preskaču transformer forward pass.
+"""
+
+from collections import OrderedDict
+import re
+import threading
+import time
+from typing import Any
+
+import numpy as np
+
+
+def normalize_query(query: str) -> str:
+    """Normalizuje pitanje za ključ cachea (mala slova, jedan razmak, bez interpunkcije na krajevima)"""
+    query = re.sub(r"\s+", " ", query.casefold())
+    return query.strip(" .,;:!?\"'")
+
+
+class QueryEmbeddingCache:
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 3600.0) -> None:
+        """
+        Args:
+            max_size: Maksimalan broj keširanih pitanja (0 isključuje cache)
+            ttl_seconds: Vrijeme važenja unosa u sekundama (0 = bez isteka)
+        """
+        self.max_size: int = max_size
+        self.ttl_seconds: float = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, np.ndarray]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get(self, query: str) -> np.ndarray | None:
+        """Vraća keširani embedding ili None (i broji hit/miss)"""
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, vector = entry
+                if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+                    del self._entries[key]
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return vector
+            self.misses += 1
+            return None
+
+    def put(self, query: str, vector: np.ndarray) -> None:
+        """Sprema embedding i izbacuje najstarije korištene unose preko limita"""
+        if self.max_size <= 0:
+            return
+        key = normalize_query(query)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Brojači za /status"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,104 @@
+"""
+Content-addressed store embeddinga: sha256(chunk) -> normalizovani vektor.
+Omogućava inkrementalni rebuild FAISS indexa - embeddinguju se samo novi
+ili izmijenjeni chunks, a ostali se čitaju iz cachea.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+
+from .atomic_file import atomic_write
+
+
+def chunk_hash(text: str) -> str:
+    """Vraća SHA-256 hash chunka (ključ u embedding store-u)"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    def __init__(self, path: str, model_name: str) -> None:
+        """
+        Args:
+            path: Putanja do .npz fajla sa sačuvanim vektorima
+            model_name: Ime embedding modela; cache drugog modela se odbacuje
+        """
+        self.path: str = path
+        self.model_name: str = model_name
+        self._vectors: dict[str, np.ndarray] = {}
+        # Store se učitava tek kada zatreba (samo pri buildu indexa),
+        # tako da workeri koji samo učitavaju gotov index ne drže kopiju vektora
+        self._loaded: bool = False
+
+    def __len__(self) -> int:
+        self._load()
+        return len(self._vectors)
+
+    def __contains__(self, key: str) -> bool:
+        self._load()
+        return key in self._vectors
+
+    def _load(self) -> None:
+        """Učitava store sa diska (bez pickle-a), najviše jednom"""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                if str(data["model"]) != self.model_name:
+                    print("♻️  Embedding model promijenjen - odbacujem stari cache vektora")
+                    return
+                for key, vector in zip(data["hashes"], data["vectors"], strict=True):
+                    self._vectors[str(key)] = vector
+        except Exception as e:
+            print(f"⚠️  Embedding cache nije moguće učitati, kreće se od nule: {e}")
+            self._vectors = {}
+
+    def missing(self, hashes: list[str]) -> list[str]:
+        """Vraća hasheve koji još nemaju sačuvan vektor"""
+        self._load()
+        return [h for h in hashes if h not in self._vectors]
+
+    def put_many(self, hashes: list[str], vectors: np.ndarray) -> None:
+        """Dodaje vektore (red po red) pod odgovarajuće hasheve"""
+        self._load()
+        for key, vector in zip(hashes, vectors, strict=True):
+            self._vectors[key] = np.asarray(vector, dtype="float32")
+
+    def get_matrix(self, hashes: list[str]) -> np.ndarray:
+        """Slaže vektore u matricu redoslijedom zadanih hasheva"""
+        self._load()
+        return np.vstack([self._vectors[h] for h in hashes]).astype("float32")
+
+    def prune(self, keep: set[str]) -> int:
+        """Briše vektore chunks koji više ne postoje; vraća broj obrisanih"""
+        self._load()
+        stale = [h for h in self._vectors if h not in keep]
+        for h in stale:
+            del self._vectors[h]
+        return len(stale)
+
+    def clear(self) -> None:
+        self._loaded = True
+        self._vectors = {}
+
+    def save(self) -> None:
+        """Atomski upisuje store (tmp fajl + os.replace)"""
+        self._load()
+        hashes = list(self._vectors)
+        vectors = (
+            np.vstack([self._vectors[h] for h in hashes])
+            if hashes
+            else np.zeros((0, 0), dtype="float32")
+        )
+        with atomic_write(self.path) as f:
+            np.savez(
+                f,
+                model=np.array(self.model_name),
+                hashes=np.array(hashes, dtype=str),
+                vectors=vectors.astype("float32"),
+            )
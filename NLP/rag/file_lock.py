@@ -0,0 +1,68 @@
+"""
+Ekskluzivni lock između procesa (gunicorn workera) preko lock fajla.
+Na POSIX sistemima fcntl.flock, na Windowsu msvcrt.locking; ako nijedno nije
+dostupno, lock vrijedi samo unutar procesa.
+"""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+import os
+import sys
+import threading
+import time
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    try:
+        import fcntl
+    except ImportError:
+        fcntl = None
+
+# Koliko često se na Windowsu ponovo pokušava zaključati zauzet fajl (sekunde)
+_WINDOWS_RETRY_SECONDS = 0.05
+
+# Rezervni lockovi po putanji, kad OS lock nije dostupan
+_local_locks: dict[str, threading.Lock] = {}
+_local_locks_guard = threading.Lock()
+
+
+def _local_lock(path: str) -> threading.Lock:
+    with _local_locks_guard:
+        return _local_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """
+    Drži ekskluzivni lock nad fajlom `path` (kreira se ako ne postoji) dok traje blok
+
+    Args:
+        path: Putanja lock fajla, zajednička svim procesima
+    """
+    if sys.platform == "win32":
+        with open(path, "a") as f:
+            # msvcrt zaključava bajtove od trenutne pozicije: uvijek prvi bajt fajla
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK odustaje nakon 10 sekundi, a build indexa traje duže
+                    time.sleep(_WINDOWS_RETRY_SECONDS)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    elif fcntl is not None:
+        with open(path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+    else:
+        with _local_lock(path):
+            yield
@@ -0,0 +1,232 @@
+"""
+Izbor i izgradnja FAISS indexa (flat, IVF-Flat, HNSW, IVF-PQ).
+
+Flat index pretražuje sve vektore i dovoljan je za mali knowledge base; za veće
+korpuse "auto" bira aproksimativni index prema broju vektora. Istrenirani IVF
+kvantizatori se čuvaju na disku i ponovo koriste dok se korpus ne promijeni bitno.
+
+Izvještaj recall@k i latencije u odnosu na tačan flat index:
+    python -m rag.index_factory report --k 5
+    python -m rag.index_factory report --synthetic 200000
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+from typing import Any
+
+import faiss
+import numpy as np
+
+from .atomic_file import atomic_path, atomic_write
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+
+# Granice (broj vektora) za automatski izbor indexa
+AUTO_FLAT_MAX = 10_000
+AUTO_HNSW_MAX = 200_000
+AUTO_IVF_FLAT_MAX = 2_000_000
+
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+
+
+def choose_index_type(n_vectors: int) -> str:
+    """Bira tip indexa prema veličini korpusa"""
+    if n_vectors <= AUTO_FLAT_MAX:
+        return "flat"
+    if n_vectors <= AUTO_HNSW_MAX:
+        return "hnsw"
+    if n_vectors <= AUTO_IVF_FLAT_MAX:
+        return "ivf_flat"
+    return "ivf_pq"
+
+
+def resolve_index_type(configured: str, n_vectors: int) -> str:
+    """Pretvara konfiguraciju ("auto" ili konkretan tip) u tip indexa"""
+    configured = configured.lower()
+    if configured == "auto":
+        return choose_index_type(n_vectors)
+    if configured not in INDEX_TYPES:
+        raise ValueError(f"Nepoznat tip indexa: {configured} (dozvoljeno: auto, {INDEX_TYPES})")
+    return configured
+
+
+def _ivf_factory_string(index_type: str, n_vectors: int, dimension: int) -> str:
+    """Factory string za IVF indexe; nlist ~ 4 * sqrt(n), najmanje 39 vektora po listi"""
+    nlist = max(1, min(int(4 * math.sqrt(n_vectors)), n_vectors // 39))
+    if index_type == "ivf_flat":
+        return f"IVF{nlist},Flat"
+
+    # PQ: 8 dimenzija po sub-kvantizatoru, 8 bita ako ima dovoljno podataka za trening
+    m = next(
+        m for m in (dimension // 8, dimension // 4, dimension // 2, dimension) if dimension % m == 0
+    )
+    nbits = max(1, min(8, int(math.log2(max(2, n_vectors // 39)))))
+    return f"IVF{nlist},PQ{m}x{nbits}"
+
+
+def _load_trained(trained_path: str, index_type: str, dimension: int, n_vectors: int) -> Any:
+    """Vraća sačuvan istreniran (prazan) index ako i dalje odgovara korpusu"""
+    meta_path = trained_path + ".json"
+    if not (os.path.exists(trained_path) and os.path.exists(meta_path)):
+        return None
+
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        # Retrening tek kada se korpus prepolovi ili udvostruči
+        if (
+            meta["index_type"] != index_type
+            or meta["dimension"] != dimension
+            or not meta["trained_on"] / 2 <= n_vectors <= meta["trained_on"] * 2
+        ):
+            return None
+        print(f"♻️  Koristim istreniran {meta['factory']} index (trening na {meta['trained_on']})")
+        return faiss.read_index(trained_path)
+    except Exception as e:
+        print(f"⚠️  Istreniran index nije moguće učitati: {e}")
+        return None
+
+
+def _save_trained(index: Any, trained_path: str, index_type: str, factory: str, n: int) -> None:
+    with atomic_path(trained_path) as tmp_path:
+        faiss.write_index(index, tmp_path)
+    with atomic_write(trained_path + ".json", "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "index_type": index_type,
+                "factory": factory,
+                "dimension": index.d,
+                "trained_on": n,
+            },
+            f,
+        )
+
+
+def build_index(vectors: np.ndarray, index_type: str, trained_path: str | None = None) -> Any:
+    """
+    Gradi FAISS index (inner product = cosine na normalizovanim vektorima)
+
+    Args:
+        vectors: Normalizovani float32 vektori (n x d)
+        index_type: Jedan od INDEX_TYPES
+        trained_path: Putanja za čuvanje/ponovno korištenje istreniranog IVF kvantizatora
+
+    Returns:
+        Popunjen FAISS index
+    """
+    n_vectors, dimension = vectors.shape
+
+    if index_type == "flat":
+        index = faiss.IndexFlatIP(dimension)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    else:
+        index = (
+            _load_trained(trained_path, index_type, dimension, n_vectors) if trained_path else None
+        )
+        if index is None:
+            factory = _ivf_factory_string(index_type, n_vectors, dimension)
+            print(f"🏋️  Treniram {factory} index na {n_vectors} vektora...")
+            index = faiss.index_factory(dimension, factory, faiss.METRIC_INNER_PRODUCT)
+            index.train(vectors)
+            if trained_path:
+                _save_trained(index, trained_path, index_type, factory, n_vectors)
+
+    index.add(vectors)
+    return index
+
+
+def configure_search(index: Any, nprobe: int, ef_search: int) -> None:
+    """Postavlja parametre pretrage (nprobe za IVF, efSearch za HNSW)"""
+    params = faiss.ParameterSpace()
+    if faiss.try_extract_index_ivf(index) is not None:
+        params.set_index_parameter(index, "nprobe", nprobe)
+    if isinstance(index, faiss.IndexHNSW):
+        params.set_index_parameter(index, "efSearch", ef_search)
+
+
+def recall_report(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    k: int = 5,
+    nprobe: int = 16,
+    ef_search: int = 64,
+    index_types: tuple[str, ...] = INDEX_TYPES,
+) -> list[dict[str, Any]]:
+    """
+    Mjeri recall@k i latenciju svakog tipa indexa u odnosu na tačan flat index
+
+    Args:
+        vectors: Normalizovani vektori korpusa
+        queries: Normalizovani vektori pitanja
+        k: Broj rezultata
+        nprobe: IVF nprobe
+        ef_search: HNSW efSearch
+        index_types: Tipovi indexa za poređenje
+
+    Returns:
+        Lista redova izvještaja (jedan po tipu indexa)
+    """
+    exact = faiss.IndexFlatIP(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+
+    report = []
+    for index_type in index_types:
+        start = time.perf_counter()
+        index = build_index(vectors, index_type)
+        build_seconds = time.perf_counter() - start
+        configure_search(index, nprobe, ef_search)
+
+        latencies = []
+        found = np.empty_like(truth)
+        for i in range(len(queries)):
+            start = time.perf_counter()
+            _, found[i : i + 1] = index.search(queries[i : i + 1], k)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        hits = sum(len(set(truth[i]) & set(found[i])) for i in range(len(queries)))
+        report.append(
+            {
+                "index_type": index_type,
+                "recall_at_k": hits / truth.size,
+                "latency_ms_p50": float(np.percentile(latencies, 50)),
+                "latency_ms_p95": float(np.percentile(latencies, 95)),
+                "build_seconds": build_seconds,
+            }
+        )
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall@k i latencija FAISS indexa")
+    parser.add_argument("command", choices=["report"])
+    parser.add_argument("--embeddings", default="chunk_embeddings.npz")
+    parser.add_argument("--synthetic", type=int, default=0, help="Broj slučajnih vektora")
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--ef-search", type=int, default=64)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.synthetic:
+        corpus = rng.standard_normal((args.synthetic, args.dimension)).astype("float32")
+    else:
+        with np.load(args.embeddings, allow_pickle=False) as data:
+            corpus = np.ascontiguousarray(data["vectors"], dtype="float32")
+    faiss.normalize_L2(corpus)
+
+    # Pitanja = zašumljeni vektori korpusa (bliski, ali ne identični postojećim)
+    sample = corpus[rng.integers(0, len(corpus), args.queries)]
+    query_vectors = (sample + 0.1 * rng.standard_normal(sample.shape)).astype("float32")
+    faiss.normalize_L2(query_vectors)
+
+    rows = recall_report(corpus, query_vectors, args.k, args.nprobe, args.ef_search)
+    print(json.dumps({"vectors": len(corpus), "k": args.k, "results": rows}, indent=2))
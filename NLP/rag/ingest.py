@@ -0,0 +1,274 @@
+"""
+Ingest dokumenata (PDF, DOCX, TXT, MD) u knowledge base RAG sistema.
+
+    python -m rag.ingest dokumenti/                  # lokalni direktorij
+    python -m rag.ingest s3://pravilnici/            # prefix u S3 bucketu (BUCKET_NAME)
+    python -m rag.ingest dokumenti/ --encode-processes 4
+
+Faze:
+1. Ekstrakcija teksta po stranicama i chunkovanje u process poolu; svaki dokument
+   se upisuje u korpus (RAG_INGEST_DIR) čim je obrađen
+2. Embedding chunks kojih nema u embedding store-u, u velikim batch-evima
+   (SentenceTransformer multi-process pool kada je --encode-processes > 1)
+3. Inkrementalni rebuild FAISS i BM25 indexa sa izvorom i stranicom svakog chunka
+
+Prekinut ingest se nastavlja ponovnim pokretanjem: dokumenti sa nepromijenjenim
+fingerprintom (veličina + mtime, odnosno S3 ETag) se preskaču, a već izračunati
+vektori se čitaju iz embedding store-a. Dokumenti obrisani iz izvora se uklanjaju
+iz korpusa.
+"""
+
+import argparse
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import io
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+from typing import Any
+
+import faiss
+import numpy as np
+
+from rag.chunker import batched
+from rag.corpus import NO_PAGE, DocumentCorpus
+from rag.embedding_store import chunk_hash
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt", ".md")
+S3_SCHEME = "s3://"
+
+
+def list_documents(source: str) -> list[tuple[str, str]]:
+    """
+    Pronalazi podržane dokumente u direktoriju ili S3 prefixu
+
+    Returns:
+        Lista (ključ dokumenta, fingerprint)
+    """
+    documents = []
+    if source.startswith(S3_SCHEME):
+        from s3_bucket.client import endpoint_url, s3_client
+
+        paginator = s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=endpoint_url, Prefix=source[len(S3_SCHEME) :]):
+            for item in page.get("Contents", []):
+                if item["Key"].lower().endswith(SUPPORTED_EXTENSIONS):
+                    documents.append((S3_SCHEME + item["Key"], item["ETag"].strip('"')))
+        return documents
+
+    for dirpath, _, filenames in os.walk(source):
+        for name in sorted(filenames):
+            if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                path = os.path.normpath(os.path.join(dirpath, name))
+                stat = os.stat(path)
+                documents.append((path, f"{stat.st_size}:{stat.st_mtime_ns}"))
+    return documents
+
+
+def _read_document(key: str) -> bytes:
+    if key.startswith(S3_SCHEME):
+        from s3_bucket.client import endpoint_url, s3_client
+
+        return s3_client.get_object(Bucket=endpoint_url, Key=key[len(S3_SCHEME) :])["Body"].read()
+    with open(key, "rb") as f:
+        return f.read()
+
+
+def process_document(key: str, fingerprint: str) -> tuple[str, str, list[tuple[int, str]]]:
+    """
+    Čita dokument, izvlači tekst po stranicama i dijeli ga na chunks (radi u process poolu)
+
+    Returns:
+        (ključ, fingerprint, lista (stranica, chunk))
+    """
+    from document_service.extract_file import extract_pages
+    from rag_system import chunk_lines
+
+    name = key.lower()
+    data = _read_document(key)
+    if name.endswith((".txt", ".md")):
+        pages = [data.decode("utf-8", errors="replace")]
+    else:
+        # Dokumenti se već obrađuju paralelno: bez ugniježđenog poola stranica
+        pages = extract_pages(name, io.BytesIO(data), parallel=False)
+
+    # Naslov dokumenta kao header sekcije: chunks istog dokumenta se grupišu u kontekstu
+    title = os.path.splitext(os.path.basename(key))[0]
+    chunks: list[tuple[int, str]] = []
+    for number, text in enumerate(pages, 1):
+        if not text.strip():
+            continue
+        page = number if name.endswith(".pdf") else NO_PAGE
+        lines = itertools.chain([f"# {title}"], text.splitlines())
+        chunks.extend((page, chunk) for chunk in chunk_lines(lines))
+    return key, fingerprint, chunks
+
+
+def extract_documents(
+    corpus: DocumentCorpus, source: str, workers: int, checkpoint_seconds: float
+) -> dict[str, int]:
+    """
+    Faza 1: ekstrakcija i chunkovanje novih/izmijenjenih dokumenata u process poolu
+
+    Returns:
+        Brojači (pronađeno, preskočeno, obrađeno, neuspješno, uklonjeno)
+    """
+    from rag_system import CHUNKING_ID, INDEX_FORMAT_VERSION
+
+    # Promjena chunkovanja mijenja fingerprint svih dokumenata -> ponovna obrada
+    chunking = f"{INDEX_FORMAT_VERSION}:{CHUNKING_ID}"
+    documents = [(key, f"{fp}|{chunking}") for key, fp in list_documents(source)]
+    state = corpus.load_state()
+
+    # Dokumenti ovog izvora kojih više nema se uklanjaju iz korpusa
+    root = source if source.startswith(S3_SCHEME) else os.path.normpath(source) + os.sep
+    present = {key for key, _ in documents}
+    removed = [key for key in state if key.startswith(root) and key not in present]
+    for key in removed:
+        corpus.remove_document(key)
+        del state[key]
+
+    todo = [(key, fp) for key, fp in documents if state.get(key) != fp]
+    print(f"📂 {len(documents)} dokumenata, {len(documents) - len(todo)} već obrađeno")
+
+    processed = failed = 0
+    last_checkpoint = time.monotonic()
+    if todo:
+        # spawn: workeri ne nasljeđuju stanje roditelja (niti, otvorene konekcije)
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            futures = [executor.submit(process_document, key, fp) for key, fp in todo]
+            for future in as_completed(futures):
+                try:
+                    key, fingerprint, chunks = future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"⚠️  Dokument nije obrađen: {e}")
+                    continue
+
+                corpus.write_document(key, fingerprint, chunks)
+                state[key] = fingerprint
+                processed += 1
+
+                if time.monotonic() - last_checkpoint > checkpoint_seconds:
+                    corpus.save_state(state)
+                    last_checkpoint = time.monotonic()
+                    print(f"📄 Obrađeno {processed}/{len(todo)} dokumenata")
+
+    corpus.save_state(state)
+    return {
+        "found": len(documents),
+        "skipped": len(documents) - len(todo),
+        "processed": processed,
+        "failed": failed,
+        "removed": len(removed),
+    }
+
+
+def embed_corpus(
+    rag: Any, batch_size: int, encode_processes: int, checkpoint_seconds: float
+) -> tuple[int, int]:
+    """
+    Faza 2: embedding chunks korpusa kojih nema u embedding store-u, u batch-evima
+
+    Returns:
+        (ukupno chunks u korpusu, broj novo embeddovanih)
+    """
+    store = rag.embedding_store
+    pool = None
+    if encode_processes > 1 and hasattr(rag.model, "start_multi_process_pool"):
+        pool = rag.model.start_multi_process_pool(["cpu"] * encode_processes)
+
+    total = embedded = 0
+    last_checkpoint = time.monotonic()
+
+    def missing_chunks() -> Iterator[tuple[str, str]]:
+        """(hash, tekst) chunks korpusa kojih nema u store-u, bez duplikata"""
+        nonlocal total
+        queued: set[str] = set()
+        for _, _, text in rag.corpus.iter_chunks():
+            total += 1
+            key = chunk_hash(text)
+            if key not in queued and key not in store:
+                queued.add(key)
+                yield key, text
+
+    try:
+        for batch in batched(missing_chunks(), batch_size):
+            texts = [text for _, text in batch]
+            if pool is not None:
+                vectors = rag.model.encode_multi_process(texts, pool)
+            else:
+                vectors = rag.model.encode(texts)
+            vectors = np.asarray(vectors, dtype="float32")
+            faiss.normalize_L2(vectors)
+            store.put_many([key for key, _ in batch], vectors)
+            embedded += len(batch)
+
+            if time.monotonic() - last_checkpoint > checkpoint_seconds:
+                store.save()
+                last_checkpoint = time.monotonic()
+                print(f"🔮 Embeddovano {embedded} novih chunks")
+    finally:
+        if pool is not None:
+            rag.model.stop_multi_process_pool(pool)
+        store.save()
+
+    return total, embedded
+
+
+def ingest(
+    source: str,
+    workers: int,
+    batch_size: int,
+    encode_processes: int,
+    checkpoint_seconds: float = 60.0,
+) -> dict[str, Any]:
+    """Pokreće sve tri faze ingesta i vraća statistiku (index_built=False ako build nije uspio)"""
+    from rag_system import INGEST_DIR, RAGSystem
+
+    start = time.perf_counter()
+    corpus = DocumentCorpus(INGEST_DIR)
+    stats: dict[str, Any] = extract_documents(corpus, source, workers, checkpoint_seconds)
+    stats["extract_seconds"] = round(time.perf_counter() - start, 1)
+
+    # Model se učitava tek nakon ekstrakcije, kada process pool više ne troši CPU;
+    # index se gradi jednom, na kraju, iz već izračunatih vektora
+    rag = RAGSystem(load_index=False)
+    embed_start = time.perf_counter()
+    stats["chunks"], stats["embedded"] = embed_corpus(
+        rag, batch_size, encode_processes, checkpoint_seconds
+    )
+    stats["embed_seconds"] = round(time.perf_counter() - embed_start, 1)
+
+    corpus.write_manifest(corpus.load_state(), stats["chunks"])
+    # Greška builda je već ispisana; CLI je prijavljuje izlaznim kodom
+    stats["index_built"] = rag.rebuild_index()
+    stats["total_seconds"] = round(time.perf_counter() - start, 1)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest dokumenata u RAG knowledge base")
+    parser.add_argument("source", help="Direktorij ili s3://prefix")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=1024, help="Chunks po encode pozivu")
+    parser.add_argument(
+        "--encode-processes", type=int, default=0, help="Procesi za encode (0/1 = jedan)"
+    )
+    parser.add_argument("--checkpoint-seconds", type=float, default=60.0)
+    args = parser.parse_args()
+
+    result = ingest(
+        args.source, args.workers, args.batch_size, args.encode_processes, args.checkpoint_seconds
+    )
+    if result["index_built"]:
+        print("✅ Ingest gotov:")
+    else:
+        print("❌ Ingest gotov, ali index nije izgrađen (pretraga koristi prethodni):")
+    for name, value in result.items():
+        print(f"   {name}: {value}")
+    if not result["index_built"]:
+        sys.exit(1)
@@ -3,133 +3,684 @@ RAG (Retrieval-Augmented Generation) sistem za IPI Akademiju
 Koristi FAISS za vector search i Mistral AI za generisanje odgovora
 """
 
+from collections.abc import Iterable, Iterator
+import contextlib
+from contextlib import contextmanager
+import glob
+import hashlib
+import json
 import os
-import pickle
+import threading
+import time
 from typing import Any
+import uuid
 
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
+
+from rag import (
+    NO_PAGE,
+    BM25Index,
+    ChunkMetadata,
+    ChunkStore,
+    ContextAssembler,
+    DocumentCorpus,
+    EmbeddingStore,
+    QueryEmbeddingCache,
+    SemanticAnswerCache,
+    TokenCounter,
+    atomic_path,
+    atomic_write,
+    build_index,
+    chunk_hash,
+    chunk_store_exists,
+    configure_search,
+    embedding_model_id,
+    file_lock,
+    iter_chunks,
+    load_embedding_model,
+    normalize_query,
+    reciprocal_rank_fusion,
+    resolve_index_type,
+    write_chunk_metadata,
+    write_chunk_store,
+)
+
+EMBEDDING_MODEL_NAME = "paraphrase-multilingual-MiniLM-L12-v2"
+
+# Embedding backend: "torch" (SentenceTransformer) ili "onnx" (ONNX Runtime, opcionalno int8)
+EMBEDDING_BACKEND = os.getenv("RAG_EMBEDDING_BACKEND", "torch").lower()
+ONNX_MODEL_DIR = os.getenv("RAG_ONNX_MODEL_DIR", "onnx_model")
+ONNX_QUANTIZE = os.getenv("RAG_ONNX_QUANTIZE", "true").lower() == "true"
+
+# Tip FAISS indexa: auto (po veličini korpusa), flat, ivf_flat, hnsw ili ivf_pq
+INDEX_TYPE = os.getenv("RAG_INDEX_TYPE", "auto").lower()
+IVF_NPROBE = int(os.getenv("RAG_IVF_NPROBE", "16"))
+HNSW_EF_SEARCH = int(os.getenv("RAG_HNSW_EF_SEARCH", "64"))
+
+# Prag relevantnosti (cosine similarity) ispod kojeg se rezultat odbacuje
+SIMILARITY_THRESHOLD = float(os.getenv("RAG_SIMILARITY_THRESHOLD", "0.35"))
+
+# Hibridna pretraga: BM25 + vektorski rezultati spojeni Reciprocal Rank Fusion-om
+HYBRID_SEARCH = os.getenv("RAG_HYBRID_SEARCH", "true").lower() == "true"
+RRF_K = int(os.getenv("RAG_RRF_K", "60"))
+# Broj kandidata iz svake liste (BM25 i FAISS) prije spajanja
+HYBRID_CANDIDATES = int(os.getenv("RAG_HYBRID_CANDIDATES", "20"))
+# Minimalan udio IDF težine pitanja koji BM25 pogodak mora pokriti: bez njega
+# jedna zajednička riječ vraća kontekst i za pitanja van knowledge base-a
+HYBRID_BM25_MIN_COVERAGE = float(os.getenv("RAG_HYBRID_BM25_MIN_COVERAGE", "0.4"))
+
+# Cache embeddinga pitanja (veličina i TTL u sekundama, 0 = isključeno / bez isteka)
+QUERY_CACHE_SIZE = int(os.getenv("RAG_QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_TTL = float(os.getenv("RAG_QUERY_CACHE_TTL", "3600"))
+
+# Semantički cache odgovora LLM-a (veličina, TTL u sekundama, prag cosine sličnosti pitanja)
+ANSWER_CACHE_SIZE = int(os.getenv("RAG_ANSWER_CACHE_SIZE", "512"))
+ANSWER_CACHE_TTL = float(os.getenv("RAG_ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("RAG_ANSWER_CACHE_THRESHOLD", "0.95"))
+
+# Budžet tokena konteksta za LLM (0 = bez ograničenja) i tokenizer providera za brojanje
+# (HF ime, npr. "mistralai/Ministral-8B-Instruct-2410"; prazno = procjena po znakovima)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "800"))
+CONTEXT_TOKENIZER = os.getenv("RAG_CONTEXT_TOKENIZER", "")
+CONTEXT_CHARS_PER_TOKEN = float(os.getenv("RAG_CONTEXT_CHARS_PER_TOKEN", "3.5"))
+
+# Chunkovanje po rečenicama: limit i overlap u tokenima, tokenizer embedding modela za
+# brojanje (HF ime, npr. "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2";
+# prazno = procjena po znakovima). Model ionako odsijeca tekst duži od 128 tokena.
+CHUNK_MAX_TOKENS = int(os.getenv("RAG_CHUNK_MAX_TOKENS", "128"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("RAG_CHUNK_OVERLAP_TOKENS", "32"))
+CHUNK_TOKENIZER = os.getenv("RAG_CHUNK_TOKENIZER", "")
+# Identifikator podešavanja chunkovanja (promjena -> rebuild indexa i ponovni ingest)
+CHUNKING_ID = f"{CHUNK_MAX_TOKENS}:{CHUNK_OVERLAP_TOKENS}:{CHUNK_TOKENIZER}"
+
+# Koliko često (sekunde) se provjerava da li su se knowledge base, ingest korpus ili
+# index promijenili; promjena pokreće reload u pozadini (0 = isključeno)
+RELOAD_CHECK_SECONDS = float(os.getenv("RAG_RELOAD_CHECK_SECONDS", "30"))
+
+# Direktorij dokumenata dodatih kroz `python -m rag.ingest` (PDF, DOCX, ...)
+INGEST_DIR = os.getenv("RAG_INGEST_DIR", "ingested")
+
+# Povećati kada se promijeni način chunkovanja ili format indexa,
+# kako bi se stari index smatrao zastarjelim
+INDEX_FORMAT_VERSION = 6
+
+_chunk_token_counter = TokenCounter(CHUNK_TOKENIZER)
+
+
+def chunk_lines(lines: Iterable[str]) -> Iterator[str]:
+    """Streaming chunkovanje redova teksta sa podešavanjima iz okruženja"""
+    return iter_chunks(lines, CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, _chunk_token_counter.count)
+
+
+class LoadedIndex:
+    """Sve što pretraga čita iz jednog builda indexa; zamjenjuje se kao cjelina"""
+
+    __slots__ = (
+        "index",
+        "bm25",
+        "chunks",
+        "metadata",
+        "fingerprint",
+        "build",
+        "readers",
+        "retired",
+    )
+
+    def __init__(
+        self,
+        index: Any,
+        bm25: BM25Index,
+        chunks: ChunkStore,
+        metadata: ChunkMetadata,
+        fingerprint: str,
+        build: str,
+    ) -> None:
+        self.index = index
+        self.bm25 = bm25
+        self.chunks = chunks
+        self.metadata = metadata
+        self.fingerprint = fingerprint
+        self.build = build
+        # Pretrage u toku (RAGSystem._reading) i da li ga je reload već zamijenio
+        self.readers = 0
+        self.retired = False
+
+    def close(self) -> None:
+        """Oslobađa mapirane fajlove; poziva se kada zamijenjeni index više niko ne čita"""
+        self.chunks.close()
 
 
 class RAGSystem:
-    def __init__(self, knowledge_base_path: str = "fakultetski_sadržaj.txt") -> None:
+    def __init__(
+        self, knowledge_base_path: str = "fakultetski_sadržaj.txt", load_index: bool = True
+    ) -> None:
         """
         Inicijalizuje RAG sistem sa FAISS vector database
 
         Args:
             knowledge_base_path: Putanja do fakultetskog sadržaja
+            load_index: Učitaj/kreiraj index odmah (ingest ga gradi tek na kraju)
         """
         self.knowledge_base_path: str = knowledge_base_path
+        # Mapirani fajlovi nose id builda iz manifesta (faiss_index.<build>.bin,
+        # text_chunks.<build>.offsets.npy + text_chunks.<build>.bin): novi build ne
+        # prepisuje fajlove koje procesi još mapiraju (na Windowsu to nije moguće)
         self.index_path: str = "faiss_index.bin"
-        self.chunks_path: str = "text_chunks.pkl"
-
-        # Inicijalizuj sentence transformer (podržava srpski jezik)
-        print("🔄 Učitavam multilingual embedding model...")
-        self.model = SentenceTransformer("paraphrase-multilingual-MiniLM-L12-v2")
+        self.chunks_path: str = "text_chunks"
+        self.manifest_path: str = "index_manifest.json"
+        self.embeddings_path: str = "chunk_embeddings.npz"
+        self.trained_index_path: str = "faiss_trained.bin"
+        self.bm25_path: str = "bm25_index.npz"
+        self.metadata_path: str = "chunk_metadata.npz"
+        self.lock_path: str = "index.lock"
+
+        # Trenutni index; zamjenjuje ga reload bez prekida pretraga u toku
+        self._loaded: LoadedIndex | None = None
+        self._readers_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._watch_signature: tuple = ()
+        self._next_update_check = 0.0
+        self.last_reload: dict[str, Any] | None = None
+
+        # Dokumenti dodati ingestom se indeksiraju zajedno sa knowledge base-om
+        self.corpus = DocumentCorpus(INGEST_DIR)
+
+        # Inicijalizuj embedding model (podržava srpski jezik), torch ili ONNX backend
+        print(f"🔄 Učitavam multilingual embedding model ({EMBEDDING_BACKEND})...")
+        self.model = load_embedding_model(
+            EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND, ONNX_MODEL_DIR, ONNX_QUANTIZE
+        )
+        self.model_id: str = embedding_model_id(
+            EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND, ONNX_QUANTIZE
+        )
         print("✅ Model učitan!")
 
-        # Učitaj ili kreiraj FAISS index
-        if os.path.exists(self.index_path) and os.path.exists(self.chunks_path):
-            self._load_index()
-        else:
-            self._create_index()
+        # Perzistentni hash -> vektor store za inkrementalne rebuildove
+        self.embedding_store = EmbeddingStore(self.embeddings_path, self.model_id)
+
+        # LRU cache embeddinga pitanja - ponovljena pitanja preskaču model
+        self.query_cache = QueryEmbeddingCache(QUERY_CACHE_SIZE, QUERY_CACHE_TTL)
+
+        # Semantički cache odgovora - slična pitanja sa istim kontekstom preskaču LLM
+        self.answer_cache = SemanticAnswerCache(
+            ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL, ANSWER_CACHE_THRESHOLD
+        )
+
+        # Spajanje susjednih chunks bez ponovljenih headera/overlapa, u budžetu tokena
+        self.context_assembler = ContextAssembler(
+            CONTEXT_TOKEN_BUDGET, TokenCounter(CONTEXT_TOKENIZER, CONTEXT_CHARS_PER_TOKEN)
+        )
+
+        if load_index:
+            self.load_or_build_index()
+
+    def load_or_build_index(self) -> None:
+        """Učitava index ako odgovara trenutnom sadržaju, inače ga (inkrementalno) kreira"""
+        self._watch_signature = self._source_signature()
+        with file_lock(self.lock_path):
+            if self._index_is_fresh():
+                self._load_index()
+            else:
+                self._create_index()
+
+    def warm_up(self) -> None:
+        """
+        Jedan encode i pretraga prije prvog pitanja: lijena inicijalizacija modela
+        i učitavanje mmap stranica indexa ne padaju na prvog korisnika
+        """
+        embedding = np.asarray(self.model.encode(["zagrijavanje modela"]), dtype="float32")
+        faiss.normalize_L2(embedding)
+        self.index.search(embedding, 1)
+
+    def _knowledge_base_fingerprint(self) -> str:
+        """Fingerprint sadržaja knowledge base-a, modela i formata indexa"""
+        digest = hashlib.sha256()
+        with open(self.knowledge_base_path, "rb") as f:
+            digest.update(f.read())
+        settings = f"{self.model_id}:{INDEX_FORMAT_VERSION}:{INDEX_TYPE}:{CHUNKING_ID}"
+        digest.update(settings.encode())
+        digest.update(self.corpus.digest().encode())
+        return digest.hexdigest()
+
+    def _build_paths(self, build: str) -> tuple[str, str]:
+        """Putanja FAISS indexa i prefix chunk store-a jednog builda"""
+        root, ext = os.path.splitext(self.index_path)
+        return f"{root}.{build}{ext}", f"{self.chunks_path}.{build}"
+
+    def _remove_stale_builds(self, build: str) -> None:
+        """
+        Briše mapirane fajlove ranijih buildova. Fajl koji neki proces još mapira
+        na Windowsu nije moguće obrisati, pa ostaje do sljedeće zamjene indexa.
+        """
+        index_path, chunks_prefix = self._build_paths(build)
+        root, ext = os.path.splitext(self.index_path)
+        # Uključuje i fajlove bez id-ja iz ranijeg formata indexa
+        stale = [self.index_path, *glob.glob(f"{glob.escape(root)}.*{ext}")]
+        stale += glob.glob(f"{glob.escape(self.chunks_path)}.*")
+        for path in stale:
+            if path == index_path or path.startswith(f"{chunks_prefix}."):
+                continue
+            with contextlib.suppress(OSError):
+                os.remove(path)
+
+    def _index_is_fresh(self, fingerprint: str | None = None) -> bool:
+        """Provjerava da li sačuvani index odgovara trenutnom fakultetskom sadržaju"""
+        if not (
+            os.path.exists(self.manifest_path)
+            and os.path.exists(self.bm25_path)
+            and os.path.exists(self.metadata_path)
+        ):
+            return False
+
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            expected = fingerprint or self._knowledge_base_fingerprint()
+            if manifest.get("fingerprint") != expected:
+                return False
+            index_path, chunks_prefix = self._build_paths(manifest["build"])
+            return os.path.exists(index_path) and chunk_store_exists(chunks_prefix)
+        except Exception as e:
+            print(f"⚠️  Manifest indexa nije čitljiv: {e}")
+            return False
 
-    def _split_text_into_chunks(
-        self, text: str, chunk_size: int = 500, overlap: int = 100
-    ) -> list[str]:
+    @staticmethod
+    def _split_text_into_chunks(text: str) -> list[str]:
         """
-        Dijeli tekst na manje dijelove (chunks) za bolje pretraživanje.
+        Dijeli tekst na chunks po rečenicama (vidi rag.chunker.iter_chunks).
         Svaki chunk počinje s imenom sekcije (header) kojoj pripada,
-        a susjedni chunks dijele overlap znakova radi očuvanja konteksta.
+        a susjedni chunks dijele posljednje rečenice radi očuvanja konteksta.
 
         Args:
             text: Kompletan tekst
-            chunk_size: Broj karaktera po chunk-u
-            overlap: Broj znakova preklapanja između susjednih chunks
 
         Returns:
             Lista text chunks
         """
-        lines = text.split("\n")
-        chunks = []
-        current_chunk = ""
-        current_header = ""
+        return list(chunk_lines(text.splitlines()))
 
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
+    def _embed_missing_chunks(self, chunks: list[str], hashes: list[str]) -> int:
+        """
+        Generiše embeddings samo za chunks kojih nema u embedding store-u
 
-            if line.startswith("#"):
-                # Sačuvaj trenutni chunk i zapamti novi header
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                current_header = line
-                current_chunk = line + "\n"
-            else:
-                if len(current_chunk) + len(line) > chunk_size and current_chunk:
-                    chunks.append(current_chunk.strip())
-                    # Novi chunk počinje headerom sekcije + overlap sadržaja
-                    overlap_text = (
-                        current_chunk[-overlap:] if len(current_chunk) > overlap else current_chunk
-                    )
-                    current_chunk = current_header + "\n" + overlap_text + line + "\n"
-                else:
-                    current_chunk += line + "\n"
+        Args:
+            chunks: Tekstovi chunks
+            hashes: SHA-256 hashevi chunks (istim redoslijedom kao chunks)
 
-        if current_chunk:
-            chunks.append(current_chunk.strip())
+        Returns:
+            Broj novo embeddovanih chunks
+        """
+        missing = set(self.embedding_store.missing(hashes))
+        if not missing:
+            return 0
+
+        # Isti chunk se može pojaviti više puta - embeduj ga samo jednom
+        new_hashes: list[str] = []
+        new_texts: list[str] = []
+        for chunk, key in zip(chunks, hashes, strict=True):
+            if key in missing:
+                missing.discard(key)
+                new_hashes.append(key)
+                new_texts.append(chunk)
+
+        print(f"🔮 Generišem embeddings za {len(new_texts)} novih/izmijenjenih dijelova...")
+        embeddings = self.model.encode(new_texts, show_progress_bar=True)
+        embeddings = np.array(embeddings).astype("float32")
+
+        # Normalizuj embeddings za cosine similarity (IndexFlatIP = dot product na normalizovanim vektorima)
+        faiss.normalize_L2(embeddings)
+        self.embedding_store.put_many(new_hashes, embeddings)
+        return len(new_texts)
+
+    def _create_index(self) -> bool:
+        """
+        Gradi index (vidi _build_index) i zamjenjuje trenutni; greška ostavlja stari
 
-        return chunks
+        Returns:
+            True ako je novi index izgrađen
+        """
+        try:
+            self._swap(self._build_index(self._knowledge_base_fingerprint()))
+        except Exception as e:
+            print(f"❌ Greška pri kreiranju indexa: {e}")
+            return False
+        return True
+
+    def _build_index(self, fingerprint: str) -> LoadedIndex:
+        """
+        Inkrementalno kreira FAISS index iz fakultetskog sadržaja.
+        Embeddings se računaju samo za nove ili izmijenjene chunks,
+        a index se gradi iz keširanih vektora.
 
-    def _create_index(self):
-        """Kreira FAISS index iz fakultetskog sadržaja"""
+        Svi fajlovi se upisuju atomski (tmp + os.replace), manifest posljednji:
+        prekid builda ostavlja prethodni index koji se pri sljedećem startu
+        prepoznaje kao zastario i gradi ponovo.
+
+        Args:
+            fingerprint: Fingerprint sadržaja izračunat prije čitanja knowledge base-a,
+                pa izmjena tokom builda pokreće novi build
+        """
         print("📚 Učitavam fakultetski sadržaj...")
 
+        # Podijeli tekst na chunks čitajući fajl red po red
+        with open(self.knowledge_base_path, encoding="utf-8") as f:
+            chunks = list(chunk_lines(f))
+        sources = [self.knowledge_base_path] * len(chunks)
+        pages = [NO_PAGE] * len(chunks)
+
+        # Dodaj chunks dokumenata iz ingest korpusa (izvor i stranica po chunku)
+        for source, page, text in self.corpus.iter_chunks():
+            chunks.append(text)
+            sources.append(source)
+            pages.append(page)
+        print(f"✂️  Podijeljeno na {len(chunks)} dijelova")
+
+        hashes = [chunk_hash(chunk) for chunk in chunks]
+        embedded = self._embed_missing_chunks(chunks, hashes)
+        print(f"♻️  Iz cachea preuzeto {len(chunks) - embedded} vektora")
+
+        embeddings = self.embedding_store.get_matrix(hashes)
+
+        # Ukloni vektore chunks koji više ne postoje i sačuvaj store
+        self.embedding_store.prune(set(hashes))
+        self.embedding_store.save()
+
+        # Kreiraj FAISS index (inner product = cosine similarity na normalizovanim vektorima)
+        index_type = resolve_index_type(INDEX_TYPE, len(embeddings))
+        index = build_index(embeddings, index_type, self.trained_index_path)
+        configure_search(index, IVF_NPROBE, HNSW_EF_SEARCH)
+
+        # BM25 inverted index nad istim chunks (za hibridnu pretragu)
+        bm25 = BM25Index.build(chunks)
+
+        # Sačuvaj index i chunks (mapirani fajlovi pod novim id-jem builda)
+        build = uuid.uuid4().hex[:12]
+        index_path, chunks_prefix = self._build_paths(build)
+        with atomic_path(index_path) as tmp_path:
+            faiss.write_index(index, tmp_path)
+        bm25.save(self.bm25_path)
+        write_chunk_store(chunks_prefix, chunks)
+        write_chunk_metadata(self.metadata_path, sources, pages)
+        loaded = LoadedIndex(
+            index,
+            bm25,
+            ChunkStore(chunks_prefix),
+            ChunkMetadata(self.metadata_path),
+            fingerprint,
+            build,
+        )
+        manifest = {
+            "fingerprint": fingerprint,
+            "build": build,
+            "model": self.model_id,
+            "index_type": index_type,
+            "chunks": len(chunks),
+        }
+        with atomic_write(self.manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+
+        print(f"✅ FAISS index ({index_type}) kreiran sa {len(chunks)} vektora!")
+        return loaded
+
+    def _load_index(self) -> None:
+        """Učitava sačuvani index (vidi _read_index); ako ne uspije, gradi novi"""
         try:
-            with open(self.knowledge_base_path, encoding="utf-8") as f:
-                content = f.read()
+            self._swap(self._read_index())
+        except Exception as e:
+            print(f"❌ Greška pri učitavanju: {e}")
+            self._create_index()
 
-            # Podijeli tekst na chunks
-            self.chunks = self._split_text_into_chunks(content)
-            print(f"✂️  Podijeljeno na {len(self.chunks)} dijelova")
+    def _read_index(self) -> LoadedIndex:
+        """
+        Učitava postojeći FAISS index i chunks memory-mapped (bez pickle-a),
+        tako da gunicorn workeri dijele iste stranice kroz OS page cache
+        """
+        with open(self.manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        index_path, chunks_prefix = self._build_paths(manifest["build"])
+
+        # IO_FLAG_MMAP_IFC mapira vektore flat indexa umjesto kopiranja (faiss >= 1.9)
+        mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+        if mmap_flag is not None:
+            index = faiss.read_index(index_path, mmap_flag)
+        else:
+            index = faiss.read_index(index_path)
+        configure_search(index, IVF_NPROBE, HNSW_EF_SEARCH)
+        loaded = LoadedIndex(
+            index,
+            BM25Index.load(self.bm25_path),
+            ChunkStore(chunks_prefix),
+            ChunkMetadata(self.metadata_path),
+            manifest["fingerprint"],
+            manifest["build"],
+        )
+        print(f"✅ Učitan FAISS index sa {len(loaded.chunks)} vektora")
+        return loaded
+
+    def _swap(self, loaded: LoadedIndex) -> None:
+        """
+        Zamjenjuje index, BM25, chunks i metapodatke jednom dodjelom: pretrage
+        u toku završavaju nad starim indexom, nove vide novi. Stari index se
+        zatvara kada završi posljednja pretraga koja ga čita.
 
-            # Generiši embeddings za sve chunks
-            print("🔮 Generišem embeddings...")
-            embeddings = self.model.encode(self.chunks, show_progress_bar=True)
-            embeddings = np.array(embeddings).astype("float32")
+        Poziva se pod file_lock, pa je `loaded` build koji navodi manifest.
+        """
+        with self._readers_lock:
+            previous = self._loaded
+            self._loaded = loaded
+            close = previous is not None and not previous.readers
+            if previous is not None:
+                previous.retired = True
+        if previous is not None:
+            if close:
+                previous.close()
+            if previous.fingerprint != loaded.fingerprint:
+                # Keširani odgovori su vezani za stari sadržaj
+                self.answer_cache.clear()
+        self._remove_stale_builds(loaded.build)
+
+    @contextmanager
+    def _reading(self) -> Iterator[LoadedIndex | None]:
+        """Trenutni index (None prije učitavanja), koji se ne zatvara dok traje blok"""
+        with self._readers_lock:
+            loaded = self._loaded
+            if loaded is not None:
+                loaded.readers += 1
+        try:
+            yield loaded
+        finally:
+            if loaded is not None:
+                with self._readers_lock:
+                    loaded.readers -= 1
+                    close = loaded.retired and not loaded.readers
+                if close:
+                    loaded.close()
+
+    def _current(self) -> LoadedIndex:
+        """Trenutni index; greška ako još nije učitan (load_index=False bez load_or_build_index)"""
+        loaded = self._loaded
+        if loaded is None:
+            raise RuntimeError("Index nije učitan")
+        return loaded
+
+    # Trenutni index za alate (benchmark, warm_up); pretrage ga preuzimaju kroz _reading,
+    # jer se zamijenjeni index zatvara čim ga niko ne čita
+    @property
+    def index(self) -> Any:
+        return self._current().index
+
+    @property
+    def bm25(self) -> BM25Index:
+        return self._current().bm25
+
+    @property
+    def chunks(self) -> ChunkStore:
+        return self._current().chunks
+
+    @property
+    def metadata(self) -> ChunkMetadata:
+        return self._current().metadata
+
+    def _encode_queries(self, queries: list[str]) -> np.ndarray:
+        """
+        Vraća normalizovane embeddinge pitanja (oblik n x d).
+        Pitanja iz cachea se preuzimaju, a sva ostala se embeduju u jednom batch-u.
 
-            # Normalizuj embeddings za cosine similarity (IndexFlatIP = dot product na normalizovanim vektorima)
+        Args:
+            queries: Lista korisničkih pitanja
+
+        Returns:
+            float32 matrica spremna za FAISS pretragu
+        """
+        return self._encode_queries_cached(queries)[0]
+
+    def _encode_queries_cached(self, queries: list[str]) -> tuple[np.ndarray, list[bool]]:
+        """Kao _encode_queries, uz oznaku za svako pitanje da li je embedding iz cachea"""
+        rows: list[np.ndarray | None] = [self.query_cache.get(query) for query in queries]
+        missing = [i for i, row in enumerate(rows) if row is None]
+        cached = [row is not None for row in rows]
+
+        if missing:
+            # Isto (normalizovano) pitanje u batch-u se embeduje samo jednom
+            unique: dict[str, str] = {}
+            for i in missing:
+                unique.setdefault(normalize_query(queries[i]), queries[i])
+
+            # Jedan forward pass za sva pitanja kojih nema u cacheu
+            embeddings = self.model.encode(list(unique.values()))
+            embeddings = np.array(embeddings).astype("float32")
             faiss.normalize_L2(embeddings)
 
-            # Kreiraj FAISS index
-            dimension = embeddings.shape[1]
-            self.index = faiss.IndexFlatIP(
-                dimension
-            )  # Inner Product = cosine similarity (na normalizovanim vektorima)
-            self.index.add(x=embeddings)
+            by_key: dict[str, np.ndarray] = {}
+            for key, embedding in zip(unique, embeddings, strict=True):
+                # Keširani niz se dijeli između zahtjeva pa mora biti read-only
+                embedding = embedding.reshape(1, -1)
+                embedding.setflags(write=False)
+                self.query_cache.put(unique[key], embedding)
+                by_key[key] = embedding
+
+            for i in missing:
+                rows[i] = by_key[normalize_query(queries[i])]
+
+        return np.vstack([row for row in rows if row is not None]), cached
+
+    def _format_results(
+        self,
+        query: str,
+        scores: np.ndarray,
+        indices: np.ndarray,
+        n_results: int,
+        loaded: LoadedIndex | None = None,
+    ) -> dict[str, Any]:
+        """
+        Filtrira jedan red FAISS rezultata po pragu relevantnosti i, u hibridnom
+        režimu, spaja ga sa BM25 rezultatima (Reciprocal Rank Fusion)
+        """
+        loaded = loaded or self._current()
+        cosine: dict[int, float] = {}
+        for score, idx in zip(scores, indices, strict=False):
+            if idx != -1 and float(score) >= SIMILARITY_THRESHOLD:
+                cosine[int(idx)] = float(score)
+
+        if not HYBRID_SEARCH:
+            top = list(cosine)[:n_results]
+            return {
+                "query": query,
+                "results": [loaded.chunks[idx] for idx in top],
+                "ids": top,
+                "sources": [loaded.metadata.get(idx) for idx in top],
+                "distances": [cosine[idx] for idx in top],
+                "success": True,
+            }
 
-            # Sačuvaj index i chunks
-            faiss.write_index(self.index, self.index_path)
-            with open(self.chunks_path, "wb") as f:
-                pickle.dump(self.chunks, f)
+        # Tačni tokeni (telefoni, adrese, imena) koje vektorska pretraga promaši
+        keyword_hits = loaded.bm25.search(query, HYBRID_CANDIDATES, HYBRID_BM25_MIN_COVERAGE)
+        keyword_ranking = [idx for idx, _ in keyword_hits]
+        fused = reciprocal_rank_fusion([list(cosine), keyword_ranking], k=RRF_K)[:n_results]
+
+        return {
+            "query": query,
+            "results": [loaded.chunks[idx] for idx, _ in fused],
+            "ids": [idx for idx, _ in fused],
+            "sources": [loaded.metadata.get(idx) for idx, _ in fused],
+            # Cosine sličnost ili None za chunks koje je pronašao samo BM25
+            "distances": [cosine.get(idx) for idx, _ in fused],
+            "rrf_scores": [score for _, score in fused],
+            "success": True,
+        }
+
+    def search_many(self, queries: list[str], n_results: int = 3) -> list[dict[str, Any]]:
+        """
+        Pretražuje knowledge base za više pitanja odjednom: jedan batch encode
+        i jedna FAISS pretraga nad matricom pitanja
 
-            print(f"✅ FAISS index kreiran sa {len(self.chunks)} vektora!")
+        Args:
+            queries: Lista korisničkih pitanja
+            n_results: Broj rezultata po pitanju
 
-        except Exception as e:
-            print(f"❌ Greška pri kreiranju indexa: {e}")
+        Returns:
+            Lista dictionary-ja sa rezultatima, istim redoslijedom kao pitanja
+        """
+        self.check_for_updates()
+        with self._reading() as loaded:
+            return self._search_many(queries, n_results, loaded)
+
+    def _search_many(
+        self, queries: list[str], n_results: int, loaded: LoadedIndex | None
+    ) -> list[dict[str, Any]]:
+        """search_many nad zadanim indexom (ostaje isti i ako reload zamijeni trenutni)"""
+        return self._search_with_embeddings(queries, n_results, loaded)[0]
+
+    def _search_with_embeddings(
+        self, queries: list[str], n_results: int, loaded: LoadedIndex | None
+    ) -> tuple[list[dict[str, Any]], np.ndarray | None]:
+        """
+        Kao _search_many, uz matricu embeddinga pitanja (None ako pretraga nije uspjela),
+        da je semantički cache odgovora ne bi ponovo računao
+        """
+        if not queries:
+            return [], None
 
-    def _load_index(self):
-        """Učitava postojeći FAISS index"""
         try:
-            self.index = faiss.read_index(self.index_path)
-            with open(self.chunks_path, "rb") as f:
-                self.chunks = pickle.load(f)
-            print(f"✅ Učitan FAISS index sa {len(self.chunks)} vektora")
+            # Embeddings za sva pitanja (normalizovani za cosine similarity, keširani po pitanju)
+            start = time.perf_counter()
+            query_embeddings, cached = self._encode_queries_cached(queries)
+            encoded = time.perf_counter()
+            loaded = loaded or self._current()
+
+            # Pretraži FAISS index za sva pitanja jednim pozivom
+            # (u hibridnom režimu više kandidata za spajanje sa BM25)
+            k = max(n_results, HYBRID_CANDIDATES) if HYBRID_SEARCH else n_results
+            scores, indices = loaded.index.search(query_embeddings, k)
+
+            results = [
+                self._format_results(query, scores[i], indices[i], n_results, loaded)
+                for i, query in enumerate(queries)
+            ]
+
+            # Trajanje faza (sekunde) za cijeli batch, za metrike servisa
+            timings = {"embed": encoded - start, "search": time.perf_counter() - encoded}
+            for result, is_cached in zip(results, cached, strict=True):
+                result["timings"] = timings
+                result["embedding_cached"] = is_cached
+            return results, query_embeddings
+
         except Exception as e:
-            print(f"❌ Greška pri učitavanju: {e}")
-            self._create_index()
+            print(f"❌ Greška pri pretraživanju: {e}")
+            results = [
+                {
+                    "query": query,
+                    "results": [],
+                    "ids": [],
+                    "sources": [],
+                    "distances": [],
+                    "success": False,
+                    "error": str(e),
+                }
+                for query in queries
+            ]
+            return results, None
 
     def search(self, query: str, n_results: int = 3) -> dict[str, Any]:
         """
@@ -142,40 +693,7 @@ class RAGSystem:
         Returns:
             Dictionary sa rezultatima pretrage
         """
-        try:
-            # Generiši embedding za query i normalizuj za cosine similarity
-            query_embedding = self.model.encode([query])
-            query_embedding = np.array(query_embedding).astype("float32")
-            faiss.normalize_L2(query_embedding)
-
-            # Pretraži FAISS index
-            scores, indices = self.index.search(query_embedding, n_results)
-
-            # Filtriraj po pragu relevantnosti (cosine similarity >= 0.35)
-            SIMILARITY_THRESHOLD = 0.35
-            results = []
-            valid_scores = []
-            for score, idx in zip(scores[0], indices[0], strict=False):
-                if idx != -1 and float(score) >= SIMILARITY_THRESHOLD:
-                    results.append(self.chunks[idx])
-                    valid_scores.append(float(score))
-
-            return {
-                "query": query,
-                "results": results,
-                "distances": valid_scores,
-                "success": True,
-            }
-
-        except Exception as e:
-            print(f"❌ Greška pri pretraživanju: {e}")
-            return {
-                "query": query,
-                "results": [],
-                "distances": [],
-                "success": False,
-                "error": str(e),
-            }
+        return self.search_many([query], n_results)[0]
 
     def get_context_for_llm(self, query: str, n_results: int = 4) -> str:
         """
@@ -188,25 +706,171 @@ class RAGSystem:
         Returns:
             Formatirani kontekst za Mistral AI
         """
-        search_results = self.search(query, n_results)
+        return self.assemble_context(query, n_results)["context"]
+
+    def assemble_context(self, query: str, n_results: int = 4) -> dict[str, Any]:
+        """
+        Kao get_context_for_llm, uz broj tokena konteksta i uštedu u odnosu na
+        doslovno spojene chunks
+
+        Returns:
+            {"context", "tokens", "naive_tokens", "tokens_saved", "timings", "embedding_cached",
+            "query_embedding"}
+            - timings su trajanja faza embed, search i context u sekundama
+            - query_embedding je embedding pitanja (1 x d) za get_cached_answer/cache_answer,
+              ili None ako pretraga nije uspjela
+        """
+        # Isti index za pretragu i sklapanje konteksta, i ako ga reload u međuvremenu zamijeni
+        self.check_for_updates()
+        with self._reading() as loaded:
+            if loaded is None:
+                raise RuntimeError("Index nije učitan")
+            return self._assemble_context(query, n_results, loaded)
+
+    def _assemble_context(self, query: str, n_results: int, loaded: LoadedIndex) -> dict[str, Any]:
+        """assemble_context nad zadanim indexom"""
+        results, query_embeddings = self._search_with_embeddings([query], n_results, loaded)
+        search_results = results[0]
+        timings = dict(search_results.get("timings", {}))
+        details = {
+            "embedding_cached": search_results.get("embedding_cached", False),
+            "query_embedding": query_embeddings,
+        }
 
         if not search_results["success"] or not search_results["results"]:
-            return "Nisam pronašao relevantan sadržaj o ovoj temi."
-
-        # Kombinuj rezultate u jedan kontekst
-        context_parts = []
-        for i, doc in enumerate(search_results["results"], 1):
-            context_parts.append(f"[Informacija {i}]\n{doc}\n")
-
-        return "\n".join(context_parts)
-
-    def rebuild_index(self):
-        """Ponovo kreira index (korisno ako se promijeni sadržaj)"""
-        if os.path.exists(self.index_path):
-            os.remove(self.index_path)
-        if os.path.exists(self.chunks_path):
-            os.remove(self.chunks_path)
-        self._create_index()
+            context = "Nisam pronašao relevantan sadržaj o ovoj temi."
+            return {
+                "context": context,
+                "tokens": 0,
+                "naive_tokens": 0,
+                "tokens_saved": 0,
+                "timings": timings,
+                **details,
+            }
+
+        # Susjedni chunks iste sekcije se spajaju, header se ne ponavlja
+        start = time.perf_counter()
+        assembled = self.context_assembler.assemble(loaded.chunks, search_results["ids"])
+        timings["context"] = time.perf_counter() - start
+        return {**assembled, "timings": timings, **details}
+
+    def get_cached_answer(self, query_embedding: np.ndarray | None, context: str) -> str | None:
+        """
+        Vraća keširani odgovor LLM-a za semantički slično pitanje sa istim kontekstom
+
+        Args:
+            query_embedding: Embedding pitanja iz assemble_context (bez novog encode-a)
+            context: Kontekst dobijen iz assemble_context
+
+        Returns:
+            Keširani odgovor ili None
+        """
+        if query_embedding is None or self.answer_cache.max_size <= 0:
+            return None
+        return self.answer_cache.get(query_embedding, context)
+
+    def cache_answer(self, query_embedding: np.ndarray | None, context: str, answer: str) -> None:
+        """Sprema odgovor LLM-a u semantički cache"""
+        if query_embedding is None or self.answer_cache.max_size <= 0:
+            return
+        self.answer_cache.put(query_embedding, context, answer)
+
+    def rebuild_index(self, full: bool = False) -> bool:
+        """
+        Ponovo kreira index (korisno ako se promijeni sadržaj)
+
+        Args:
+            full: Ako je True, odbacuje embedding cache i ponovo embeduje sve chunks
+
+        Returns:
+            True ako je index izgrađen; ako nije, ostaje prethodni (greška je ispisana)
+        """
+        with self._reload_lock, file_lock(self.lock_path):
+            if full:
+                self.embedding_store.clear()
+            return self._create_index()
+
+    def reload(self) -> dict[str, Any]:
+        """
+        Usklađuje index sa knowledge base-om i ingest korpusom bez restarta:
+        ako se sadržaj promijenio, gradi novi index (ili učitava onaj koji je
+        drugi worker već izgradio) i zamjenjuje ga, dok pretrage rade nad starim
+
+        Returns:
+            {"status": "unchanged" | "loaded" | "rebuilt", "chunks", "seconds"}
+        """
+        with self._reload_lock:
+            start = time.perf_counter()
+            with file_lock(self.lock_path):
+                fingerprint = self._knowledge_base_fingerprint()
+                if self._loaded is not None and self._loaded.fingerprint == fingerprint:
+                    status = "unchanged"
+                elif self._index_is_fresh(fingerprint):
+                    self._swap(self._read_index())
+                    status = "loaded"
+                else:
+                    self._swap(self._build_index(fingerprint))
+                    status = "rebuilt"
+
+            result = {
+                "status": status,
+                "chunks": len(self.chunks),
+                "seconds": round(time.perf_counter() - start, 3),
+                "finished_at": time.time(),
+            }
+            if status != "unchanged":
+                print(f"🔁 Index {status}: {result['chunks']} chunks za {result['seconds']}s")
+            self.last_reload = result
+            return result
+
+    def _reload_safely(self) -> None:
+        try:
+            self.reload()
+        except Exception as e:
+            print(f"❌ Reload indexa nije uspio, ostaje stari index: {e}")
+            self.last_reload = {"status": "failed", "error": str(e), "finished_at": time.time()}
+
+    def reload_in_background(self) -> bool:
+        """Pokreće reload u pozadinskoj niti; False ako je reload već u toku"""
+        if self._reload_lock.locked():
+            return False
+        threading.Thread(target=self._reload_safely, name="rag-reload", daemon=True).start()
+        return True
+
+    def _source_signature(self) -> tuple:
+        """Veličina i mtime knowledge base-a, korpusa i manifesta indexa (jeftin stat)"""
+        signature = []
+        for path in (self.knowledge_base_path, self.corpus.manifest_path, self.manifest_path):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def check_for_updates(self) -> None:
+        """
+        Najviše jednom u RELOAD_CHECK_SECONDS provjerava da li su se izvori
+        ili index (npr. izgradio ga drugi worker) promijenili i pokreće reload
+        """
+        if not RELOAD_CHECK_SECONDS or self._loaded is None:
+            return
+        now = time.monotonic()
+        if now < self._next_update_check:
+            return
+        self._next_update_check = now + RELOAD_CHECK_SECONDS
+
+        signature = self._source_signature()
+        if signature != self._watch_signature:
+            self._watch_signature = signature
+            self.reload_in_background()
+
+    def reload_stats(self) -> dict[str, Any]:
+        return {
+            "in_progress": self._reload_lock.locked(),
+            "check_seconds": RELOAD_CHECK_SECONDS,
+            "last_reload": self.last_reload,
+        }
 
 
 # Test funkcija
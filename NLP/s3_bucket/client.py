@@ -13,11 +13,13 @@ load_dotenv()
 endpoint_url: str | None = os.environ.get("BUCKET_NAME")
 filebase_access_key_id: str | None = os.environ.get("FILEBASE_ACCESS_KEY")
 filebase_secret_access_key: str | None = os.environ.get("FILEBASE_SECRET_KEY")
+# Override to point at a local S3 stand-in (MinIO, moto server) during development
+s3_endpoint: str = os.environ.get("S3_ENDPOINT_URL", "https://s3.filebase.com")
 
 # Initialize S3 client immediately
 s3_client: "S3Client" = boto3.client(
     "s3",
-    endpoint_url="https://s3.filebase.com",
+    endpoint_url=s3_endpoint,
     aws_access_key_id=filebase_access_key_id,
     aws_secret_access_key=filebase_secret_access_key,
 )
@@ -7,7 +7,7 @@ from flask import jsonify
 from .client import endpoint_url, s3_client
 
 
-def upload_file(professor_subject: str, assignment: str, file_to_save: Any) -> None:
+def upload_file(professor_subject: str, assignment: str, file_to_save: Any) -> str:
     if endpoint_url is None:
         raise ValueError("Endpoint URL is not configured")
 
@@ -18,12 +18,14 @@ def upload_file(professor_subject: str, assignment: str, file_to_save: Any) -> N
     original_filename = file_to_save.filename
     file_extension = os.path.splitext(original_filename)[1]  # Includes the dot, e.g., '.pdf'
 
+    key = f"{professor_subject}/{assignment}{file_extension}"
     s3_client.put_object(
         Bucket=endpoint_url,
-        Key=f"{professor_subject}/{assignment}{file_extension}",
+        Key=key,
         Body=file_content,
     )
     print(f"✅ File uploaded successfully as {assignment}{file_extension}")
+    return key
 
 
 def get_all_files_s3(professor_subject: str):